@@ -0,0 +1,64 @@
+"""
+This tests the FractalClient latency of small queries with and without connection pooling
+
+Usage: python bench_client_pooling.py [n_queries] [storage_uri]
+
+Without a storage_uri a temporary mongod is started by the FractalSnowflake.
+"""
+
+import sys
+from time import time
+
+import requests
+
+import qcfractal
+import qcfractal.interface as portal
+
+n_queries = 1000
+
+
+class NoPoolSession:
+    """Opens a new connection for every request, as FractalClient did before it owned a Session"""
+
+    def get(self, *args, **kwargs):
+        return requests.get(*args, **kwargs)
+
+    def post(self, *args, **kwargs):
+        return requests.post(*args, **kwargs)
+
+    def put(self, *args, **kwargs):
+        return requests.put(*args, **kwargs)
+
+
+def run_queries(client, mol_id, n_query):
+    tstart = time()
+    for i in range(n_query):
+        client.query_molecules(id=mol_id)
+    return (time() - tstart) * 1000  # msec
+
+
+def bench():
+    if len(sys.argv) > 1:
+        n_query = int(sys.argv[1])
+    else:
+        n_query = n_queries
+
+    storage_uri = sys.argv[2] if len(sys.argv) > 2 else None
+
+    with qcfractal.FractalSnowflake(max_workers=0, storage_uri=storage_uri,
+                                    storage_project_name="bench_client_pooling") as server:
+        client = portal.FractalClient(server)
+        water = portal.data.get_molecule("water_dimer_minima.psimol")
+        mol_id = client.add_molecules([water])[0]
+
+        unpooled = portal.FractalClient(server)
+        unpooled._session = NoPoolSession()
+
+        for name, c in [("no pooling", unpooled), ("pooling", client)]:
+            dtime = run_queries(c, mol_id, n_query)
+            print('{:>10s}: {} query_molecules in {:0.1f} ms, an avg {:0.3f} ms / query'.format(
+                name, n_query, dtime, dtime / n_query))
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,100 @@
+"""
+This tests the size and encode/decode time of large REST payloads in every wire encoding
+
+Usage: python bench_encoding.py [n_results]
+"""
+
+import sys
+from time import time
+
+import numpy as np
+
+import qcfractal.interface as portal
+from qcfractal.interface.models.rest_models import QueueManagerPOSTBody, ResultGETResponse
+from qcfractal.interface.serialization import available_encodings, deserialize, serialize_model
+
+n_results = 1000
+n_repeat = 5
+
+
+def build_manager_post(n_result):
+    # Completed Hessian tasks as a manager returns them, arrays are still NumPy arrays
+    water = portal.data.get_molecule("water_dimer_minima.psimol")
+    natom = len(water.symbols)
+
+    meta = {
+        "cluster": "bench",
+        "hostname": "localhost",
+        "uuid": "bench",
+        "qcengine_version": "0",
+        "manager_version": "0",
+        "programs": ["psi4"],
+        "procedures": [],
+    }
+
+    data = {}
+    for i in range(n_result):
+        data["{:024x}".format(i)] = {
+            "molecule": water.dict(),
+            "driver": "hessian",
+            "model": {"method": "b3lyp", "basis": "6-31g"},
+            "return_result": np.random.rand(3 * natom, 3 * natom),
+            "properties": {"return_energy": -152.0 + i * 1.e-6},
+            "success": True,
+        }
+
+    return QueueManagerPOSTBody(meta=meta, data=data)
+
+
+def build_result_get(n_result):
+    water = portal.data.get_molecule("water_dimer_minima.psimol")
+    natom = len(water.symbols)
+
+    records = [
+        portal.models.ResultRecord(
+            id="{:024x}".format(i),
+            molecule="{:024x}".format(i),
+            method="b3lyp",
+            basis="6-31g",
+            program="psi4",
+            driver="gradient",
+            status="COMPLETE",
+            return_result=np.random.rand(3 * natom).tolist(),
+            properties={"return_energy": -152.0 + i * 1.e-6}) for i in range(n_result)
+    ]
+
+    meta = {"success": True, "errors": [], "error_description": False, "missing": [], "n_found": n_result}
+    return ResultGETResponse(meta=meta, data=records)
+
+
+def time_encoding(model, encoding):
+    tstart = time()
+    for i in range(n_repeat):
+        blob = serialize_model(model, encoding)
+    dencode = (time() - tstart) * 1000 / n_repeat
+
+    tstart = time()
+    for i in range(n_repeat):
+        type(model).parse_obj(deserialize(blob, encoding))
+    ddecode = (time() - tstart) * 1000 / n_repeat
+
+    return len(blob), dencode, ddecode
+
+
+def bench():
+    if len(sys.argv) > 1:
+        n_result = int(sys.argv[1])
+    else:
+        n_result = n_results
+
+    for name, model in [("QueueManagerPOSTBody", build_manager_post(n_result)),
+                        ("ResultGETResponse", build_result_get(n_result))]:
+        print("{} with {} results".format(name, n_result))
+        for encoding in available_encodings():
+            size, dencode, ddecode = time_encoding(model, encoding)
+            print('{:>14s}: {:8.1f} kB, encode {:8.2f} ms, decode and validate {:8.2f} ms'.format(
+                encoding, size / 1024, dencode, ddecode))
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,166 @@
+"""
+This tests the SQLAlchemy socket latency of queue_get_next and get_results on large tables,
+with and without the indexes declared in sql_models
+
+Usage: python bench_indexes.py [n_rows] [uri]
+
+The database at `uri` is cleared, use a scratch database.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from time import time
+
+import qcfractal.interface as portal
+from qcfractal.interface.models.task_models import PriorityEnum, TaskStatusEnum
+from qcfractal.storage_sockets.sql_models import BaseResultORM, ResultORM, TaskQueueORM
+from qcfractal.storage_sockets.sqlalchemy_socket import SQLAlchemySocket
+
+n_rows = 1000000
+n_mols = 1000
+n_repeat = 20
+waiting_fraction = 0.01
+
+programs = ["p{}".format(i) for i in range(4)]
+methods = ["m{}".format(i) for i in range(50)]
+bases = ["b{}".format(i) for i in range(10)]
+priorities = [PriorityEnum.LOW, PriorityEnum.NORMAL, PriorityEnum.HIGH]
+
+indexed_tables = [BaseResultORM.__table__, ResultORM.__table__, TaskQueueORM.__table__]
+
+
+def build_molecules(n_mol):
+    # Displace a water dimer so that every molecule has a unique hash
+    water = portal.data.get_molecule("water_dimer_minima.psimol")
+    mol_dict = water.dict(exclude={"id"})
+
+    molecules = []
+    for i in range(n_mol):
+        mol_dict["geometry"] = water.geometry + i * 1.e-3
+        molecules.append(portal.Molecule(**mol_dict, validate=False))
+
+    return molecules
+
+
+def populate(storage, n_row):
+    mol_ids = storage.add_molecules(build_molecules(n_mols))["data"]
+    mol_ids = [int(x) for x in mol_ids]
+
+    n_waiting = int(n_row * waiting_fraction)
+    spec = {"function": "qcengine.compute", "args": [], "kwargs": {}}
+    start = datetime.utcnow()
+    chunk = 50000
+    with storage.session_scope() as session:
+        for i0 in range(0, n_row, chunk):
+            ids = range(i0 + 1, min(i0 + chunk, n_row) + 1)
+
+            base = [{
+                "id": i,
+                "result_type": "result",
+                "program": programs[i % len(programs)],
+                "status": "COMPLETE",
+            } for i in ids]
+            storage._bulk_insert(session, BaseResultORM, base)
+
+            results = [{
+                "id": i,
+                "driver": "energy",
+                "method": methods[i % len(methods)],
+                "basis": bases[i % len(bases)],
+                # Consecutive blocks share a molecule so that a full lookup matches a handful of rows
+                "molecule": mol_ids[(i // n_mols) % len(mol_ids)],
+            } for i in ids]
+            storage._bulk_insert(session, ResultORM, results)
+
+            # Spread the waiting tasks over the table
+            tasks = [{
+                "id": i,
+                "base_result": i,
+                "spec": spec,
+                "program": programs[i % len(programs)],
+                "status": TaskStatusEnum.waiting if i % (n_row // n_waiting) == 0 else TaskStatusEnum.complete,
+                "priority": priorities[i % len(priorities)],
+                "created_on": start + timedelta(seconds=i),
+            } for i in ids]
+            storage._bulk_insert(session, TaskQueueORM, tasks)
+
+    return mol_ids
+
+
+def analyze(storage):
+    if storage.engine.dialect.name == "postgresql":
+        with storage.engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute("ANALYZE")
+    else:
+        storage.engine.execute("ANALYZE")
+
+
+def time_queries(storage, mol_ids):
+
+    # Claim tasks, each call claims new ones
+    tstart = time()
+    n_claimed = 0
+    for i in range(n_repeat):
+        n_claimed += len(storage.queue_get_next("bench_manager", programs[:2], None, limit=100))
+    dqueue = (time() - tstart) * 1000 / n_repeat
+
+    # Put the claimed tasks back so that both runs see the same queue
+    with storage.session_scope() as session:
+        session.query(TaskQueueORM).filter(TaskQueueORM.manager == "bench_manager")\
+               .update({"status": TaskStatusEnum.waiting, "manager": None}, synchronize_session=False)
+
+    # The lookup done for every result added
+    tstart = time()
+    n_found = 0
+    for i in range(n_repeat):
+        n_found += len(storage.get_results(program=programs[i % len(programs)], method=methods[i % len(methods)],
+                                           basis=bases[i % len(bases)], molecule=mol_ids[i],
+                                           status=None)["data"])
+    dresults = (time() - tstart) * 1000 / n_repeat
+
+    return dqueue, dresults, n_claimed, n_found
+
+
+def bench():
+    if len(sys.argv) > 1:
+        n_row = int(sys.argv[1])
+    else:
+        n_row = n_rows
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if len(sys.argv) > 2:
+            uri = sys.argv[2]
+        else:
+            uri = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+
+        storage = SQLAlchemySocket(uri)
+        storage._clear_db("bench")
+
+        tstart = time()
+        mol_ids = populate(storage, n_row)
+        print("Inserted {} results and tasks in {:0.1f} s".format(n_row, time() - tstart))
+
+        indexes = [idx for table in indexed_tables for idx in table.indexes]
+
+        for idx in indexes:
+            idx.drop(storage.engine)
+        analyze(storage)
+        without = time_queries(storage, mol_ids)
+
+        for idx in indexes:
+            idx.create(storage.engine)
+        analyze(storage)
+        with_idx = time_queries(storage, mol_ids)
+
+        for name, (dqueue, dresults, n_claimed, n_found) in [("without indexes", without), ("with indexes", with_idx)]:
+            print('{:>16s}: queue_get_next {:0.2f} ms / call ({} claimed), get_results {:0.2f} ms / call ({} found)'.
+                  format(name, dqueue, n_claimed, dresults, n_found))
+
+        storage._clear_db("bench")
+        storage.engine.dispose()
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,69 @@
+"""
+This tests the SQLAlchemy socket performance when inserting molecules row by row and in bulk
+
+"""
+
+import os
+import sys
+import tempfile
+from time import time
+
+import qcfractal.interface as portal
+from qcfractal.storage_sockets.sqlalchemy_socket import SQLAlchemySocket
+
+n_mols = [1000, 10000, 100000]
+
+
+def build_molecules(n_mol):
+    # Displace a water dimer so that every molecule has a unique hash
+    water = portal.data.get_molecule("water_dimer_minima.psimol")
+    mol_dict = water.dict(exclude={"id"})
+
+    molecules = []
+    for i in range(n_mol):
+        mol_dict["geometry"] = water.geometry + i * 1.e-3
+        molecules.append(portal.Molecule(**mol_dict, validate=False))
+
+    return molecules
+
+
+def insert_per_row(storage, molecules):
+    # One transaction per molecule
+    for mol in molecules:
+        storage.add_molecules([mol])
+
+
+def insert_bulk(storage, molecules):
+    storage.add_molecules(molecules)
+
+
+def bench():
+    if len(sys.argv) > 1:
+        sizes = [int(x) for x in sys.argv[1:]]
+    else:
+        sizes = n_mols
+
+    for n_mol in sizes:
+        molecules = build_molecules(n_mol)
+
+        # Pre-hash so that only the database work is timed
+        for mol in molecules:
+            mol.get_hash()
+
+        for name, func in [("per-row", insert_per_row), ("bulk", insert_bulk)]:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                storage = SQLAlchemySocket("sqlite:///" + os.path.join(tmpdir, "bench.db"))
+
+                tstart = time()
+                func(storage, molecules)
+                dtime = (time() - tstart) * 1000  # msec
+
+                assert storage.get_molecules(limit=1)["meta"]["n_found"] == n_mol
+                storage.engine.dispose()
+
+            print('{:>7s}: {} molecules inserted in {:0.1f} ms, an avg {:0.3f} ms / doc'.format(
+                name, n_mol, dtime, dtime / n_mol))
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,168 @@
+"""
+This replays a task submission trace against the scheduling policies of queue_get_next
+
+Usage: python bench_scheduling.py [trace_file] [n_managers] [slots] [pull_interval]
+
+The trace is a JSON lines file of tasks ordered by submission time, each line holds the "time" of submission
+and the "duration" of the task in seconds, its "owner", "tag", "priority" (0-2) and "program". Without a trace
+file a synthetic trace is replayed, one owner submits a large dataset at once while others trickle in small,
+low priority and high priority service jobs. The simulated managers pull tasks for their free slots every
+`pull_interval` seconds. Throughput and the p50/p99 wait time of every owner are reported per policy.
+"""
+
+import datetime
+import heapq
+import json
+import random
+import sys
+from collections import Counter, defaultdict, deque
+
+from qcfractal.storage_sockets.scheduling import FairSharePolicy, PriorityPolicy
+
+n_managers = 20
+slots = 8
+pull_interval = 30
+
+policies = {
+    "priority": PriorityPolicy(),
+    "fair_share": FairSharePolicy("owner", aging=0),
+    "fair_share + aging": FairSharePolicy("owner", aging=3600),
+    "fair_share + aging + affinity": FairSharePolicy("owner", aging=3600, affinity=1),
+}
+
+
+def synthetic_trace(seed=0):
+    rng = random.Random(seed)
+    trace = []
+
+    # A large dataset submitted at once
+    for x in range(20000):
+        trace.append({"time": 0, "owner": "bulk", "priority": 1, "program": "psi4", "duration": rng.uniform(60, 600)})
+
+    # Small jobs trickling in
+    for owner, program in [("alice", "psi4"), ("bob", "rdkit")]:
+        for x in range(400):
+            trace.append({
+                "time": x * 60 + rng.uniform(0, 60),
+                "owner": owner,
+                "priority": 1,
+                "program": program,
+                "duration": rng.uniform(30, 300)
+            })
+
+    # Low priority jobs
+    for x in range(200):
+        trace.append({"time": x * 120, "owner": "dave", "priority": 0, "program": "psi4", "duration": 300})
+
+    # Service tasks come in high priority bursts
+    for x in range(40):
+        for y in range(24):
+            trace.append({"time": x * 600, "owner": "carol", "priority": 2, "program": "geometric", "duration": 120})
+
+    for task in trace:
+        task.setdefault("tag", None)
+
+    return sorted(trace, key=lambda x: x["time"])
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def simulate(policy, trace, nmanagers, nslots, interval):
+    start = datetime.datetime(2019, 1, 1)
+    partition = policy.partition or ("priority", )
+
+    # Waiting tasks of every partition group in submission order, like the candidates of the sockets
+    waiting = defaultdict(deque)
+    running = []
+    free = [nslots] * nmanagers
+    programs = [Counter() for x in range(nmanagers)]
+    usage = Counter()
+    waits = defaultdict(list)
+
+    nwaiting = 0
+    ntrace = 0
+    now = 0
+    while (ntrace < len(trace)) or nwaiting or running:
+
+        # Finished tasks free their slots
+        while running and (running[0][0] <= now):
+            end, manager, _, task = heapq.heappop(running)
+            free[manager] += 1
+            programs[manager][task["program"]] -= 1
+            if policy.share_key:
+                usage[task[policy.share_key]] -= 1
+
+        # New submissions
+        while (ntrace < len(trace)) and (trace[ntrace]["time"] <= now):
+            task = dict(trace[ntrace], id=ntrace)
+            task["created_on"] = start + datetime.timedelta(seconds=task["time"])
+            waiting[tuple(task[k] for k in partition)].append(task)
+            ntrace += 1
+            nwaiting += 1
+
+        # Manager pulls
+        for manager in range(nmanagers):
+            if (free[manager] == 0) or (nwaiting == 0):
+                continue
+
+            limit = free[manager]
+            heads = {k: [q.popleft() for x in range(min(limit, len(q)))] for k, q in waiting.items()}
+            candidates = [task for head in heads.values() for task in head]
+
+            affinity = {k for k, v in programs[manager].items() if v > 0}
+            now_dt = start + datetime.timedelta(seconds=now)
+            selected = set(policy.select(candidates, limit, dict(usage), affinity, now_dt))
+
+            for k, head in heads.items():
+                waiting[k].extendleft(reversed([task for task in head if task["id"] not in selected]))
+                if not waiting[k]:
+                    del waiting[k]
+
+            for task in candidates:
+                if task["id"] not in selected:
+                    continue
+
+                heapq.heappush(running, (now + task["duration"], manager, task["id"], task))
+                free[manager] -= 1
+                programs[manager][task["program"]] += 1
+                if policy.share_key:
+                    usage[task[policy.share_key]] += 1
+
+                waits[task["owner"]].append(now - task["time"])
+                nwaiting -= 1
+
+        now += interval
+
+    return now, waits
+
+
+def bench():
+    trace_file = sys.argv[1] if len(sys.argv) > 1 else None
+    nmanagers = int(sys.argv[2]) if len(sys.argv) > 2 else n_managers
+    nslots = int(sys.argv[3]) if len(sys.argv) > 3 else slots
+    interval = float(sys.argv[4]) if len(sys.argv) > 4 else pull_interval
+
+    if trace_file is None:
+        trace = synthetic_trace()
+    else:
+        with open(trace_file, "r") as handle:
+            trace = [json.loads(line) for line in handle if line.strip()]
+        for task in trace:
+            task.setdefault("tag", None)
+            task.setdefault("owner", None)
+
+    print("{} tasks, {} managers with {} slots, pulls every {:.0f} s".format(len(trace), nmanagers, nslots, interval))
+    for name, policy in policies.items():
+        makespan, waits = simulate(policy, trace, nmanagers, nslots, interval)
+        ntasks = sum(len(v) for v in waits.values())
+        print("\n{}: {:.0f} tasks / h, makespan {:.1f} h".format(name, ntasks / makespan * 3600, makespan / 3600))
+        for owner, values in sorted(waits.items(), key=lambda x: str(x[0])):
+            print('{:>16s}: {:6d} tasks, wait p50 {:8.0f} s, p99 {:8.0f} s'.format(
+                str(owner), len(values), percentile(values, 50), percentile(values, 99)))
+
+
+if __name__ == "__main__":
+    bench()
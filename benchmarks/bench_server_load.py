@@ -0,0 +1,118 @@
+"""
+This tests the latency of a FractalServer under a concurrent mix of manager and client requests
+
+Usage: python bench_server_load.py [n_threads] [duration] [storage_workers] [storage_uri]
+
+Each thread loops over manager heartbeats, task pulls, (empty) task returns and client result and
+molecule queries for `duration` seconds. The p50/p99 latency of every request type is reported.
+Without a storage_uri a temporary mongod is started by the FractalSnowflake.
+"""
+
+import random
+import sys
+import threading
+from collections import defaultdict
+from time import perf_counter, time
+
+import qcfractal
+import qcfractal.interface as portal
+
+n_threads = 16
+duration = 20
+n_molecules = 200
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def build_manager(client, num):
+    meta = {
+        "cluster": "bench",
+        "hostname": "host{}".format(num),
+        "uuid": "uuid{}".format(num),
+        "qcengine_version": "0",
+        "manager_version": "0",
+        "programs": ["bench"],
+        "procedures": [],
+    }
+
+    def request(method, data):
+        return lambda: client._automodel_request("queue_manager", method, {"meta": meta, "data": data})
+
+    return {
+        "heartbeat": request("put", {"operation": "heartbeat"}),
+        "manager get": request("get", {"limit": 10}),
+        "manager post": request("post", {}),
+    }
+
+
+def worker(server, num, mol_ids, end, latencies, lock):
+    client = portal.FractalClient(server)
+
+    ops = build_manager(client, num)
+    ops["query molecules"] = lambda: client.query_molecules(id=random.sample(mol_ids, 50))
+    ops["query results"] = lambda: client.query_results(molecule=random.choice(mol_ids), method="bench")
+
+    local = defaultdict(list)
+    names = list(ops)
+    while time() < end:
+        name = random.choice(names)
+        tstart = perf_counter()
+        ops[name]()
+        local[name].append((perf_counter() - tstart) * 1000)
+
+    with lock:
+        for k, v in local.items():
+            latencies[k].extend(v)
+
+
+def bench():
+    nthreads = int(sys.argv[1]) if len(sys.argv) > 1 else n_threads
+    dtime = float(sys.argv[2]) if len(sys.argv) > 2 else duration
+    storage_workers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    storage_uri = sys.argv[4] if len(sys.argv) > 4 else None
+
+    with qcfractal.FractalSnowflake(
+            max_workers=0, storage_uri=storage_uri, storage_project_name="bench_server_load") as server:
+
+        # Swap in a storage thread pool of the requested size, handlers pick it up on the next request
+        server.async_storage.shutdown()
+        server.async_storage = qcfractal.storage_sockets.AsyncStorageSocket(server.storage, max_workers=storage_workers)
+        server.objects["async_storage_socket"] = server.async_storage
+
+        client = portal.FractalClient(server)
+
+        water = portal.data.get_molecule("water_dimer_minima.psimol")
+        mols = [water.copy(update={"geometry": water.geometry + 0.01 * i}) for i in range(n_molecules)]
+        mol_ids = client.add_molecules(mols)
+
+        records = [
+            portal.models.ResultRecord(
+                molecule=mol_id, method="bench", basis="b" + str(i % 5), program="bench", driver="energy",
+                status="COMPLETE") for mol_id in mol_ids for i in range(5)
+        ]
+        server.storage.add_results(records)
+
+        latencies = defaultdict(list)
+        lock = threading.Lock()
+        end = time() + dtime
+        threads = [
+            threading.Thread(target=worker, args=(server, i, mol_ids, end, latencies, lock)) for i in range(nthreads)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        ntotal = sum(len(v) for v in latencies.values())
+        print("{} threads, {} storage workers: {} requests in {:.0f} s, {:.1f} requests / s".format(
+            nthreads, storage_workers, ntotal, dtime, ntotal / dtime))
+        for name, values in sorted(latencies.items()):
+            print('{:>16s}: {:6d} requests, p50 {:8.2f} ms, p99 {:8.2f} ms'.format(
+                name, len(values), percentile(values, 50), percentile(values, 99)))
+
+
+if __name__ == "__main__":
+    bench()
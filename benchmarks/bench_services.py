@@ -0,0 +1,70 @@
+"""
+This tests the throughput of FractalServer.update_services with many concurrent torsiondrives
+
+Usage: python bench_services.py [n_services] [service_workers] [n_iterations] [storage_uri]
+
+Torsiondrives of perturbed HOOH molecules are added to a FractalSnowflake without compute workers.
+The first update builds the initial optimizations of every service, the following updates find all
+services idle as none of their tasks finished, which is the steady state cost of tracking many services.
+Requires torsiondrive.
+Without a storage_uri a temporary mongod is started by the FractalSnowflake.
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+import qcfractal
+import qcfractal.interface as portal
+
+n_services = 200
+service_workers = 4
+n_iterations = 5
+
+
+def bench():
+    nservices = int(sys.argv[1]) if len(sys.argv) > 1 else n_services
+    nworkers = int(sys.argv[2]) if len(sys.argv) > 2 else service_workers
+    niterations = int(sys.argv[3]) if len(sys.argv) > 3 else n_iterations
+    storage_uri = sys.argv[4] if len(sys.argv) > 4 else None
+
+    with qcfractal.FractalSnowflake(
+            max_workers=0, storage_uri=storage_uri, storage_project_name="bench_services",
+            max_active_services=nservices) as server:
+
+        # Services are only updated below, swap in a service pool of the requested size
+        server.loop.add_callback(server.periodic["update_services"].stop)
+        server.service_executor.shutdown()
+        server.service_executor = ThreadPoolExecutor(max_workers=nworkers)
+
+        client = portal.FractalClient(server)
+
+        hooh = portal.data.get_molecule("hooh.json")
+        mols = [hooh.copy(update={"geometry": hooh.geometry + 0.001 * i}) for i in range(nservices)]
+        mol_ids = client.add_molecules(mols)
+
+        services = [
+            portal.models.TorsionDriveInput(
+                initial_molecule=[mol_id],
+                keywords={"dihedrals": [[0, 1, 2, 3]], "grid_spacing": [90]},
+                optimization_spec={"program": "geometric"},
+                qc_spec={"driver": "gradient", "method": "UFF", "basis": "", "keywords": None, "program": "rdkit"})
+            for mol_id in mol_ids
+        ]
+        client.add_service(services)
+
+        timings = []
+        for x in range(niterations):
+            tstart = perf_counter()
+            server.update_services()
+            timings.append(perf_counter() - tstart)
+
+        print("{} services, {} service workers".format(nservices, nworkers))
+        print("    first update: {:8.2f} s, {:6.1f} services / s".format(timings[0], nservices / timings[0]))
+        if len(timings) > 1:
+            steady = sum(timings[1:]) / len(timings[1:])
+            print("     idle update: {:8.2f} ms".format(steady * 1000))
+
+
+if __name__ == "__main__":
+    bench()
@@ -54,6 +54,7 @@ class FractalServerSettings(BaseSettings):
     username: str = None
     password: str = None
     verify: bool = None
+    encoding: str = None
 
     class Config(SettingsCommonConfig):
         pass
@@ -182,6 +183,13 @@ class ManagerSettings(BaseModel):
         extra = "forbid"
 
 
+def parse_walltime(walltime: str) -> int:
+    """Converts a scheduler walltime of the form [D-]HH:MM:SS to seconds."""
+    days, _, clock = walltime.rpartition("-")
+    seconds = sum(int(x) * 60**num for num, x in enumerate(reversed(clock.split(":"))))
+    return int(days or 0) * 86400 + seconds
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description='A CLI for a QCFractal QueueManager with a ProcessPoolExecutor or a Dask backend. '
@@ -212,6 +220,10 @@ def parse_args():
         "--verify",
         type=str,
         help="Do verify the SSL certificate, turn off for servers with custom SSL certificiates.")
+    server.add_argument(
+        "--encoding",
+        type=str,
+        help="The REST wire format: json, msgpack or msgpack-zstd. Binary formats reduce the size of task results.")
 
     # QueueManager options
     manager = parser.add_argument_group("QueueManager settings")
@@ -244,7 +256,7 @@ def parse_args():
     # Stupid we cannot inspect groups
     data = {
         "common": _build_subset(args, {"adapter", "ntasks", "ncores", "memory", "scratch_directory", "verbose"}),
-        "server": _build_subset(args, {"fractal_uri", "password", "username", "verify"}),
+        "server": _build_subset(args, {"fractal_uri", "password", "username", "verify", "encoding"}),
         "manager": _build_subset(args, {"max_tasks", "manager_name", "queue_tag", "log_file_prefix", "update_frequency",
                                         "test", "ntests"}),
     } # yapf: disable
@@ -301,6 +313,11 @@ def main(args=None):
     if cores_per_task < 1:
         raise ValueError("Cores per task must be larger than one!")
 
+    # Tasks of cluster adapters cannot outlive the jobs of their workers
+    walltime_per_task = None
+    if settings.common.adapter in ("dask", "parsl"):
+        walltime_per_task = parse_walltime(settings.cluster.walltime)
+
     if settings.common.adapter == "pool":
         from concurrent.futures import ProcessPoolExecutor
 
@@ -458,6 +475,7 @@ def main(args=None):
         update_frequency=settings.manager.update_frequency,
         cores_per_task=cores_per_task,
         memory_per_task=memory_per_task,
+        walltime_per_task=walltime_per_task,
         scratch_directory=settings.common.scratch_directory,
         verbose=settings.common.verbose
     )
@@ -4,7 +4,11 @@ A command line interface to the qcfractal server.
 
 import argparse
 
+import tornado.netutil
+import tornado.process
+
 import qcfractal
+from qcfractal.server import _write_ssl_files
 
 from . import cli_utils
 
@@ -25,6 +29,8 @@ def parse_args():
 
     manager = parser.add_argument_group('Manager Settings')
     manager.add_argument("--heartbeat-frequency", type=int, default=300, help="The manager heartbeat frequency.")
+    manager.add_argument("--service-workers", type=int, default=4, help="The number of threads iterating services concurrently.")
+    manager.add_argument("--scheduler", type=str, default="priority", choices=["priority", "fair_share"], help="The policy picking the tasks handed to managers.")
 
     security = parser.add_argument_group('Security Settings')
     security.add_argument(
@@ -39,9 +45,12 @@ def parse_args():
     general.add_argument("database_name", type=str, help="The name of the database to use with the storage socket")
     general.add_argument("--server-name", type=str, default="QCFractal Server", help="The server name to broadcast")
     general.add_argument("--query-limit", type=int, default=1000, help="The maximum query size to server")
+    general.add_argument("--storage-workers", type=int, default=8, help="The number of threads running database calls for the REST handlers")
     general.add_argument("--log-prefix", type=str, default=None, help="The logfile prefix to use")
     general.add_argument("--database-uri", type=str, default="mongodb://localhost", help="The database URI to use")
     general.add_argument("--port", type=int, default=7777, help="The server port")
+    general.add_argument("--response-cache-size", type=int, default=100, help="The size in MB of the response cache for immutable records, 0 disables the cache")
+    general.add_argument("--workers", type=int, default=1, help="The number of HTTP worker processes sharing the port, 0 starts one per CPU")
     general.add_argument("--compress-response", type=bool, default=True, help="Compress the response or not")
     general.add_argument("--config-file", type=str, default=None, help="A configuration file to use")
     general.add_argument("--start-periodics", type=bool, default=True, help="Start the periodic calls or not, always recommended unless running fractal-server behind a proxy")
@@ -74,6 +83,25 @@ def main(args=None):
         else:
             raise KeyError("Both tls-cert and tls-key must be passed in.")
 
+    # Pre-fork the HTTP workers, every worker builds its own IOLoop, storage socket and connection pool
+    sockets = None
+    start_periodics = args["start_periodics"]
+    if args["workers"] != 1:
+        if args["local_manager"]:
+            raise ValueError("A local QueueManager cannot be combined with multiple workers.")
+
+        # All workers must serve the same certificate
+        if ssl_options is True:
+            print("No SSL files passed in, generating self-signed SSL certificate.")
+            print("Clients must use `verify=False` when connecting.\n")
+            ssl_options = _write_ssl_files(args["server_name"])
+
+        sockets = tornado.netutil.bind_sockets(args["port"])
+        task_id = tornado.process.fork_processes(args["workers"] or None)
+
+        # Worker 0 alone runs the service iterations and heartbeat checks, it is restarted with the same id
+        start_periodics = start_periodics and (task_id == 0)
+
     # Handle Adapters/QueueManagers
     exit_callbacks = []
 
@@ -105,12 +133,19 @@ def main(args=None):
         storage_uri=args["database_uri"],
         storage_project_name=args["database_name"],
         query_limit=args["query_limit"],
+        storage_workers=args["storage_workers"],
+
+        # HTTP options
+        sockets=sockets,
+        response_cache_size=args["response_cache_size"],
 
         # Log options
         logfile_prefix=args["log_prefix"],
 
         # Queue options
         heartbeat_frequency=args["heartbeat_frequency"],
+        service_workers=args["service_workers"],
+        scheduler=args["scheduler"],
         queue_socket=adapter)
 
     # Add exit callbacks
@@ -121,7 +156,7 @@ def main(args=None):
     cli_utils.install_signal_handlers(server.loop, server.stop)
 
     # Blocks until keyboard interupt
-    server.start(start_periodics=args["start_periodics"])
+    server.start(start_periodics=start_periodics)
 
 
 if __name__ == '__main__':
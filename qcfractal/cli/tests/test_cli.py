@@ -27,6 +27,13 @@ def test_cli_server_local_boot():
     assert testing.run_process(args, interupt_after=10, **_options)
 
 
+@testing.mark_slow
+def test_cli_server_workers_boot():
+    port = "--port=" + str(testing.find_open_port())
+    args = ["qcfractal-server", "mydb", "--workers=2", port]
+    assert testing.run_process(args, interupt_after=10, **_options)
+
+
 @pytest.fixture(scope="module")
 def active_server(request):
     port = str(testing.find_open_port())
@@ -6,8 +6,10 @@ from . import collections
 from . import data
 from . import dict_utils
 from . import models
+from . import serialization
 
 # Add imports here
+from .cache import RecordCache
 from .client import FractalClient
 from .models import Molecule
 
@@ -0,0 +1,132 @@
+"""
+A client-side cache of immutable server objects (molecules, keyword sets and KVStore blobs).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .models import KeywordSet, Molecule
+
+# How each kind of object is written to and read from the on-disk layer
+_kinds = {
+    "molecule": (lambda x: x.json(), lambda x: Molecule.parse_raw(x)),
+    "keyword": (lambda x: x.json(), lambda x: KeywordSet.parse_raw(x)),
+    "kvstore": (json.dumps, json.loads),
+}
+
+
+class RecordCache:
+    """
+    Caches immutable server objects by id in a least recently used in-memory layer and, if a
+    path is given, in an SQLite database that persists between sessions.
+
+    Objects are keyed by the server address as well, so a single cache file can be shared by
+    clients of several servers. Only objects that never change once written are cached, the
+    cache is never invalidated.
+
+    Examples
+    --------
+
+    >>> cache = RecordCache("~/.qca/cache.sqlite")
+    >>> client = FractalClient("api.qcarchive.molssi.org:443", cache=cache)
+    """
+
+    def __init__(self, path: Optional[str]=None, memory_size: int=10000):
+        """
+        Parameters
+        ----------
+        path : Optional[str], optional
+            The SQLite file of the on-disk layer, if None objects are only cached in memory
+        memory_size : int, optional
+            The maximum number of objects held in memory
+        """
+
+        self.path = path
+        self.memory_size = memory_size
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = None
+        if path is not None:
+            path = os.path.expanduser(path)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+            # The client prefetches pages from background threads
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS objects "
+                             "(server TEXT, kind TEXT, id TEXT, value TEXT, PRIMARY KEY (server, kind, id))")
+            self._db.commit()
+
+    def __repr__(self) -> str:
+        return "RecordCache(path={}, memory_size={}, nmemory={})".format(
+            repr(self.path), self.memory_size, len(self._memory))
+
+    def _memory_put(self, key: Tuple[str, str, str], value: Any) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, server: str, kind: str, ids: Iterable[str]) -> Dict[str, Any]:
+        """
+        Returns the cached objects of the given ids in {id: object} format, missing ids are skipped.
+        """
+
+        ret = {}
+        missing = []
+        with self._lock:
+            for oid in ids:
+                value = self._memory.get((server, kind, oid))
+                if value is None:
+                    missing.append(oid)
+                else:
+                    self._memory.move_to_end((server, kind, oid))
+                    ret[oid] = value
+
+            if missing and (self._db is not None):
+                parse = _kinds[kind][1]
+
+                # Stay under the SQLite bind parameter limit
+                for i in range(0, len(missing), 900):
+                    chunk = missing[i:i + 900]
+                    query = "SELECT id, value FROM objects WHERE server = ? AND kind = ? AND id IN ({})".format(
+                        ", ".join("?" * len(chunk)))
+                    for oid, value in self._db.execute(query, [server, kind] + chunk):
+                        ret[oid] = parse(value)
+                        self._memory_put((server, kind, oid), ret[oid])
+
+        return ret
+
+    def put(self, server: str, kind: str, objects: Dict[str, Any]) -> None:
+        """
+        Caches objects given in {id: object} format.
+        """
+
+        if not objects:
+            return
+
+        with self._lock:
+            for oid, value in objects.items():
+                self._memory_put((server, kind, oid), value)
+
+            if self._db is not None:
+                dump = _kinds[kind][0]
+                self._db.executemany("INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?)",
+                                     [(server, kind, oid, dump(value)) for oid, value in objects.items()])
+                self._db.commit()
+
+    def clear(self) -> None:
+        """
+        Removes all objects from the memory and on-disk layers.
+        """
+
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM objects")
+                self._db.commit()
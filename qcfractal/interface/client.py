@@ -2,22 +2,73 @@
 
 import json
 import os
+import queue
+import threading
 from collections import defaultdict
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 
+import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from pydantic import ValidationError
 
+from .cache import RecordCache
 from .collections import collection_factory, collections_name_map
 from .models import GridOptimizationInput, Molecule, ObjectId, TorsionDriveInput, build_procedure
 from .models.rest_models import ComputeResponse, rest_model
+from .serialization import check_encoding, content_types, deserialize, get_encoding, serialize_model
 
 ### Common docs
 
 _common_docs = {"full_return": "Returns the full server response if True that contains additional metadata."}
 
+
+def _prefetch(iterator: Iterator[Any], depth: int=1) -> Iterator[Any]:
+    """Runs an iterator in a background thread so that up to `depth` items are fetched ahead of the consumer.
+
+    Exceptions raised by the iterator are re-raised in the consumer. The thread is stopped once the
+    consumer stops iterating.
+    """
+
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def worker():
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except Exception as exc:
+            put((done, exc))
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item, exc = items.get()
+            if exc is not None:
+                raise exc
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+
 ### Fractal Client
 
 
@@ -26,7 +77,12 @@ class FractalClient(object):
                  address: Union[str, 'FractalServer']='api.qcarchive.molssi.org:443',
                  username: Optional[str]=None,
                  password: Optional[str]=None,
-                 verify: bool=True):
+                 verify: bool=True,
+                 pool_size: int=10,
+                 retries: int=3,
+                 backoff_factor: float=0.1,
+                 encoding: str="json",
+                 cache: Union[bool, str, RecordCache]=False):
         """Initializes a FractalClient instance from an address and verification information.
 
         Parameters
@@ -42,8 +98,24 @@ class FractalClient(object):
             Verifies the SSL connection with a third party server. This may be False if a
             FractalServer was not provided a SSL certificate and defaults back to self-signed
             SSL keys.
+        pool_size : int, optional
+            The number of keep-alive connections to the server, set this to the number of
+            threads that share the client.
+        retries : int, optional
+            The number of times a request is retried on connection failures, or on 502/503/504
+            responses for GET and PUT requests.
+        backoff_factor : float, optional
+            The base delay in seconds between retries, doubled after each retry.
+        encoding : str, optional
+            The wire format of REST payloads, "json", "msgpack" or "msgpack-zstd". The binary encodings
+            send NumPy arrays as raw buffers and require the msgpack (and zstandard) modules on both ends.
+        cache : Union[bool, str, RecordCache], optional
+            Caches the molecules, keyword sets and KVStore blobs queried by id. True caches in memory,
+            a file path additionally persists the cache in an SQLite database between sessions.
         """
 
+        check_encoding(encoding)
+
         if hasattr(address, "get_address"):
             # We are a FractalServer-like object
             verify = address.client_verify
@@ -75,13 +147,36 @@ class FractalClient(object):
         if (username is not None) or (password is not None):
             self._headers["Authorization"] = json.dumps({"username": username, "password": password})
 
-        self._headers["content_type"] = 'application/json'
+        # A single session reuses connections across requests. The session state is never modified
+        # after this point so that it can be shared across threads.
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self._session = requests.Session()
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
 
         # Try to connect and pull general data
         self.server_info = self._request("get", "information", {}).json()
 
         self.server_name = self.server_info["name"]
 
+        # Servers without the encoding field only speak JSON
+        if encoding not in self.server_info.get("encodings", ["json"]):
+            raise ValueError("Server '{}' does not support the '{}' encoding.".format(self.server_name, encoding))
+        self.encoding = encoding
+
+        if cache is True:
+            cache = RecordCache()
+        elif isinstance(cache, str):
+            cache = RecordCache(cache)
+        elif cache is False:
+            cache = None
+        self.cache = cache
+
     def __str__(self) -> str:
         """A short representation of the current FractalClient.
 
@@ -99,16 +194,22 @@ class FractalClient(object):
                  service: str,
                  payload: Dict[str, Any]=None,
                  *,
-                 data: str=None,
+                 data: bytes=None,
                  noraise: bool=False,
-                 timeout=None):
+                 timeout=None,
+                 encoding: str="json"):
 
         addr = self.address + service
+        headers = {
+            **self._headers,
+            "Content-Type": content_types[encoding],
+            "Accept": content_types[encoding],
+        }
         kwargs = {
             "json": payload,
             "data": data,
             "timeout": timeout,
-            "headers": self._headers,
+            "headers": headers,
             "verify": self._verify,
         }
 
@@ -117,11 +218,11 @@ class FractalClient(object):
 
         try:
             if method == "get":
-                r = requests.get(addr, **kwargs)
+                r = self._session.get(addr, **kwargs)
             elif method == "post":
-                r = requests.post(addr, **kwargs)
+                r = self._session.post(addr, **kwargs)
             elif method == "put":
-                r = requests.put(addr, **kwargs)
+                r = self._session.put(addr, **kwargs)
             else:
                 raise KeyError("Method not understood: '{}'".format(method))
         except requests.exceptions.SSLError as exc:
@@ -144,7 +245,8 @@ class FractalClient(object):
                            rest: str,
                            payload: Dict[str, Any],
                            full_return: bool=False,
-                           timeout: int=None) -> Any:
+                           timeout: int=None,
+                           ndarray: bool=False) -> Any:
         """Automatic model request profiling and creation using rest_models
 
         Parameters
@@ -159,6 +261,8 @@ class FractalClient(object):
             Returns the full server response if True that contains additional metadata.
         timeout : int, optional
             Timeout time
+        ndarray : bool, optional
+            Keeps NumPy arrays of binary encodings as arrays rather than lists
 
         Returns
         -------
@@ -173,14 +277,89 @@ class FractalClient(object):
         except ValidationError as exc:
             raise TypeError(str(exc))
 
-        r = self._request(rest, name, data=payload.json(), timeout=timeout)
-        response = response_model.parse_raw(r.text)
+        r = self._request(
+            rest, name, data=serialize_model(payload, self.encoding), timeout=timeout, encoding=self.encoding)
+
+        # The server answers in JSON if it could not honor the requested encoding
+        data = deserialize(r.content, get_encoding(r.headers.get("Content-Type")), ndarray=ndarray)
+        response = response_model.parse_obj(data)
 
         if full_return:
             return response
         else:
             return response.data
 
+    def _iterate_pages(self, name: str, payload: Dict[str, Any], ndarray: bool=False) -> Iterator[Any]:
+        """Pages through a GET endpoint with its keyset cursor and yields the response of each page.
+        """
+
+        payload["meta"].update({"cursor": "", "count": False})
+        while True:
+            response = self._automodel_request(name, "get", payload, full_return=True, ndarray=ndarray)
+            yield response
+
+            if response.meta.next_cursor is None:
+                break
+            payload["meta"]["cursor"] = response.meta.next_cursor
+
+    def _iterate_request(self, name: str, payload: Dict[str, Any],
+                         parse: Optional[Callable[[List[Any]], List[Any]]]=None) -> Iterator[Any]:
+        """Pages through a GET endpoint and yields the records one at a time.
+
+        The next page is requested in a background thread while the current one is consumed, so
+        at most two pages are held in memory.
+
+        Parameters
+        ----------
+        name : str
+            The name of the REST endpoint
+        payload : Dict[str, Any]
+            The input dictionary, ``meta.limit`` sets the page size
+        parse : Callable, optional
+            Applied to the data of each page before it is yielded
+
+        Returns
+        -------
+        Iterator[Any]
+            The records of all pages
+        """
+
+        for response in _prefetch(self._iterate_pages(name, payload)):
+            data = response.data
+            if parse is not None:
+                data = parse(data)
+            yield from data
+
+    def _cached_query(self, kind: str, id: 'QueryObjectId',
+                      fetch: Callable[[List[str]], Dict[str, Any]]) -> Dict[str, Any]:
+        """Looks up immutable objects by id in the record cache and fetches only the missing ones.
+
+        Parameters
+        ----------
+        kind : str
+            The kind of object, "molecule", "keyword" or "kvstore"
+        id : QueryObjectId
+            The ids to look up
+        fetch : Callable
+            Fetches a list of ids from the server and returns the found objects in {id: object} format
+
+        Returns
+        -------
+        Dict[str, Any]
+            The found objects in {id: object} format
+        """
+
+        ids = list(dict.fromkeys([id] if isinstance(id, str) else id))
+
+        found = self.cache.get(self.address, kind, ids)
+        missing = [x for x in ids if x not in found]
+        if missing:
+            new = fetch(missing)
+            self.cache.put(self.address, kind, new)
+            found.update(new)
+
+        return {x: found[x] for x in ids if x in found}
+
     @classmethod
     def from_file(cls, load_path: Optional[str]=None) -> 'FractalClient':
         """Creates a new FractalClient from file. If no path is passed in, the
@@ -267,6 +446,10 @@ class FractalClient(object):
             A list of found KVStore objects in {"id": "value"} format
         """
 
+        if (self.cache is not None) and (not full_return):
+            fetch = lambda ids: self._automodel_request("kvstore", "get", {"meta": {}, "data": ids})
+            return self._cached_query("kvstore", id, fetch)
+
         return self._automodel_request("kvstore", "get", {"meta": {}, "data": id}, full_return=full_return)
 
 ### Molecule section
@@ -275,7 +458,10 @@ class FractalClient(object):
                         id: 'QueryObjectId'=None,
                         molecule_hash: 'QueryStr'=None,
                         molecular_formula: 'QueryStr'=None,
-                        full_return: bool=False) -> List[Molecule]:
+                        limit: Optional[int]=None,
+                        skip: int=0,
+                        iterate: bool=False,
+                        full_return: bool=False) -> Union[List[Molecule], Iterator[Molecule]]:
         """Queries molecules from the database.
 
         Parameters
@@ -286,23 +472,45 @@ class FractalClient(object):
             Queries the Molecule ``molecule_hash`` field.
         molecular_formula : QueryStr, optional
             Queries the Molecule ``molecular_formula`` field.
+        limit : Optional[int], optional
+            The maximum number of Molecules to query, or the page size if iterating.
+        skip : int, optional
+            The number of Molecules to skip in the query, used for pagination.
+        iterate : bool, optional
+            Returns an iterator over all matching Molecules that fetches them page by page
+            with the server cursor, ``skip`` and ``full_return`` are ignored.
         full_return : bool, optional
             Returns the full server response if True that contains additional metadata.
 
         Returns
         -------
-        List[Molecule]
+        Union[List[Molecule], Iterator[Molecule]]
             A list of found molecules.
         """
 
         payload = {
-            "meta": {},
+            "meta": {
+                "limit": limit,
+                "skip": skip
+            },
             "data": {
                 "id": id,
                 "molecule_hash": molecule_hash,
                 "molecular_formula": molecular_formula
             }
         }
+        if iterate:
+            return self._iterate_request("molecule", payload)
+
+        # Molecules never change, queries by id only download the molecules missing from the cache
+        if ((self.cache is not None) and (id is not None) and (molecule_hash is None) and (molecular_formula is None)
+                and (limit is None) and (skip == 0) and (not full_return)):
+
+            def fetch(ids):
+                return {mol.id: mol for mol in self._iterate_request("molecule", {"meta": {}, "data": {"id": ids}})}
+
+            return list(self._cached_query("molecule", id, fetch).values())
+
         response = self._automodel_request("molecule", "get", payload, full_return=full_return)
         return response
 
@@ -346,6 +554,14 @@ class FractalClient(object):
             The requested KeywordSet objects.
         """
 
+        if (self.cache is not None) and (id is not None) and (hash_index is None) and (not full_return):
+
+            def fetch(ids):
+                keywords = self._automodel_request("keyword", "get", {"meta": {}, "data": {"id": ids}})
+                return {kw.id: kw for kw in keywords}
+
+            return list(self._cached_query("keyword", id, fetch).values())
+
         payload = {"meta": {}, "data": {"id": id, "hash_index": hash_index}}
         return self._automodel_request("keyword", "get", payload, full_return=full_return)
 
@@ -471,6 +687,48 @@ class FractalClient(object):
         payload = {"meta": {"overwrite": overwrite}, "data": collection}
         return self._automodel_request("collection", "post", payload, full_return=full_return)
 
+    def update_collection(self,
+                          collection_type: str,
+                          name: str,
+                          updates: Optional[Dict[str, Dict[str, Any]]]=None,
+                          additions: Optional[Dict[str, List[Any]]]=None,
+                          full_return: bool=False) -> bool:
+        """Partially updates a Collection on the server, only the given entries are sent.
+
+        Parameters
+        ----------
+        collection_type : str
+            The type of the Collection
+        name : str
+            The name of the Collection
+        updates : Optional[Dict[str, Dict[str, Any]]], optional
+            Entries to set in mapping fields in {field: {key: value}} format, such as new or changed records.
+        additions : Optional[Dict[str, List[Any]]], optional
+            Items to add to set fields in {field: [items]} format, such as the history.
+        full_return : bool, optional
+            Returns the full server response if True that contains additional metadata.
+
+        Returns
+        -------
+        bool
+            True if the Collection was updated.
+        """
+
+        payload = {
+            "meta": {},
+            "data": {
+                "collection": collection_type,
+                "name": name,
+                "updates": updates or {},
+                "additions": additions or {}
+            }
+        }
+        response = self._automodel_request("collection", "put", payload, full_return=True)
+        if not response.meta.success:
+            raise KeyError("Collection update failed: {}".format(response.meta.error_description))
+
+        return response if full_return else response.data
+
 ### Results section
 
     def query_results(self,
@@ -484,6 +742,9 @@ class FractalClient(object):
                       keywords: 'QueryObjectId'=None,
                       status: 'QueryStr'="COMPLETE",
                       projection: 'QueryProjection'=None,
+                      limit: Optional[int]=None,
+                      skip: int=0,
+                      iterate: bool=False,
                       full_return: bool=False) -> Union[List['RecordResult'], Dict[str, Any]]:
         """Queries ResultRecords from the server.
 
@@ -509,6 +770,13 @@ class FractalClient(object):
             Queries the Result ``status`` field.
         projection : QueryProjection, optional
             Filters the returned fields, will return a dictionary rather than an object.
+        limit : Optional[int], optional
+            The maximum number of Results to query, or the page size if iterating.
+        skip : int, optional
+            The number of Results to skip in the query, used for pagination.
+        iterate : bool, optional
+            Returns an iterator over all matching Results that fetches them page by page
+            with the server cursor, ``skip`` and ``full_return`` are ignored.
         full_return : bool, optional
             Returns the full server response if True that contains additional metadata.
 
@@ -520,7 +788,9 @@ class FractalClient(object):
         """
         payload = {
             "meta": {
-                "projection": projection
+                "projection": projection,
+                "limit": limit,
+                "skip": skip
             },
             "data": {
                 "id": id,
@@ -534,18 +804,183 @@ class FractalClient(object):
                 "status": status,
             }
         }
-        response = self._automodel_request("result", "get", payload, full_return=True)
+        def parse(data):
+            # Add references back to the client
+            if not projection:
+                for result in data:
+                    result.client = self
+            return data
 
-        # Add references back to the client
-        if not projection:
-            for result in response.data:
-                result.client = self
+        if iterate:
+            return self._iterate_request("result", payload, parse=parse)
+
+        response = self._automodel_request("result", "get", payload, full_return=True)
+        parse(response.data)
 
         if full_return:
             return response
         else:
             return response.data
 
+    def iter_results(self,
+                     id: 'QueryObjectId'=None,
+                     task_id: 'QueryObjectId'=None,
+                     program: 'QueryStr'=None,
+                     molecule: 'QueryObjectId'=None,
+                     driver: 'QueryStr'=None,
+                     method: 'QueryStr'=None,
+                     basis: 'QueryStr'=None,
+                     keywords: 'QueryObjectId'=None,
+                     status: 'QueryStr'="COMPLETE",
+                     projection: 'QueryProjection'=None,
+                     page_size: Optional[int]=None) -> Iterator[Union['RecordResult', Dict[str, Any]]]:
+        """Iterates over all ResultRecords matching a query, unlike `query_results` this is not
+        truncated to the server query limit.
+
+        Results are fetched page by page, the next page is prefetched in a background thread
+        while the current one is consumed.
+
+        Parameters
+        ----------
+        id : QueryObjectId, optional
+            Queries the Result ``id`` field.
+        task_id : QueryObjectId, optional
+            Queries the Result ``task_id`` field.
+        program : QueryStr, optional
+            Queries the Result ``program`` field.
+        molecule : QueryObjectId, optional
+            Queries the Result ``molecule`` field.
+        driver : QueryStr, optional
+            Queries the Result ``driver`` field.
+        method : QueryStr, optional
+            Queries the Result ``method`` field.
+        basis : QueryStr, optional
+            Queries the Result ``basis`` field.
+        keywords : QueryObjectId, optional
+            Queries the Result ``keywords`` field.
+        status : QueryStr, optional
+            Queries the Result ``status`` field.
+        projection : QueryProjection, optional
+            Filters the returned fields, will yield dictionaries rather than objects.
+        page_size : Optional[int], optional
+            The number of Results per request, defaults to the server query limit.
+
+        Returns
+        -------
+        Iterator[Union[RecordResult, Dict[str, Any]]]
+            Yields the found RecordResult's without projection, or dictionaries with projection.
+        """
+
+        return self.query_results(
+            id=id,
+            task_id=task_id,
+            program=program,
+            molecule=molecule,
+            driver=driver,
+            method=method,
+            basis=basis,
+            keywords=keywords,
+            status=status,
+            projection=projection,
+            limit=page_size,
+            iterate=True)
+
+    def query_result_columns(self,
+                             fields: List[str],
+                             id: 'QueryObjectId'=None,
+                             task_id: 'QueryObjectId'=None,
+                             program: 'QueryStr'=None,
+                             molecule: 'QueryObjectId'=None,
+                             driver: 'QueryStr'=None,
+                             method: 'QueryStr'=None,
+                             basis: 'QueryStr'=None,
+                             keywords: 'QueryObjectId'=None,
+                             status: 'QueryStr'="COMPLETE",
+                             page_size: Optional[int]=None) -> Dict[str, Union[np.ndarray, List[Any]]]:
+        """Queries fields of all matching Results as columns, without building a record or dictionary
+        per Result.
+
+        Numeric fields are returned as float arrays with NaN for missing values, fields holding vectors
+        (such as gradients) as 2-D arrays with one row per Result. All other fields are lists. The ``id``
+        column is always present. Pages are fetched with the server cursor, with the msgpack encodings
+        the arrays are sent as raw buffers.
+
+        Parameters
+        ----------
+        fields : List[str]
+            The Result fields to return, such as ``["molecule", "return_result"]``.
+        id : QueryObjectId, optional
+            Queries the Result ``id`` field.
+        task_id : QueryObjectId, optional
+            Queries the Result ``task_id`` field.
+        program : QueryStr, optional
+            Queries the Result ``program`` field.
+        molecule : QueryObjectId, optional
+            Queries the Result ``molecule`` field.
+        driver : QueryStr, optional
+            Queries the Result ``driver`` field.
+        method : QueryStr, optional
+            Queries the Result ``method`` field.
+        basis : QueryStr, optional
+            Queries the Result ``basis`` field.
+        keywords : QueryObjectId, optional
+            Queries the Result ``keywords`` field.
+        status : QueryStr, optional
+            Queries the Result ``status`` field.
+        page_size : Optional[int], optional
+            The number of Results per request, defaults to the server query limit.
+
+        Returns
+        -------
+        Dict[str, Union[np.ndarray, List[Any]]]
+            The columns of the found Results in {field: column} format.
+
+        Examples
+        --------
+        >>> cols = client.query_result_columns(["molecule", "return_result"], method="hf", driver="gradient")
+        >>> cols["return_result"].shape
+        (1000, 18)
+        """
+
+        payload = {
+            "meta": {
+                "projection": {k: True for k in fields},
+                "limit": page_size
+            },
+            "data": {
+                "id": id,
+                "task_id": task_id,
+                "program": program,
+                "molecule": molecule,
+                "driver": driver,
+                "method": method,
+                "basis": basis,
+                "keywords": keywords,
+                "status": status
+            }
+        }
+
+        pages = {}
+        for response in _prefetch(self._iterate_pages("result_columns", payload, ndarray=True)):
+            for k, v in response.data.items():
+                if k in response.shapes:
+                    v = np.asarray(v, dtype=float).reshape(response.shapes[k])
+                pages.setdefault(k, []).append(v)
+
+        ret = {}
+        for k in ["id"] + [x for x in fields if x != "id"]:
+            chunks = [x for x in pages.get(k, []) if len(x)]
+            if chunks and all(isinstance(x, np.ndarray) for x in chunks):
+                # Vectors of different lengths across pages are left as a list of rows
+                if len({x.shape[1:] for x in chunks}) == 1:
+                    ret[k] = np.concatenate(chunks)
+                else:
+                    ret[k] = [row for x in chunks for row in x]
+            else:
+                ret[k] = [row for x in chunks for row in (x.tolist() if isinstance(x, np.ndarray) else x)]
+
+        return ret
+
     def query_procedures(self,
                          id: 'QueryObjectId'=None,
                          task_id: 'QueryObjectId'=None,
@@ -554,6 +989,9 @@ class FractalClient(object):
                          hash_index: 'QueryStr'=None,
                          status: 'QueryStr'="COMPLETE",
                          projection: 'QueryProjection'=None,
+                         limit: Optional[int]=None,
+                         skip: int=0,
+                         iterate: bool=False,
                          full_return: bool=False) -> Union[List['RecordBase'], Dict[str, Any]]:
         """Queries Procedures from the server.
 
@@ -573,6 +1011,13 @@ class FractalClient(object):
             Queries the Procedure ``status`` field.
         projection : QueryProjection, optional
             Filters the returned fields, will return a dictionary rather than an object.
+        limit : Optional[int], optional
+            The maximum number of Procedures to query, or the page size if iterating.
+        skip : int, optional
+            The number of Procedures to skip in the query, used for pagination.
+        iterate : bool, optional
+            Returns an iterator over all matching Procedures that fetches them page by page
+            with the server cursor, ``skip`` and ``full_return`` are ignored.
         full_return : bool, optional
             Returns the full server response if True that contains additional metadata.
 
@@ -585,7 +1030,9 @@ class FractalClient(object):
 
         payload = {
             "meta": {
-                "projection": projection
+                "projection": projection,
+                "limit": limit,
+                "skip": skip
             },
             "data": {
                 "id": id,
@@ -596,17 +1043,107 @@ class FractalClient(object):
                 "status": status,
             }
         }
-        response = self._automodel_request("procedure", "get", payload, full_return=True)
+        def parse(data):
+            if not projection:
+                for ind in range(len(data)):
+                    data[ind] = build_procedure(data[ind], client=self)
+            return data
+
+        if iterate:
+            return self._iterate_request("procedure", payload, parse=parse)
 
-        if not projection:
-            for ind in range(len(response.data)):
-                response.data[ind] = build_procedure(response.data[ind], client=self)
+        response = self._automodel_request("procedure", "get", payload, full_return=True)
+        parse(response.data)
 
         if full_return:
             return response
         else:
             return response.data
 
+    def iter_procedures(self,
+                        id: 'QueryObjectId'=None,
+                        task_id: 'QueryObjectId'=None,
+                        procedure: 'QueryStr'=None,
+                        program: 'QueryStr'=None,
+                        hash_index: 'QueryStr'=None,
+                        status: 'QueryStr'="COMPLETE",
+                        projection: 'QueryProjection'=None,
+                        page_size: Optional[int]=None) -> Iterator[Union['RecordBase', Dict[str, Any]]]:
+        """Iterates over all Procedures matching a query, unlike `query_procedures` this is not
+        truncated to the server query limit.
+
+        Procedures are fetched page by page, the next page is prefetched in a background thread
+        while the current one is consumed.
+
+        Parameters
+        ----------
+        id : QueryObjectId, optional
+            Queries the Procedure ``id`` field.
+        task_id : QueryObjectId, optional
+            Queries the Procedure ``task_id`` field.
+        procedure : QueryStr, optional
+            Queries the Procedure ``procedure`` field.
+        program : QueryStr, optional
+            Queries the Procedure ``program`` field.
+        hash_index : QueryStr, optional
+            Queries the Procedure ``hash_index`` field.
+        status : QueryStr, optional
+            Queries the Procedure ``status`` field.
+        projection : QueryProjection, optional
+            Filters the returned fields, will yield dictionaries rather than objects.
+        page_size : Optional[int], optional
+            The number of Procedures per request, defaults to the server query limit.
+
+        Returns
+        -------
+        Iterator[Union['RecordBase', Dict[str, Any]]]
+            Yields the found Procedures without projection, or dictionaries with projection.
+        """
+
+        return self.query_procedures(
+            id=id,
+            task_id=task_id,
+            procedure=procedure,
+            program=program,
+            hash_index=hash_index,
+            status=status,
+            projection=projection,
+            limit=page_size,
+            iterate=True)
+
+    def query_procedure_counts(self, id: 'QueryObjectId') -> Dict[str, Dict[str, Any]]:
+        """Counts the optimizations and gradient evaluations of Procedures on the server without
+        downloading the Procedures or their optimizations.
+
+        An optimization counts as a single optimization and the length of its trajectory, torsiondrives
+        and grid optimizations count their distinct optimizations and the sum of their trajectories.
+
+        Parameters
+        ----------
+        id : QueryObjectId
+            The Procedure ids to count, any number of ids are requested in chunks of the server query limit.
+
+        Returns
+        -------
+        Dict[str, Dict[str, Any]]
+            The ``status``, ``optimizations`` and ``gradients`` of each found Procedure in {id: counts} format.
+
+        Examples
+        --------
+        >>> client.query_procedure_counts(torsiondrive_id)
+        {'5c7896fb95d592ad07a2fe3b': {'status': 'COMPLETE', 'optimizations': 24, 'gradients': 187}}
+        """
+
+        ids = list(dict.fromkeys([id] if isinstance(id, str) else id))
+        chunk = self.server_info.get("query_limit", 1000)
+
+        ret = {}
+        for i in range(0, len(ids), chunk):
+            payload = {"meta": {}, "data": {"id": ids[i:i + chunk]}}
+            ret.update(self._automodel_request("procedure_counts", "get", payload))
+
+        return ret
+
     ### Compute section
 
     def add_compute(self,
@@ -618,6 +1155,7 @@ class FractalClient(object):
                     molecule: Union[ObjectId, Molecule, List[Union[str, Molecule]]],
                     priority: str=None,
                     tag: str=None,
+                    resources: Optional[Dict[str, float]]=None,
                     full_return: bool=False) -> ComputeResponse:
         """
         Adds a "single" compute to the server.
@@ -643,6 +1181,9 @@ class FractalClient(object):
             based off the string tags. These tags are arbitrary, but several examples are to
             use "large", "medium", "small" to denote the size of the job or "project1", "project2"
             to denote different projects.
+        resources : Dict[str, float], optional
+            The estimated "cores", "memory" (GiB) and "walltime" (seconds) of each task, managers are only
+            handed tasks that fit into their task slots. Missing estimates fit any manager.
         full_return : bool, optional
             Returns the full server response if True that contains additional metadata.
 
@@ -669,6 +1210,7 @@ class FractalClient(object):
                 "keywords": keywords,
                 "tag": tag,
                 "priority": priority,
+                "resources": resources,
             },
             "data": molecule
         }
@@ -682,6 +1224,7 @@ class FractalClient(object):
                       molecule: Union[ObjectId, Molecule, List[Union[str, Molecule]]],
                       priority: str=None,
                       tag: str=None,
+                      resources: Optional[Dict[str, float]]=None,
                       full_return: bool=False) -> ComputeResponse:
         """Adds a "single" Procedure to the server.
 
@@ -702,6 +1245,9 @@ class FractalClient(object):
             based off the string tags. These tags are arbitrary, but several examples are to
             use "large", "medium", "small" to denote the size of the job or "project1", "project2"
             to denote different projects.
+        resources : Dict[str, float], optional
+            The estimated "cores", "memory" (GiB) and "walltime" (seconds) of each task, managers are only
+            handed tasks that fit into their task slots. Missing estimates fit any manager.
         full_return : bool, optional
             Returns the full server response if True that contains additional metadata.
 
@@ -725,6 +1271,7 @@ class FractalClient(object):
                 "program": program,
                 "tag": tag,
                 "priority": priority,
+                "resources": resources,
             },
             "data": molecule
         }
@@ -737,6 +1284,9 @@ class FractalClient(object):
                     program: 'QueryStr'=None,
                     status: 'QueryStr'=None,
                     projection: 'QueryProjection'=None,
+                    limit: Optional[int]=None,
+                    skip: int=0,
+                    iterate: bool=False,
                     full_return: bool=False) -> List[Dict[str, Any]]:
         """Checks the status of tasks in the Fractal queue.
 
@@ -752,6 +1302,13 @@ class FractalClient(object):
             Queries the Services ``status`` field.
         projection : QueryProjection, optional
             Filters the returned fields, will return a dictionary rather than an object.
+        limit : Optional[int], optional
+            The maximum number of Tasks to query, or the page size if iterating.
+        skip : int, optional
+            The number of Tasks to skip in the query, used for pagination.
+        iterate : bool, optional
+            Returns an iterator over all matching Tasks that fetches them page by page
+            with the server cursor, ``skip`` and ``full_return`` are ignored.
         full_return : bool, optional
             Returns the full server response if True that contains additional metadata.
 
@@ -772,7 +1329,9 @@ class FractalClient(object):
 
         payload = {
             "meta": {
-                "projection": projection
+                "projection": projection,
+                "limit": limit,
+                "skip": skip
             },
             "data": {
                 "id": id,
@@ -782,6 +1341,9 @@ class FractalClient(object):
             }
         }
 
+        if iterate:
+            return self._iterate_request("task_queue", payload)
+
         return self._automodel_request("task_queue", "get", payload, full_return=full_return)
 
     def add_service(self,
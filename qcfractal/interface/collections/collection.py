@@ -7,6 +7,7 @@ Helper
 import abc
 import copy
 import json
+from contextlib import contextmanager
 from typing import Any, Dict, List, Optional, Set, Union
 
 import pandas as pd
@@ -45,6 +46,14 @@ class Collection(abc.ABC):
         # Create the data model
         self.data = self.DataModel(**kwargs)
 
+        # Changes since the last save that can be sent as a partial update, see `_mark_updated`. The
+        # snapshot is the data as stored on the server and catches changes that were not marked.
+        self._snapshot = None
+        self._updates = {}
+        self._additions = {}
+        self._batch_depth = 0
+        self._save_deferred = False
+
     class DataModel(BaseModel):
         """
         Internal Data structure base model typed by PyDantic
@@ -157,7 +166,9 @@ class Collection(abc.ABC):
 
         name = data.pop('name')
         # Allow PyDantic to handle type validation
-        return cls(name, client=client, **data)
+        ret = cls(name, client=client, **data)
+        ret._snapshot = ret.data.dict()
+        return ret
 
     def to_json(self, filename: Optional[str]=None):
         """
@@ -215,6 +226,10 @@ class Collection(abc.ABC):
         if self.data.name == "":
             raise AttributeError("Collection:save: {} must have a name!".format(class_name))
 
+        if self._batch_depth:
+            self._save_deferred = True
+            return self.data.id
+
         if client is None:
             if self.client is None:
                 raise AttributeError("Collection:save: {} does not own a Storage Database "
@@ -223,14 +238,88 @@ class Collection(abc.ABC):
 
         self._pre_save_prep(client)
 
-        # Add the database
+        # Add the database, known changes to a stored collection are sent on their own
+        data = self.data.dict()
         if (self.data.id == self.data.fields['id'].default):
-            self.data.id = client.add_collection(self.data.dict(), overwrite=False)
+            self.data.id = client.add_collection(data, overwrite=False)
+            data["id"] = self.data.id
+        elif self._only_marked_changes(data):
+            updates = {field: {k: data[field][k] for k in keys} for field, keys in self._updates.items()}
+            additions = {field: list(items) for field, items in self._additions.items()}
+
+            client.update_collection(class_name, self.data.name, updates=updates, additions=additions)
         else:
-            client.add_collection(self.data.dict(), overwrite=True)
+            client.add_collection(data, overwrite=True)
+
+        self._snapshot = data
+        self._updates = {}
+        self._additions = {}
+        self._save_deferred = False
 
         return self.data.id
 
+    @contextmanager
+    def batch(self) -> 'Collection':
+        """Defers all saves within the block to a single save when the block exits without an error.
+
+        Examples
+        --------
+
+        >>> with ds.batch():
+        ...     for name, mol in molecules.items():
+        ...         ds.add_entry(name, mol)
+        """
+
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+
+        if (self._batch_depth == 0) and self._save_deferred:
+            self.save()
+
+    def _mark_updated(self, field: str, key: str) -> None:
+        """
+        Records that an entry of a mapping field of the data changed, the next save of an already stored
+        Collection then only sends the marked entries. If the data changed in any other way the save
+        falls back to overwriting the full Collection.
+        """
+        self._updates.setdefault(field, set()).add(key)
+
+    def _mark_added(self, field: str, item: Any) -> None:
+        """
+        Records that an item was added to a set field of the data, see `_mark_updated`.
+        """
+        self._additions.setdefault(field, set()).add(item)
+
+    def _only_marked_changes(self, data: Dict[str, Any]) -> bool:
+        """
+        Checks if the data differs from the last stored data only by the marked entries, otherwise the
+        Collection must be saved in full. Marked keys containing "." or starting with "$" also need a
+        full save.
+        """
+        if (self._snapshot is None) or not (self._updates or self._additions):
+            return False
+
+        # Keys that cannot be a MongoDB field path are only saved in full
+        for keys in self._updates.values():
+            if any(("." in k) or k.startswith("$") for k in keys):
+                return False
+
+        expected = copy.copy(self._snapshot)
+        for field, keys in self._updates.items():
+            expected[field] = {**expected.get(field, {}), **{k: data[field][k] for k in keys if k in data[field]}}
+
+        for field, items in self._additions.items():
+            current = expected.get(field, set())
+            if isinstance(current, set):
+                expected[field] = current | set(items)
+            else:
+                expected[field] = list(current) + [x for x in items if x not in current]
+
+        return expected == data
+
 ### General helpers
 
     @staticmethod
@@ -291,6 +380,7 @@ class BaseProcedureDataset(Collection):
             raise KeyError(f"{self.__class__.__name__} '{name}' already present, use `overwrite=True` to replace.")
 
         self.data.specs[lname] = spec
+        self._mark_updated("specs", lname)
         self.save()
 
     def get_specification(self, name: str) -> Any:
@@ -348,6 +438,7 @@ class BaseProcedureDataset(Collection):
             raise KeyError(f"Record {name} already in the dataset.")
 
         self.data.records[lname] = record
+        self._mark_updated("records", lname)
         self.save()
 
     def get_entry(self, name: str) -> 'Record':
@@ -391,8 +482,7 @@ class BaseProcedureDataset(Collection):
             except KeyError:
                 pass
 
-        procedures = self.client.query_procedures(id=query_ids)
-        proc_lookup = {x.id: x for x in procedures}
+        proc_lookup = {x.id: x for x in self.client.iter_procedures(id=query_ids)}
 
         data = []
         for name, oid in mapper.items():
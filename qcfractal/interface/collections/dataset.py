@@ -545,10 +545,14 @@ class Dataset(Collection):
         ret = []
         for query_set in composition_planner(**query):
 
-            query_set["molecule"] = set(indexer.values())
-
-            query_set["projection"] = {"molecule": True, field: True}
-            records = pd.DataFrame(self.client.query_results(**query_set), columns=["molecule", field])
+            query_set["molecule"] = list(set(indexer.values()))
+
+            # Columns are assembled without a Python object per record, vectors arrive as a 2-D array
+            columns = self.client.query_result_columns(["molecule", field], **query_set)
+            values = columns[field]
+            if isinstance(values, np.ndarray) and (values.ndim > 1):
+                values = list(values)
+            records = pd.DataFrame({"molecule": columns["molecule"], field: values}, columns=["molecule", field])
 
             df = pd.DataFrame.from_dict(indexer, orient="index", columns=["molecule"])
             df.reset_index(inplace=True)
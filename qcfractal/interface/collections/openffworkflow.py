@@ -10,6 +10,7 @@ from .collection import Collection
 from .collection_utils import register_collection
 from ..models import (OptimizationRecord, OptimizationSpecification, QCSpecification, TorsionDriveInput,
                       TorsionDriveRecord)
+from ..models.records import _query_by_id
 
 
 class TorsionDriveStaticOptions(BaseModel):
@@ -247,8 +248,7 @@ class OpenFFWorkflow(Collection):
             lookup = list(set(lookup) - self._torsiondrive_cache.keys())
 
         # Grab the data and update cache
-        data = self.client.query_procedures(id=lookup)
-        self._torsiondrive_cache.update({x.id: x for x in data})
+        self._torsiondrive_cache.update({x.id: x for x in self.client.iter_procedures(id=lookup)})
 
     def list_final_energies(self, fragments=None, refresh_cache=False):
         """
@@ -318,6 +318,15 @@ class OpenFFWorkflow(Collection):
         # Get the data if available
         self.get_fragment_data(fragments=fragments, refresh_cache=refresh_cache)
 
+        # Fetch the molecules of all fragments at once
+        records = [
+            self._torsiondrive_cache[v] for frag in fragments for v in self.data.fragments[frag].values()
+            if v in self._torsiondrive_cache
+        ]
+        TorsionDriveRecord.prefetch_final_molecules([x for x in records if isinstance(x, TorsionDriveRecord)])
+        final_molecules = _query_by_id(self.client, "molecule",
+                                       [x.final_molecule for x in records if isinstance(x, OptimizationRecord)])
+
         ret = {}
         for frag in fragments:
             tmp = {}
@@ -327,7 +336,7 @@ class OpenFFWorkflow(Collection):
                     if isinstance(obj, TorsionDriveRecord):
                         tmp[k] = obj.get_final_molecules()
                     elif isinstance(obj, OptimizationRecord):
-                        tmp[k] = obj.get_final_molecule()
+                        tmp[k] = final_molecules[obj.final_molecule]
                     else:
                         raise TypeError("Internal type error encoured, buy a dev a coffee.")
                 else:
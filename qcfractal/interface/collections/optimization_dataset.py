@@ -118,7 +118,7 @@ class OptimizationDataset(BaseProcedureDataset):
             subset = set(subset)
 
         submitted = 0
-        for rec in self.data.records.values():
+        for lname, rec in self.data.records.items():
             if specification in rec.object_map:
                 continue
 
@@ -142,9 +142,11 @@ class OptimizationDataset(BaseProcedureDataset):
                 procedure_parameters, [rec.initial_molecule],
                 tag=tag,
                 priority=priority).ids[0]
+            self._mark_updated("records", lname)
             submitted += 1
 
         self.data.history.add(specification)
+        self._mark_added("history", specification)
         self.save()
         return submitted
 
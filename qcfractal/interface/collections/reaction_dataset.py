@@ -69,6 +69,7 @@ class ReactionDataset(Dataset):
 
         self.rxn_index = None
         self.valid_stoich = None
+        self._stoich_matrices = {}
         self._form_index()
 
     class DataModel(Dataset.DataModel):
@@ -92,6 +93,37 @@ class ReactionDataset(Dataset):
         self.rxn_index = pd.DataFrame(tmp_index, columns=["name", "stoichiometry", "molecule", "coefficient"])
         self.valid_stoich = set(self.rxn_index["stoichiometry"].unique())
 
+        # A sparse reaction by molecule coefficient matrix of each stoichiometry in coordinate format,
+        # (reaction names, reaction rows, molecule columns, coefficients, molecule ids)
+        self._stoich_matrices = {}
+        for stoich, group in self.rxn_index.groupby("stoichiometry", sort=False):
+            rows, names = pd.factorize(group["name"])
+            cols, molecules = pd.factorize(group["molecule"])
+            self._stoich_matrices[stoich] = (list(names), rows, cols, group["coefficient"].to_numpy(dtype=float),
+                                             list(molecules))
+
+    @staticmethod
+    def _values_matrix(values: 'Series') -> Optional[np.ndarray]:
+        """Returns query values as a float array with a row per molecule and NaN for missing values, or
+        None if the values are not numbers or equal length vectors.
+        """
+
+        if values.dtype.kind in "biuf":
+            return values.to_numpy(dtype=float)
+
+        missing = values.isnull().to_numpy()
+        try:
+            present = np.array(list(values[~missing]), dtype=float)
+        except (TypeError, ValueError):
+            return None
+
+        if (present.ndim > 2) or ((present.ndim == 2) and (len(present) == 0)):
+            return None
+
+        ret = np.full((len(values), ) + present.shape[1:], np.nan)
+        ret[~missing] = present
+        return ret
+
     def _validate_stoich(self, stoich):
         if stoich.lower() not in self.valid_stoich:
             raise KeyError("Stoichiometry not understood, valid keys are {}.".format(self.valid_stoich))
@@ -131,11 +163,29 @@ class ReactionDataset(Dataset):
         """
         self._check_state()
 
+        if stoich not in self._stoich_matrices:
+            return pd.DataFrame({field: []}, index=pd.Index([], name="name"))
+
+        # Evaluate the reactions as a sparse matrix-vector product, NaN values propagate through the sums
+        names, rows, cols, coefficients, molecules = self._stoich_matrices[stoich]
+        results = self._query({x: x for x in molecules}, keys, field=field)
+        values = results[field][~results.index.duplicated()]
+        values = self._values_matrix(values.reindex(molecules))
+
+        if values is not None:
+            terms = coefficients.reshape((-1, ) + (1, ) * (values.ndim - 1)) * values[cols]
+            if values.ndim == 1:
+                ret = np.bincount(rows, weights=terms, minlength=len(names))
+            else:
+                ret = np.zeros((len(names), ) + values.shape[1:])
+                np.add.at(ret, rows, terms)
+                ret = list(ret)
+
+            return pd.DataFrame({field: ret}, index=pd.Index(names, name="name"))
+
+        # Irregular values are summed by pandas
         tmp_idx = self.rxn_index[self.rxn_index["stoichiometry"] == stoich].copy()
         tmp_idx = tmp_idx.reset_index(drop=True)
-
-        indexer = {x: x for x in tmp_idx["molecule"]}
-        results = self._query(indexer, keys, field=field)
         tmp_idx = tmp_idx.join(results, on="molecule", how="left")
 
         # Apply stoich values
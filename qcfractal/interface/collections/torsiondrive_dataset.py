@@ -135,7 +135,7 @@ class TorsionDriveDataset(BaseProcedureDataset):
             subset = set(subset)
 
         submitted = 0
-        for rec in self.data.records.values():
+        for lname, rec in self.data.records.items():
             if specification in rec.object_map:
                 continue
 
@@ -149,9 +149,11 @@ class TorsionDriveDataset(BaseProcedureDataset):
                 qc_spec=spec.qc_spec)
 
             rec.object_map[spec.name] = self.client.add_service([service], tag=tag, priority=priority).ids[0]
+            self._mark_updated("records", lname)
             submitted += 1
 
         self.data.history.add(specification)
+        self._mark_added("history", specification)
         self.save()
         return submitted
 
@@ -160,7 +162,8 @@ class TorsionDriveDataset(BaseProcedureDataset):
                specs: Optional[Union[str, List[str]]]=None,
                count_gradients=False) -> 'DataFrame':
         """Counts the number of optimization or gradient evaluations associated with the
-        TorsionDrives.
+        TorsionDrives. An optimization repeated in the optimization history is counted once, as are
+        its gradient evaluations.
 
         Parameters
         ----------
@@ -169,7 +172,7 @@ class TorsionDriveDataset(BaseProcedureDataset):
         specs : Optional[Union[str, List[str]]], optional
             The specifications to query for
         count_gradients : bool, optional
-            If True, counts the total number of gradient calls. Warning! This can be slow for large datasets.
+            If True, counts the total number of gradient calls. The counts are aggregated on the server.
 
         Returns
         -------
@@ -194,21 +197,25 @@ class TorsionDriveDataset(BaseProcedureDataset):
             # Remap names
             specs = new_specs
 
+        # Gradients are counted on the server for all specs at once
+        gradient_counts = {}
+        if count_gradients:
+            ids = set()
+            for col in specs:
+                data = self.df[col][entries] if entries else self.df[col]
+                ids |= {td.id for td in data if getattr(td, "status", None) == "COMPLETE"}
+            gradient_counts = self.client.query_procedure_counts(list(ids))
+
         # Count functions
         def count_gradient_evals(td):
             if td.status != "COMPLETE":
                 return None
-
-            total_grads = 0
-            for key, optimizations in td.get_history().items():
-                for opt in optimizations:
-                    total_grads += len(opt.trajectory)
-            return total_grads
+            return gradient_counts[td.id]["gradients"]
 
         def count_optimizations(td):
             if td.status != "COMPLETE":
                 return None
-            return sum(len(v) for v in td.optimization_history.values())
+            return len({x for v in td.optimization_history.values() for x in v})
 
         # Loop over the data and apply the count function
         ret = []
@@ -9,7 +9,7 @@ from pydantic import BaseModel, constr, validator
 
 from .common_models import Molecule, ObjectId, OptimizationSpecification, QCSpecification
 from .model_utils import json_encoders, recursive_normalizer
-from .records import RecordBase
+from .records import RecordBase, _query_by_id
 
 __all__ = ["GridOptimizationInput", "GridOptimizationRecord"]
 
@@ -197,6 +197,31 @@ class GridOptimizationRecord(RecordBase):
 
         return self._organize_return(self.final_energy_dict, key)
 
+    @staticmethod
+    def prefetch_final_molecules(records: List['GridOptimizationRecord']) -> None:
+        """
+        Fetches the optimized molecules at each grid point of many GridOptimizationRecords in two paged
+        queries, one for the optimizations and one for their molecules.
+
+        Parameters
+        ----------
+        records : List[GridOptimizationRecord]
+            The records to fill, records that already hold their final molecules are skipped.
+        """
+
+        records = [r for r in records if "final_molecules" not in r.cache]
+        if len(records) == 0:
+            return
+
+        needed_ids = [x for r in records for x in r.grid_optimizations.values()]
+        procedures = _query_by_id(records[0].client, "procedure", needed_ids)
+        molecules = _query_by_id(records[0].client, "molecule", (procedures[x].final_molecule for x in needed_ids))
+
+        for r in records:
+            r.cache["final_molecules"] = {
+                k: molecules[procedures[v].final_molecule]
+                for k, v in r.grid_optimizations.items()
+            }
 
     def get_final_molecules(self, key: Union[int, str, None]=None) -> Dict[str, Any]:
         """
@@ -227,11 +252,7 @@ class GridOptimizationRecord(RecordBase):
         """
 
         if "final_molecules" not in self.cache:
-            ret = {}
-            for k, task_id in self.grid_optimizations.items():
-                task = self.client.query_procedures(id=task_id)[0]
-                ret[k] = task.get_final_molecule()
-            self.cache["final_molecules"] = ret
+            self.prefetch_final_molecules([self])
 
         data = self.cache["final_molecules"]
         return self._organize_return(data, key)
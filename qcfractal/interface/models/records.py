@@ -6,7 +6,7 @@ import abc
 import datetime
 import json
 from enum import Enum
-from typing import Any, Dict, List, Optional, Set, Union
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
 
 import qcelemental as qcel
 from pydantic import BaseModel, constr, validator
@@ -17,6 +17,26 @@ from .model_utils import hash_dictionary, json_encoders, prepare_basis, recursiv
 __all__ = ["OptimizationRecord", "ResultRecord", "OptimizationRecord"]
 
 
+def _query_by_id(client: Any, table: str, ids: Iterable[str]) -> Dict[str, Any]:
+    """
+    Fetches molecules or procedures by id in a single paged request and returns them in {id: object} format.
+    """
+
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}
+
+    if table == "molecule":
+        # Without iterating, molecule queries by id go through the client cache (which pages itself)
+        objects = client.query_molecules(id=ids, iterate=getattr(client, "cache", None) is None)
+    elif table == "procedure":
+        objects = client.query_procedures(id=ids, iterate=True)
+    else:
+        raise KeyError("Table '{}' not understood.".format(table))
+
+    return {x.id: x for x in objects}
+
+
 class RecordStatusEnum(str, Enum):
     complete = "COMPLETE"
     incomplete = "INCOMPLETE"
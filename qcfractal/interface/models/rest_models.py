@@ -103,6 +103,7 @@ class ResponseMeta(BaseModel):
 class ResponseGETMeta(ResponseMeta):
     missing: List[str]
     n_found: int
+    next_cursor: Optional[str] = None
 
     class Config(RESTConfig):
         pass
@@ -118,9 +119,18 @@ class ResponsePOSTMeta(ResponseMeta):
 
 
 class QueryMeta(BaseModel):
+    """Pagination of GET queries.
+
+    Offset pagination is done with ``limit`` and ``skip``. Setting ``cursor`` instead orders the
+    query by id and returns the records after the given id, an empty string starts from the first
+    record. The response ``next_cursor`` is set when more records may follow. ``count=False``
+    skips counting the total number of matches, ``n_found`` is then the number of records returned.
+    """
     projection: Optional[Dict[str, bool]] = None
     limit: Optional[int] = None
-    skip: Optional[int] = None
+    skip: int = 0
+    cursor: Optional[str] = None
+    count: bool = True
 
     class Config(RESTConfig):
         pass
@@ -192,7 +202,7 @@ class MoleculeGETBody(BaseModel):
         class Config(RESTConfig):
             pass
 
-    meta: EmptyMeta = {}
+    meta: QueryMeta = QueryMeta()
     data: Data
 
     class Config(RESTConfig):
@@ -357,6 +367,38 @@ class CollectionPOSTResponse(BaseModel):
 
 register_model("collection", "POST", CollectionPOSTBody, CollectionPOSTResponse)
 
+
+class CollectionPUTBody(BaseModel):
+    class Data(BaseModel):
+        collection: str
+        name: str
+        updates: Dict[str, Dict[str, Any]] = {}
+        additions: Dict[str, List[Any]] = {}
+
+        @validator("collection")
+        def cast_to_lower(cls, v):
+            return v.lower()
+
+        class Config(RESTConfig):
+            pass
+
+    meta: EmptyMeta = {}
+    data: Data
+
+    class Config(RESTConfig):
+        pass
+
+
+class CollectionPUTResponse(BaseModel):
+    data: bool
+    meta: ResponsePOSTMeta
+
+    class Config(RESTConfig):
+        pass
+
+
+register_model("collection", "PUT", CollectionPUTBody, CollectionPUTResponse)
+
 ### Result
 
 
@@ -389,7 +431,7 @@ class ResultGETBody(BaseModel):
                 v = 'null'
             return v
 
-    class Meta(BaseModel):
+    class Meta(QueryMeta):
         projection: Dict[str, Any] = None
 
         class Config(RESTConfig):
@@ -419,6 +461,20 @@ class ResultGETResponse(BaseModel):
 
 register_model("result", "GET", ResultGETBody, ResultGETResponse)
 
+
+class ResultColumnsGETResponse(BaseModel):
+    meta: ResponseGETMeta
+    # Field name to a NumPy array for numeric fields or a list otherwise
+    data: Dict[str, Any]
+    # The shape of each array, arrays are flattened in JSON
+    shapes: Dict[str, List[int]] = {}
+
+    class Config(RESTConfig):
+        pass
+
+
+register_model("result_columns", "GET", ResultGETBody, ResultColumnsGETResponse)
+
 ### Procedures
 
 
@@ -436,7 +492,7 @@ class ProcedureGETBody(BaseModel):
         class Config(RESTConfig):
             pass
 
-    class Meta(BaseModel):
+    class Meta(QueryMeta):
         projection: Dict[str, Any] = None
 
         class Config(RESTConfig):
@@ -459,6 +515,31 @@ class ProcedureGETResponse(BaseModel):
 
 register_model("procedure", "GET", ProcedureGETBody, ProcedureGETResponse)
 
+
+class ProcedureCountsGETBody(BaseModel):
+    class Data(BaseModel):
+        id: QueryObjectId
+
+        class Config(RESTConfig):
+            pass
+
+    meta: EmptyMeta = {}
+    data: Data
+
+    class Config(RESTConfig):
+        pass
+
+
+class ProcedureCountsGETResponse(BaseModel):
+    meta: ResponseGETMeta
+    data: Dict[str, Dict[str, Any]]
+
+    class Config(RESTConfig):
+        pass
+
+
+register_model("procedure_counts", "GET", ProcedureCountsGETBody, ProcedureCountsGETResponse)
+
 ### Task Queue
 
 
@@ -591,6 +672,11 @@ class QueueManagerMeta(BaseModel):
     procedures: List[str]
     tag: Optional[str] = None
 
+    # Resources of a task slot (cores, memory in GiB, walltime in seconds), None is unlimited
+    cores: Optional[int] = None
+    memory: Optional[float] = None
+    walltime: Optional[float] = None
+
     class Config(RESTConfig):
         pass
 
@@ -58,6 +58,12 @@ class TaskRecord(BaseModel):
     # Sortables
     priority: PriorityEnum = PriorityEnum.NORMAL
     tag: Optional[str] = None
+    owner: Optional[str] = None
+
+    # Estimated resources (cores, memory in GiB, walltime in seconds), None fits any manager
+    cores: Optional[int] = None
+    memory: Optional[float] = None
+    walltime: Optional[float] = None
 
     # Link back to the base Result
     base_result: Union[DBRef, int]
@@ -12,7 +12,7 @@ from qcelemental import constants
 
 from .common_models import Molecule, ObjectId, OptimizationSpecification, QCSpecification
 from .model_utils import json_encoders, recursive_normalizer
-from .records import RecordBase
+from .records import RecordBase, _query_by_id
 from ..visualization import scatter_plot
 
 __all__ = ["TorsionDriveInput", "TorsionDriveRecord"]
@@ -139,25 +139,69 @@ class TorsionDriveRecord(RecordBase):
         """
 
         if "history" not in self.cache:
+            self.prefetch_history([self])
 
-            # Grab procedures
-            needed_ids = [x for v in self.optimization_history.values() for x in v]
-            objects = self.client.query_procedures(id=needed_ids)
-            procedures = {v.id: v for v in objects}
+        data = self.cache["history"]
 
-            # Move procedures into the correct order
-            ret = {}
-            for okey, hashes in self.optimization_history.items():
-                tmp = []
-                for h in hashes:
-                    tmp.append(procedures[h])
-                ret[okey] = tmp
+        return self._organize_return(data, key, minimum=minimum)
 
-            self.cache["history"] = ret
+    @staticmethod
+    def prefetch_history(records: List['TorsionDriveRecord']) -> None:
+        """Fetches the optimization trajectories of many TorsionDriveRecords in a single paged query.
 
-        data = self.cache["history"]
+        Parameters
+        ----------
+        records : List[TorsionDriveRecord]
+            The records to fill, records that already hold their history are skipped.
+        """
 
-        return self._organize_return(data, key, minimum=minimum)
+        records = [r for r in records if "history" not in r.cache]
+        if len(records) == 0:
+            return
+
+        needed_ids = [x for r in records for v in r.optimization_history.values() for x in v]
+        procedures = _query_by_id(records[0].client, "procedure", needed_ids)
+
+        # Move procedures into the correct order
+        for r in records:
+            r.cache["history"] = {k: [procedures[h] for h in v] for k, v in r.optimization_history.items()}
+
+    @staticmethod
+    def prefetch_final_molecules(records: List['TorsionDriveRecord']) -> None:
+        """Fetches the optimized molecules at each grid point of many TorsionDriveRecords in two paged
+        queries, one for the minimum optimizations and one for their molecules.
+
+        Parameters
+        ----------
+        records : List[TorsionDriveRecord]
+            The records to fill, records that already hold their final molecules are skipped.
+
+        Examples
+        --------
+        >>> records = client.query_procedures(id=torsiondrive_ids)
+        >>> TorsionDriveRecord.prefetch_final_molecules(records)
+        >>> records[0].get_final_molecules()  # No further requests
+        """
+
+        records = [r for r in records if "final_molecules" not in r.cache]
+        if len(records) == 0:
+            return
+
+        # Only the optimizations at the minimum positions are needed
+        minimum_ids = {}
+        for r in records:
+            for k, v in r.optimization_history.items():
+                minimum_ids[(r.id, k)] = v[r.minimum_positions[k]]
+
+        procedures = _query_by_id(records[0].client, "procedure", minimum_ids.values())
+        molecules = _query_by_id(records[0].client, "molecule",
+                                 (procedures[x].final_molecule for x in minimum_ids.values()))
+
+        for r in records:
+            r.cache["final_molecules"] = {
+                k: molecules[procedures[minimum_ids[(r.id, k)]].final_molecule]
+                for k in r.optimization_history
+            }
 
     def get_final_energies(self, key: Union[int, Tuple[int, ...], str]=None) -> Dict[str, Any]:
         """
@@ -209,15 +253,7 @@ class TorsionDriveRecord(RecordBase):
         """
 
         if "final_molecules" not in self.cache:
-
-            ret = {}
-            for k, tasks in self.get_history().items():
-                k = self._serialize_key(k)
-                minpos = self.minimum_positions[k]
-
-                ret[k] = tasks[minpos].get_final_molecule()
-
-            self.cache["final_molecules"] = ret
+            self.prefetch_final_molecules([self])
 
         data = self.cache["final_molecules"]
 
@@ -0,0 +1,170 @@
+"""
+Encodings for REST payloads shared between the FractalClient and the FractalServer.
+
+JSON is always available. The binary "msgpack" encoding ships NumPy arrays as raw
+little-endian buffers, "msgpack-zstd" additionally compresses the packed payload.
+"""
+
+import functools
+import json
+from importlib.util import find_spec
+from typing import Any, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+from pydantic.json import pydantic_encoder
+
+# msgpack and zstandard are optional libraries
+_msgpack_found = find_spec("msgpack") is not None
+_zstd_found = find_spec("zstandard") is not None
+
+content_types = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+    "msgpack-zstd": "application/msgpack+zstd",
+}
+_content_type_encodings = {v: k for k, v in content_types.items()}
+
+# msgpack extension type code of NumPy arrays
+_NDARRAY_EXT = 1
+
+# Compression level of the zstd encoding, favors speed over ratio
+_ZSTD_LEVEL = 3
+
+
+def available_encodings() -> List[str]:
+    """
+    Returns the encodings supported by the installed libraries
+    """
+    ret = ["json"]
+    if _msgpack_found:
+        ret.append("msgpack")
+        if _zstd_found:
+            ret.append("msgpack-zstd")
+
+    return ret
+
+
+def check_encoding(encoding: str) -> None:
+    """
+    Raises if the encoding is unknown or its libraries are not installed
+    """
+    if encoding not in content_types:
+        raise KeyError("Encoding '{}' not understood, available encodings: {}".format(
+            encoding, list(content_types)))
+
+    if encoding not in available_encodings():
+        raise ModuleNotFoundError(
+            "Encoding '{}' requires msgpack and zstandard. Please 'pip install msgpack zstandard'.".format(encoding))
+
+
+def get_encoding(header: Optional[str]) -> str:
+    """
+    Finds the encoding of a Content-Type or Accept header, defaults to JSON.
+
+    Only the first media type of an Accept header is considered, unknown media types
+    (such as "*/*") and encodings whose libraries are not installed fall back to JSON.
+    """
+    if not header:
+        return "json"
+
+    media_type = header.split(",")[0].split(";")[0].strip().lower()
+    encoding = _content_type_encodings.get(media_type, "json")
+    if encoding not in available_encodings():
+        return "json"
+
+    return encoding
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return obj.flatten().tolist()
+    elif isinstance(obj, np.generic):
+        return obj.item()
+
+    return pydantic_encoder(obj)
+
+
+def _msgpack_default(obj: Any) -> Any:
+    import msgpack
+
+    if isinstance(obj, np.ndarray) and (obj.dtype.kind in "biufc"):
+        arr = np.ascontiguousarray(obj, dtype=obj.dtype.newbyteorder("<"))
+        header = msgpack.packb([arr.dtype.str, list(arr.shape)], use_bin_type=True)
+        return msgpack.ExtType(_NDARRAY_EXT, header + arr.tobytes())
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, np.generic):
+        return obj.item()
+
+    return pydantic_encoder(obj)
+
+
+def _msgpack_ext_hook(code: int, data: bytes, ndarray: bool=False) -> Any:
+    import msgpack
+
+    if code == _NDARRAY_EXT:
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(data)
+        dtype, shape = unpacker.unpack()
+        arr = np.frombuffer(data, dtype=dtype, offset=unpacker.tell())
+
+        if ndarray:
+            # Copy out of the message buffer so that the array is writable
+            return arr.reshape(shape).copy()
+        else:
+            return arr.tolist()
+
+    return msgpack.ExtType(code, data)
+
+
+def serialize(data: Any, encoding: str) -> bytes:
+    """
+    Serializes plain Python data (with NumPy arrays) in the given encoding
+    """
+    if encoding == "json":
+        return json.dumps(data, default=_json_default).encode("UTF-8")
+
+    check_encoding(encoding)
+    import msgpack
+
+    blob = msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+    if encoding == "msgpack-zstd":
+        import zstandard
+        blob = zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(blob)
+
+    return blob
+
+
+def deserialize(blob: bytes, encoding: str, ndarray: bool=False) -> Any:
+    """
+    Deserializes a payload from the given encoding.
+
+    NumPy arrays are returned as flat lists, the same as the JSON encoding, so that
+    the models validate identically for every encoding. If ndarray is True the arrays
+    are rebuilt with their dtype and shape instead.
+    """
+    if encoding == "json":
+        if isinstance(blob, bytes):
+            blob = blob.decode("UTF-8")
+        return json.loads(blob)
+
+    check_encoding(encoding)
+    import msgpack
+
+    if encoding == "msgpack-zstd":
+        import zstandard
+        blob = zstandard.ZstdDecompressor().decompress(blob)
+
+    ext_hook = functools.partial(_msgpack_ext_hook, ndarray=ndarray)
+    return msgpack.unpackb(blob, ext_hook=ext_hook, raw=False)
+
+
+def serialize_model(model: BaseModel, encoding: str) -> bytes:
+    """
+    Serializes a pydantic model, JSON goes through the model's own encoders
+    """
+    if encoding == "json":
+        return model.json().encode("UTF-8")
+
+    return serialize(model.dict(), encoding)
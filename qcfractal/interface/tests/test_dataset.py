@@ -2,6 +2,8 @@
 Tests the QCPortal dataset object
 """
 
+import numpy as np
+import pandas as pd
 import pytest
 
 from . import portal
@@ -244,3 +246,30 @@ def test_database_history():
     assert ds.list_history(program="P1").shape[0] == 4
     assert ds.list_history(basis=None).shape[0] == 3
     assert ds.list_history(keywords=None).shape[0] == 1
+
+
+def test_rxn_unroll_query(monkeypatch):
+    ds = portal.collections.ReactionDataset("unroll", ds_type="rxn")
+
+    stoichs = {"r1": {"a": 1.0, "b": -1.0}, "r2": {"b": 2.0, "c": -1.0}, "r3": {"a": 0.5, "b": 0.5}}
+    ds.data.records = [
+        portal.collections.reaction_dataset.ReactionRecord(
+            name=k, stoichiometry={"default": v}, attributes={}, reaction_results={}) for k, v in stoichs.items()
+    ]
+    ds._form_index()
+
+    def query(values):
+        return lambda indexer, keys, field: pd.DataFrame({field: [values[x] for x in indexer]}, index=list(indexer))
+
+    # Any missing molecule makes the reaction missing
+    monkeypatch.setattr(ds, "_query", query({"a": 1.0, "b": 4.0, "c": None}))
+    ret = ds._unroll_query({}, "default")["return_result"]
+    assert ret["r1"] == -3.0
+    assert np.isnan(ret["r2"])
+    assert ret["r3"] == 2.5
+
+    # Vectors are summed elementwise
+    monkeypatch.setattr(ds, "_query", query({"a": [1.0, 2.0], "b": [3.0, 4.0], "c": [0.0, 1.0]}))
+    ret = ds._unroll_query({}, "default")["return_result"]
+    assert ret["r1"].tolist() == [-2.0, -2.0]
+    assert ret["r2"].tolist() == [6.0, 7.0]
@@ -0,0 +1,71 @@
+"""
+Tests for the REST payload encodings.
+"""
+
+import numpy as np
+import pytest
+
+from . import portal
+
+serialization = portal.serialization
+
+encodings = [
+    pytest.param(
+        enc, marks=pytest.mark.skipif(enc not in serialization.available_encodings(), reason="Missing " + enc))
+    for enc in serialization.content_types
+]
+
+
+@pytest.mark.parametrize("encoding", encodings)
+def test_serialize_roundtrip(encoding):
+
+    data = {"a": [1, "b", None, True], "b": {"nested": 5.5}, "c": np.arange(6.0).reshape(2, 3)}
+    ret = serialization.deserialize(serialization.serialize(data, encoding), encoding)
+
+    # Arrays come back flattened for every encoding
+    assert ret == {"a": [1, "b", None, True], "b": {"nested": 5.5}, "c": [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]}
+
+
+@pytest.mark.parametrize("encoding", [x for x in encodings if x.values[0] != "json"])
+@pytest.mark.parametrize("dtype", ["<f8", ">f8", "<i4", ">i8", "bool", "complex128"])
+def test_serialize_ndarray(encoding, dtype):
+
+    arr = (np.arange(12) % 3).reshape(4, 3).astype(dtype)
+    blob = serialization.serialize({"arr": arr, "slice": arr[:, 1]}, encoding)
+    ret = serialization.deserialize(blob, encoding, ndarray=True)
+
+    for key, ref in [("arr", arr), ("slice", arr[:, 1])]:
+        assert ret[key].shape == ref.shape
+        assert ret[key].dtype == ref.dtype.newbyteorder("<")
+        assert ret[key].flags.writeable
+        assert np.array_equal(ret[key], ref)
+
+
+@pytest.mark.parametrize("encoding", encodings)
+def test_serialize_model(encoding):
+
+    mol = portal.data.get_molecule("water_dimer_minima.psimol")
+    payload = portal.models.rest_models.MoleculePOSTBody(meta={}, data=[mol])
+
+    blob = serialization.serialize_model(payload, encoding)
+    ret = portal.models.rest_models.MoleculePOSTBody.parse_obj(serialization.deserialize(blob, encoding))
+    assert mol.compare(ret.data[0])
+
+
+@pytest.mark.parametrize("header, encoding", [
+    (None, "json"),
+    ("*/*", "json"),
+    ("application/json", "json"),
+    ("application/msgpack; charset=binary", "msgpack"),
+    ("application/msgpack+zstd, application/json", "msgpack-zstd"),
+])
+def test_get_encoding(header, encoding):
+    if encoding not in serialization.available_encodings():
+        encoding = "json"
+
+    assert serialization.get_encoding(header) == encoding
+
+
+def test_check_encoding():
+    with pytest.raises(KeyError):
+        serialization.check_encoding("pickle")
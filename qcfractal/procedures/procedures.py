@@ -58,6 +58,23 @@ class BaseTasks:
     def parse_output(self, data):
         raise TypeError("parse_output not defined")
 
+    def _get_base_records(self, getter, outputs):
+        """Fetches the base records of a list of completed tasks with as few queries as the query limit allows.
+
+        Returns a dictionary of {id: record dict}.
+        """
+
+        ids = list({x["base_result"].id for x in outputs})
+        chunk_size = self.storage.get_limit(None)
+
+        records = {}
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            for rec in getter(id=chunk, limit=len(chunk), count=False)["data"]:
+                records[rec["id"]] = rec
+
+        return records
+
 
 class SingleResultTasks(BaseTasks):
     """A task generator for a single Result.
@@ -104,6 +121,8 @@ class SingleResultTasks(BaseTasks):
         # Grab the tag if available
         tag = data.meta.pop("tag", None)
         priority = data.meta.pop("priority", None)
+        owner = data.meta.pop("owner", None)
+        resources = data.meta.pop("resources", None) or {}
 
         # Construct full tasks
         new_tasks = []
@@ -139,6 +158,10 @@ class SingleResultTasks(BaseTasks):
                 "program": data.meta["program"],
                 "tag": tag,
                 "priority": priority,
+                "owner": owner,
+                "cores": resources.get("cores"),
+                "memory": resources.get("memory"),
+                "walltime": resources.get("walltime"),
                 "base_result": {
                     "ref": "result",
                     "id": base_id
@@ -151,19 +174,19 @@ class SingleResultTasks(BaseTasks):
 
     def parse_output(self, result_outputs):
 
+        # Fetch all base records and store all outputs in a single round trip each
+        records = self._get_base_records(self.storage.get_results, result_outputs)
+        blob_ids = self.storage.add_kvstore(
+            [x["result"][k] for x in result_outputs for k in ("stdout", "stderr", "error")])["data"]
+
         # Add new runs to database
         completed_tasks = []
         updates = []
-        for data in result_outputs:
-            result = self.storage.get_results(id=data["base_result"].id)["data"][0]
-            result = ResultRecord(**result)
+        for num, data in enumerate(result_outputs):
+            result = ResultRecord(**records[data["base_result"].id])
 
             rdata = data["result"]
-            stdout, stderr, error = self.storage.add_kvstore([rdata["stdout"], rdata["stderr"],
-                                                              rdata["error"]])["data"]
-            rdata["stdout"] = stdout
-            rdata["stderr"] = stderr
-            rdata["error"] = error
+            rdata["stdout"], rdata["stderr"], rdata["error"] = blob_ids[3 * num:3 * num + 3]
 
             result.consume_output(rdata)
             updates.append(result)
@@ -257,6 +280,8 @@ class OptimizationTasks(BaseTasks):
 
         tag = data.meta.pop("tag", None)
         priority = data.meta.pop("priority", None)
+        owner = data.meta.pop("owner", None)
+        resources = data.meta.pop("resources", None) or {}
 
         new_tasks = []
         results_ids = []
@@ -299,6 +324,10 @@ class OptimizationTasks(BaseTasks):
                 "procedure": data.meta["program"],
                 "tag": tag,
                 "priority": priority,
+                "owner": owner,
+                "cores": resources.get("cores"),
+                "memory": resources.get("memory"),
+                "walltime": resources.get("walltime"),
                 "base_result": {
                     "ref": "procedure",
                     "id": base_id
@@ -315,39 +344,46 @@ class OptimizationTasks(BaseTasks):
         including the task_id in the TaskQueue table
         """
 
+        records = self._get_base_records(self.storage.get_procedures, opt_outputs)
+
+        # Add initial and final molecules
+        mol_ids = self.storage.add_molecules([
+            Molecule(**x["result"][k]) for x in opt_outputs for k in ("initial_molecule", "final_molecule")
+        ])["data"]
+
+        # Save stdout/stderr
+        blob_ids = self.storage.add_kvstore(
+            [x["result"][k] for x in opt_outputs for k in ("stdout", "stderr", "error")])["data"]
+
+        # Parse the trajectory computations of all procedures together and add task_id
+        traj_dict = {}
+        for num, output in enumerate(opt_outputs):
+            for step, v in enumerate(output["result"]["trajectory"]):
+                traj_dict[(num, step)] = v
+
+        results = parse_single_tasks(self.storage, traj_dict)
+        for k, v in results.items():
+            v["task_id"] = opt_outputs[k[0]]["task_id"]
+            results[k] = ResultRecord(**v)
+
+        traj_ids = dict(zip(results.keys(), self.storage.add_results(list(results.values()))["data"]))
+
         completed_tasks = []
         updates = []
-        for output in opt_outputs:
-            rec = self.storage.get_procedures(id=output["base_result"].id)["data"][0]
-            rec = OptimizationRecord(**rec)
+        for num, output in enumerate(opt_outputs):
+            rec = OptimizationRecord(**records[output["base_result"].id])
 
             procedure = output["result"]
 
-            # Add initial and final molecules
             update_dict = {}
-            initial_mol, final_mol = self.storage.add_molecules(
-                [Molecule(**procedure["initial_molecule"]),
-                 Molecule(**procedure["final_molecule"])])["data"]
+            initial_mol, final_mol = mol_ids[2 * num:2 * num + 2]
             assert initial_mol == rec.initial_molecule
             update_dict["final_molecule"] = final_mol
 
-            # Parse trajectory computations and add task_id
-            traj_dict = {k: v for k, v in enumerate(procedure["trajectory"])}
-            results = parse_single_tasks(self.storage, traj_dict)
-            for k, v in results.items():
-                v["task_id"] = output["task_id"]
-                results[k] = ResultRecord(**v)
-
-            ret = self.storage.add_results(list(results.values()))
-            update_dict["trajectory"] = ret["data"]
+            update_dict["trajectory"] = [traj_ids[(num, step)] for step in range(len(procedure["trajectory"]))]
             update_dict["energies"] = procedure["energies"]
 
-            # Save stdout/stderr
-            stdout, stderr, error = self.storage.add_kvstore(
-                [procedure["stdout"], procedure["stderr"], procedure["error"]])["data"]
-            update_dict["stdout"] = stdout
-            update_dict["stderr"] = stderr
-            update_dict["error"] = error
+            update_dict["stdout"], update_dict["stderr"], update_dict["error"] = blob_ids[3 * num:3 * num + 3]
             update_dict["provenance"] = procedure["provenance"]
 
             rec = OptimizationRecord(**{**rec.dict(), **update_dict})
@@ -102,11 +102,12 @@ def parse_single_tasks(storage, results):
 
     """
 
-    for k, v in results.items():
-        stdout, stderr, error = storage.add_kvstore([v["stdout"], v["stderr"], v["error"]])["data"]
-        v["stdout"] = stdout
-        v["stderr"] = stderr
-        v["error"] = error
+    # Store all outputs and molecules in a single round trip each
+    blob_ids = storage.add_kvstore([v[x] for v in results.values() for x in ("stdout", "stderr", "error")])["data"]
+    mol_ids = storage.add_molecules([Molecule(**v["molecule"]) for v in results.values()])["data"]
+
+    for num, (k, v) in enumerate(results.items()):
+        v["stdout"], v["stderr"], v["error"] = blob_ids[3 * num:3 * num + 3]
 
         # Flatten data back out
         v["method"] = v["model"]["method"]
@@ -114,7 +115,7 @@ def parse_single_tasks(storage, results):
         del v["model"]
 
         # Molecule should be by ID
-        v["molecule"] = storage.add_molecules([Molecule(**v["molecule"])])["data"][0]
+        v["molecule"] = mol_ids[num]
 
         v["keywords"] = v["extras"]["_qcfractal_tags"]["keywords"]
         v["program"] = v["extras"]["_qcfractal_tags"]["program"]
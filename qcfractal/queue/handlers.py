@@ -20,42 +20,52 @@ class TaskQueueHandler(APIHandler):
 
     _required_auth = "compute"
 
-    def post(self):
+    async def post(self):
         """Posts new tasks to the task queue.
         """
 
         body_model, response_model = rest_model("task_queue", "post")
         body = self.parse_bodymodel(body_model)
 
+        # Tasks are scheduled as the authenticated user, never as an owner named in the request
+        body.meta["owner"] = self.username
+
         # Format and submit tasks
         if not check_procedure_available(body.meta["procedure"]):
             raise tornado.web.HTTPError(status_code=400, reason="Unknown procedure {}.".format(body.meta["procedure"]))
 
-        procedure_parser = get_procedure_parser(body.meta["procedure"], self.storage, self.logger)
+        # The parsers work on the blocking socket and run on the storage thread pool as a whole
+        procedure_parser = get_procedure_parser(body.meta["procedure"], self.storage.socket, self.logger)
 
         # Verify the procedure
         verify = procedure_parser.verify_input(body)
         if verify is not True:
             raise tornado.web.HTTPError(status_code=400, reason=verify)
 
-        payload = procedure_parser.submit_tasks(body)
+        payload = await self.storage.run(procedure_parser.submit_tasks, body)
         response = response_model(**payload)
 
         self.logger.info("POST: TaskQueue -  Added {} tasks.".format(response.meta.n_inserted))
-        self.write(response.json())
+        self.write_model(response)
 
-    def get(self):
+    async def get(self):
         """Posts new services to the service queue.
         """
 
         body_model, response_model = rest_model("task_queue", "get")
         body = self.parse_bodymodel(body_model)
 
-        tasks = self.storage.get_queue(**body.data.dict(), projection=body.meta.projection)
+        tasks = await self.storage.get_queue(
+            **body.data.dict(),
+            projection=body.meta.projection,
+            limit=body.meta.limit,
+            skip=body.meta.skip,
+            cursor=body.meta.cursor,
+            count=body.meta.count)
         response = response_model(**tasks)
 
         self.logger.info("GET: TaskQueue - {} pulls.".format(len(response.data)))
-        self.write(response.json())
+        self.write_model(response)
 
 
 class ServiceQueueHandler(APIHandler):
@@ -65,49 +75,67 @@ class ServiceQueueHandler(APIHandler):
 
     _required_auth = "compute"
 
-    def post(self):
-        """Posts new services to the service queue.
+    def _build_services(self, body):
+        """Builds the service objects of a POST body, runs on the storage thread pool.
         """
 
-        body_model, response_model = rest_model("service_queue", "post")
-        body = self.parse_bodymodel(body_model)
+        storage = self.storage.socket
 
         new_services = []
         for service_input in body.data:
             # Get molecules with ids
             if isinstance(service_input.initial_molecule, list):
-                molecules = self.storage.get_add_molecules_mixed(service_input.initial_molecule)["data"]
+                molecules = storage.get_add_molecules_mixed(service_input.initial_molecule)["data"]
                 if len(molecules) != len(service_input.initial_molecule):
                     raise KeyError("We should catch this error.")
             else:
-                molecules = self.storage.get_add_molecules_mixed([service_input.initial_molecule])["data"][0]
+                molecules = storage.get_add_molecules_mixed([service_input.initial_molecule])["data"][0]
 
             # Update the input and build a service object
             service_input = service_input.copy(update={"initial_molecule": molecules})
             new_services.append(
                 initialize_service(
-                    self.storage, self.logger, service_input, tag=body.meta.tag, priority=body.meta.priority))
+                    storage,
+                    self.logger,
+                    service_input,
+                    tag=body.meta.tag,
+                    priority=body.meta.priority,
+                    owner=self.username))
+
+        return new_services
+
+    async def post(self):
+        """Posts new services to the service queue.
+        """
+
+        body_model, response_model = rest_model("service_queue", "post")
+        body = self.parse_bodymodel(body_model)
+
+        new_services = await self.storage.run(self._build_services, body)
+
+        ret = await self.storage.add_services(new_services)
+        if ret["meta"]["n_inserted"]:
+            self.objects["wake_services"]()
 
-        ret = self.storage.add_services(new_services)
         ret["data"] = {"ids": ret["data"], "existing": ret["meta"]["duplicates"]}
         ret["data"]["submitted"] = list(set(ret["data"]["ids"]) - set(ret["meta"]["duplicates"]))
         response = response_model(**ret)
 
         self.logger.info("POST: ServiceQueue -  Added {} services.\n".format(response.meta.n_inserted))
-        self.write(response.json())
+        self.write_model(response)
 
-    def get(self):
+    async def get(self):
         """Gets services from the service queue.
         """
 
         body_model, response_model = rest_model("service_queue", "get")
         body = self.parse_bodymodel(body_model)
 
-        ret = self.storage.get_services(**body.data.dict(), projection=body.meta.projection)
+        ret = await self.storage.get_services(**body.data.dict(), projection=body.meta.projection)
         response = response_model(**ret)
 
         self.logger.info("GET: ServiceQueue - {} pulls.\n".format(len(response.data)))
-        self.write(response.json())
+        self.write_model(response)
 
 
 class QueueManagerHandler(APIHandler):
@@ -192,7 +220,7 @@ class QueueManagerHandler(APIHandler):
         storage_socket.queue_mark_error(error_data)
         return len(completed), len(error_data)
 
-    def get(self):
+    async def get(self):
         """Pulls new tasks from the Servers queue
         """
 
@@ -202,9 +230,11 @@ class QueueManagerHandler(APIHandler):
         # Figure out metadata and kwargs
         name = self._get_name_from_metadata(body.meta)
 
-        # Grab new tasks and write out
-        new_tasks = self.storage.queue_get_next(
-            name, body.meta.programs, body.meta.procedures, limit=body.data.limit, tag=body.meta.tag)
+        # Grab new tasks that fit into the free task slots of the manager and write out
+        resources = {"cores": body.meta.cores, "memory": body.meta.memory, "walltime": body.meta.walltime}
+        new_tasks = await self.storage.queue_get_next(
+            name, body.meta.programs, body.meta.procedures, limit=body.data.limit, tag=body.meta.tag,
+            resources=resources)
         response = response_model(**{
             "meta": {
                 "n_found": len(new_tasks),
@@ -215,14 +245,14 @@ class QueueManagerHandler(APIHandler):
             },
             "data": new_tasks
         })
-        self.write(response.json())
+        self.write_model(response)
 
         self.logger.info("QueueManager: Served {} tasks.".format(response.meta.n_found))
 
         # Update manager logs
-        self.storage.manager_update(name, submitted=len(new_tasks), **body.meta.dict())
+        await self.storage.manager_update(name, submitted=len(new_tasks), **body.meta.dict())
 
-    def post(self):
+    async def post(self):
         """Posts complete tasks to the Servers queue
         """
 
@@ -231,10 +261,15 @@ class QueueManagerHandler(APIHandler):
 
         name = self._get_name_from_metadata(body.meta)
         self.logger.info("QueueManager: Received completed task packet from {}.".format(name))
-        success, error = self.insert_complete_tasks(self.storage, body.data, self.logger)
+        success, error = await self.storage.run(self.insert_complete_tasks, self.storage.socket, body.data,
+                                                self.logger)
 
         completed = success + error
 
+        # Finished tasks woke the services waiting on them, iterate these right away
+        if completed:
+            self.objects["wake_services"]()
+
         response = response_model(**{
             "meta": {
                 "n_inserted": completed,
@@ -246,14 +281,14 @@ class QueueManagerHandler(APIHandler):
             },
             "data": True
         })
-        self.write(response.json())
+        self.write_model(response)
         self.logger.info("QueueManager: Inserted {} complete tasks.".format(len(body.data)))
 
         # Update manager logs
         name = self._get_name_from_metadata(body.meta)
-        self.storage.manager_update(name, completed=completed, failures=error)
+        await self.storage.manager_update(name, completed=completed, failures=error)
 
-    def put(self):
+    async def put(self):
         """
         Various manager manipulation operations
         """
@@ -266,12 +301,12 @@ class QueueManagerHandler(APIHandler):
         name = self._get_name_from_metadata(body.meta)
         op = body.data.operation
         if op == "startup":
-            self.storage.manager_update(name, status="ACTIVE", **body.meta.dict())
+            await self.storage.manager_update(name, status="ACTIVE", **body.meta.dict())
             self.logger.info("QueueManager: New active manager {} detected.".format(name))
 
         elif op == "shutdown":
-            nshutdown = self.storage.queue_reset_status(name)
-            self.storage.manager_update(name, returned=nshutdown, status="INACTIVE", **body.meta.dict())
+            nshutdown = await self.storage.queue_reset_status(name)
+            await self.storage.manager_update(name, returned=nshutdown, status="INACTIVE", **body.meta.dict())
 
             self.logger.info("QueueManager: Shutdown of manager {} detected, recycling {} incomplete tasks.".format(
                 name, nshutdown))
@@ -279,7 +314,7 @@ class QueueManagerHandler(APIHandler):
             ret = {"nshutdown": nshutdown}
 
         elif op == "heartbeat":
-            self.storage.manager_update(name, status="ACTIVE", **body.meta.dict())
+            await self.storage.manager_update(name, status="ACTIVE", **body.meta.dict())
             self.logger.info("QueueManager: Heartbeat of manager {} detected.".format(name))
 
         else:
@@ -287,6 +322,6 @@ class QueueManagerHandler(APIHandler):
             raise tornado.web.HTTPError(status_code=400, reason=msg)
 
         response = response_model(**{"meta": {}, "data": ret})
-        self.write(response.json())
+        self.write_model(response)
 
         # Update manager logs
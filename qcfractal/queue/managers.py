@@ -49,6 +49,7 @@ class QueueManager:
                  stale_update_limit: Optional[int]=10,
                  cores_per_task: Optional[int]=None,
                  memory_per_task: Optional[Union[int, float]]=None,
+                 walltime_per_task: Optional[Union[int, float]]=None,
                  scratch_directory: Optional[str]=None):
         """
         Parameters
@@ -85,6 +86,9 @@ class QueueManager:
         memory_per_task: int, optional, Default: None
             How much memory, in GiB, per computation task to allocate for QCEngine
             None indicates "use however much you can consume"
+        walltime_per_task: int, optional, Default: None
+            How long, in seconds, a computation task can run before the queue kills it
+            None indicates "as long as it needs"
         scratch_directory: str, optional, Default: None
             Scratch directory location to do QCEngine compute
             None indicates "wherever the system default is"'
@@ -102,6 +106,7 @@ class QueueManager:
         self.client = client
         self.cores_per_task = cores_per_task
         self.memory_per_task = memory_per_task
+        self.walltime_per_task = walltime_per_task
         self.scratch_directory = scratch_directory
         self.queue_adapter = build_queue_adapter(
             queue_client, logger=self.logger, cores_per_task=self.cores_per_task, memory_per_task=self.memory_per_task,
@@ -145,6 +150,7 @@ class QueueManager:
             self.logger.info("        Version:     {}".format(qcng.__version__))
             self.logger.info("        Task Cores:  {}".format(self.cores_per_task))
             self.logger.info("        Task Mem:    {}".format(self.memory_per_task))
+            self.logger.info("        Task Time:   {}".format(self.walltime_per_task))
             self.logger.info("        Scratch Dir: {}".format(self.scratch_directory))
             self.logger.info("        Programs:    {}".format(self.available_programs))
             self.logger.info("        Procedures:  {}\n".format(self.available_procedures))
@@ -195,7 +201,12 @@ class QueueManager:
             # Pull info
             "programs": self.available_programs,
             "procedures": self.available_procedures,
-            "tag": self.queue_tag}
+            "tag": self.queue_tag,
+
+            # Task slot resources, the server only hands out tasks that fit
+            "cores": self.cores_per_task,
+            "memory": self.memory_per_task,
+            "walltime": self.walltime_per_task}
 
         return {"meta": meta, "data": {}}
 
@@ -3,26 +3,31 @@ The FractalServer class
 """
 
 import asyncio
+import atexit
 import datetime
 import logging
+import os
 import ssl
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 import tornado.ioloop
 import tornado.log
 import tornado.options
 import tornado.web
 
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from .extras import get_information
 from .interface import FractalClient
+from .interface.serialization import available_encodings
 from .queue import QueueManager, QueueManagerHandler, ServiceQueueHandler, TaskQueueHandler
-from .services import construct_service
-from .storage_sockets import storage_socket_factory
+from .services import construct_service, get_task_data
+from .storage_sockets import AsyncStorageSocket, storage_socket_factory
 from .web_handlers import (CollectionHandler, InformationHandler, KVStoreHandler, MoleculeHandler, KeywordHandler,
-                           ProcedureHandler, ResultHandler)
+                           ProcedureCountsHandler, ProcedureHandler, ResponseCache, ResultColumnsHandler,
+                           ResultHandler)
 
 myFormatter = logging.Formatter('[%(asctime)s] %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p')
 
@@ -76,6 +81,38 @@ def _build_ssl():
     return cert_pem, key_pem
 
 
+def _write_ssl_files(name: str) -> Dict[str, str]:
+    """
+    Writes a self-signed SSL certificate and key for the server `name` to the current directory.
+    The files are removed when the process that wrote them exits.
+    """
+
+    cert, key = _build_ssl()
+
+    # Add quick names
+    ssl_name = name.lower().replace(" ", "_")
+    cert_name = ssl_name + "_ssl.crt"
+    key_name = ssl_name + "_ssl.key"
+
+    with open(cert_name, "wb") as handle:
+        handle.write(cert)
+
+    with open(key_name, "wb") as handle:
+        handle.write(key)
+
+    # Destroy keyfiles upon close, forked worker processes inherit the exit handlers and must not remove them
+    pid = os.getpid()
+
+    def _remove_files():
+        if os.getpid() == pid:
+            os.remove(cert_name)
+            os.remove(key_name)
+
+    atexit.register(_remove_files)
+
+    return {"crt": cert_name, "key": key_name}
+
+
 class FractalServer:
     def __init__(
             self,
@@ -95,6 +132,11 @@ class FractalServer:
             storage_uri: str="mongodb://localhost",
             storage_project_name: str="molssistorage",
             query_limit: int=1000,
+            storage_workers: int=8,
+
+            # HTTP options
+            sockets: Optional[List['socket']]=None,
+            response_cache_size: int=100,
 
             # Log options
             logfile_prefix: str=None,
@@ -102,6 +144,8 @@ class FractalServer:
             # Queue options
             queue_socket: 'BaseAdapter'=None,
             max_active_services: int=20,
+            service_workers: int=4,
+            scheduler: Union[str, 'SchedulingPolicy']="priority",
             heartbeat_frequency: int=300):
         """QCFractal initialization
 
@@ -129,6 +173,14 @@ class FractalServer:
             The project name to use on the database.
         query_limit : int, optional
             The maximum number of entries a query will return.
+        storage_workers : int, optional
+            The number of threads on which the REST handlers run database calls, the maximum number of
+            concurrent requests that can wait on the database without blocking the IOLoop.
+        sockets : Optional[List[socket]], optional
+            Listening sockets bound before forking, see ``tornado.netutil.bind_sockets``. Worker processes
+            share these sockets instead of binding to `port` themselves.
+        response_cache_size : int, optional
+            The size in MB of the in-memory cache of GET responses for immutable records, 0 disables the cache.
         logfile_prefix : str, optional
             The logfile to use for logging.
         queue_socket : BaseAdapter, optional
@@ -136,6 +188,11 @@ class FractalServer:
             Should only be used for testing and interactive sessions.
         max_active_services : int, optional
             The maximum number of active Services that can be running at any given time.
+        service_workers : int, optional
+            The number of threads iterating Services concurrently, each Service is iterated on a single thread.
+        scheduler : Union[str, SchedulingPolicy], optional
+            The policy picking the tasks handed to managers, "priority" (highest priority, then oldest first),
+            "fair_share" (shares compute between the task owners) or a SchedulingPolicy instance.
         heartbeat_frequency : int, optional
             The time (in seconds) of the heartbeat manager frequency.
         """
@@ -173,29 +230,11 @@ class FractalServer:
             self.logger.warning("No SSL files passed in, generating self-signed SSL certificate.")
             self.logger.warning("Clients must use `verify=False` when connecting.\n")
 
-            cert, key = _build_ssl()
-
-            # Add quick names
-            ssl_name = name.lower().replace(" ", "_")
-            cert_name = ssl_name + "_ssl.crt"
-            key_name = ssl_name + "_ssl.key"
-
-            ssl_options = {"crt": cert_name, "key": key_name}
-
-            with open(cert_name, "wb") as handle:
-                handle.write(cert)
-
-            with open(key_name, "wb") as handle:
-                handle.write(key)
+            ssl_options = _write_ssl_files(name)
 
             ssl_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
             ssl_ctx.load_cert_chain(ssl_options["crt"], ssl_options["key"])
 
-            # Destroy keyfiles upon close
-            import atexit
-            import os
-            atexit.register(os.remove, cert_name)
-            atexit.register(os.remove, key_name)
             self.client_verify = False
         elif ssl_options is False:
             ssl_ctx = None
@@ -214,15 +253,27 @@ class FractalServer:
             project_name=storage_project_name,
             bypass_security=storage_bypass_security,
             allow_read=allow_read,
-            max_limit=query_limit)
+            max_limit=query_limit,
+            scheduler=scheduler)
 
         # Pull the current loop if we need it
         self.loop = loop or tornado.ioloop.IOLoop.current()
 
+        # Handlers await the database through a thread pool
+        self.async_storage = AsyncStorageSocket(self.storage, max_workers=storage_workers)
+
+        # Services iterate on their own pool, off the IOLoop
+        self.service_executor = ThreadPoolExecutor(max_workers=service_workers)
+        self._services_future = None
+        self._services_pending = False
+
         # Build up the application
         self.objects = {
             "storage_socket": self.storage,
+            "async_storage_socket": self.async_storage,
+            "response_cache": ResponseCache(max_bytes=int(response_cache_size * 1024**2)),
             "logger": self.logger,
+            "wake_services": self.wake_services,
         }
 
         # Public information
@@ -231,6 +282,7 @@ class FractalServer:
             "heartbeat_frequency": self.heartbeat_frequency,
             "version": get_information("version"),
             "query_limit": self.storage.get_limit(1.e9),
+            "encodings": available_encodings(),
         }
 
         endpoints = [
@@ -242,7 +294,9 @@ class FractalServer:
             (r"/keyword", KeywordHandler, self.objects),
             (r"/collection", CollectionHandler, self.objects),
             (r"/result", ResultHandler, self.objects),
+            (r"/result_columns", ResultColumnsHandler, self.objects),
             (r"/procedure", ProcedureHandler, self.objects),
+            (r"/procedure_counts", ProcedureCountsHandler, self.objects),
 
             # Queue Schedulers
             (r"/task_queue", TaskQueueHandler, self.objects),
@@ -259,7 +313,10 @@ class FractalServer:
 
         self.http_server = tornado.httpserver.HTTPServer(self.app, ssl_options=ssl_ctx)
 
-        self.http_server.listen(self.port)
+        if sockets is None:
+            self.http_server.listen(self.port)
+        else:
+            self.http_server.add_sockets(sockets)
 
         # Add periodic callback holders
         self.periodic = {}
@@ -285,7 +342,6 @@ class FractalServer:
                 raise ValueError("Cannot yet use local security with a internal QueueManager")
 
             # Create the executor
-            from concurrent.futures import ThreadPoolExecutor
             self.executor = ThreadPoolExecutor(max_workers=2)
 
             def _build_manager():
@@ -335,7 +391,7 @@ class FractalServer:
 
         # Add services callback
         if start_periodics:
-            nanny_services = tornado.ioloop.PeriodicCallback(self.update_services, 2000)
+            nanny_services = tornado.ioloop.PeriodicCallback(self._update_services_periodic, 2000)
             nanny_services.start()
             self.periodic["update_services"] = nanny_services
 
@@ -380,6 +436,9 @@ class FractalServer:
         if self.executor is not None:
             self.executor.shutdown()
 
+        self.async_storage.shutdown(wait=False)
+        self.service_executor.shutdown(wait=False)
+
         # Shutdown IOLoop if needed
         if (asyncio.get_event_loop().is_running()) and stop_loop:
             self.loop.stop()
@@ -432,48 +491,113 @@ class FractalServer:
 
 ## Updates
 
+    def _iterate_service(self, data: Dict[str, Any],
+                         task_data: Dict[str, Dict[str, Any]]) -> Tuple[Optional['BaseService'], bool]:
+        """Builds and iterates a single service, runs on the service pool.
+        """
+
+        service = None
+        try:
+            service = construct_service(self.storage, self.logger, data, task_data=task_data)
+            finished = service.iterate()
+        except Exception as e:
+            error_message = "FractalServer Service Build and Iterate Error:\n{}".format(traceback.format_exc())
+            self.logger.error(error_message)
+            if service is None:
+                return None, False
+
+            service.status = "ERROR"
+            service.error = {"error_type": "iteration_error", "error_message": error_message}
+            finished = False
+
+        return service, finished
+
     def update_services(self) -> int:
         """Runs through all active services and examines their current status.
         """
 
-        # Grab current services
-        current_services = self.storage.get_services(status="RUNNING")["data"]
+        # Grab the running services that were woken up, idle services are only counted
+        n_running = self.storage.get_services(status="RUNNING", projection=["status"], limit=1)["meta"]["n_found"]
+        current_services = self.storage.claim_services("RUNNING")["data"]
 
         # Grab new services if we have open slots
-        open_slots = max(0, self.max_active_services - len(current_services))
+        new_services = []
+        open_slots = max(0, self.max_active_services - n_running)
         if open_slots > 0:
-            new_services = self.storage.get_services(status="WAITING", limit=open_slots)["data"]
+            new_services = self.storage.claim_services("WAITING", limit=open_slots)["data"]
             current_services.extend(new_services)
 
-        # Loop over the services and iterate
-        running_services = 0
-        completed_services = []
-        for data in current_services:
+        # Pull the tasks of all services in one batched query, shared by the services of this update
+        task_ids = [
+            task_id for data in current_services
+            for task_id in data.get("task_manager", {}).get("required_tasks", {}).values()
+        ]
+        task_data = get_task_data(self.storage, task_ids)
+
+        # Iterate the services concurrently, every service on a single worker
+        iterated = list(
+            self.service_executor.map(lambda data: self._iterate_service(data, task_data), current_services))
+        services = [service for service, _ in iterated if service is not None]
 
-            # Attempt to iteration and get message
-            try:
-                service = construct_service(self.storage, self.logger, data)
-                finished = service.iterate()
-            except Exception as e:
-                error_message = "FractalServer Service Build and Iterate Error:\n{}".format(traceback.format_exc())
-                self.logger.error(error_message)
-                service.status = "ERROR"
-                service.error = {"error_type": "iteration_error", "error_message": error_message}
-                finished = False
+        # Write all services at once, then add results to procedures and remove the completed ones
+        self.storage.update_services(services)
 
-            self.storage.update_services([service])
+        completed_services = [
+            service for service, finished in iterated if (service is not None) and (finished is not False)
+        ]
+        self.storage.services_completed(completed_services)
 
-            if finished is not False:
+        # Tasks that finished before the services were written (or were finished duplicates when submitted)
+        # did not wake their services, check them once here
+        waiting = [
+            service for service, finished in iterated
+            if (service is not None) and (finished is False) and (service.status == "RUNNING")
+        ]
+        task_data = get_task_data(
+            self.storage, [task_id for service in waiting for task_id in service.task_manager.required_tasks.values()])
 
-                # Add results to procedures, remove complete_ids
-                completed_services.append(service)
-            else:
-                running_services += 1
+        ready = []
+        for service in waiting:
+            status = [task_data.get(x, {}).get("status") for x in service.task_manager.required_tasks.values()]
+            if ("ERROR" in status) or all(x in {"COMPLETE", None} for x in status):
+                ready.append(service.id)
 
-        # Add new procedures and services
-        self.storage.services_completed(completed_services)
+        if ready:
+            self.storage.wake_services(id=ready)
+            self.wake_services()
+
+        return n_running + len(new_services) - len(completed_services)
+
+    def wake_services(self) -> None:
+        """Runs update_services as soon as possible, for example after tasks finished or services were added.
+
+        A wakeup while services are being updated runs update_services again right after. This only has an
+        effect if the periodic updates were started.
+        """
+
+        if "update_services" in self.periodic:
+            self.loop.add_callback(self._update_services_periodic)
+
+    def _update_services_periodic(self) -> None:
+        """Runs update_services off the IOLoop, a call while the previous update still runs is deferred until
+        the update is done.
+        """
+
+        if (self._services_future is not None) and (not self._services_future.done()):
+            self._services_pending = True
+            return
+
+        def update_done(future):
+            if (not future.cancelled()) and (future.exception() is not None):
+                self.logger.error("FractalServer Service Update Error: {}".format(future.exception()))
+
+            if self._services_pending:
+                self._services_pending = False
+                self.loop.add_callback(self._update_services_periodic)
 
-        return running_services
+        self._services_pending = False
+        self._services_future = self.loop.run_in_executor(None, self.update_services)
+        self._services_future.add_done_callback(update_done)
 
     def check_manager_heartbeats(self) -> None:
         """
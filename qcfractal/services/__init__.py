@@ -2,4 +2,5 @@
 Base import for services
 """
 
+from .service_util import get_task_data
 from .services import construct_service, initialize_service
@@ -46,7 +46,7 @@ class GridOptimizationService(BaseService):
         json_encoders = json_encoders
 
     @classmethod
-    def initialize_from_api(cls, storage_socket, logger, service_input, tag=None, priority=None):
+    def initialize_from_api(cls, storage_socket, logger, service_input, tag=None, priority=None, owner=None):
 
         # Build the record
         output = GridOptimizationRecord(
@@ -101,6 +101,7 @@ class GridOptimizationService(BaseService):
 
         meta["task_tag"] = tag
         meta["task_priority"] = priority
+        meta["task_owner"] = owner
         return cls(**meta, storage_socket=storage_socket, logger=logger)
 
     @staticmethod
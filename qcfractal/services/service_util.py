@@ -4,7 +4,7 @@ Utilities and base functions for Services.
 
 import abc
 import json
-from typing import Any, Dict, List, Set, Tuple, Optional
+from typing import Any, Dict, List, Set, Tuple, Optional, Union
 
 from pydantic import BaseModel, validator
 
@@ -16,19 +16,93 @@ from ..procedures import get_procedure_parser
 from qcelemental.models import ComputeError
 
 
+# The procedure fields a service needs to follow and consume its tasks
+_task_projection = ["id", "status", "task_id", "initial_molecule", "final_molecule", "energies"]
+
+
+def get_task_data(storage_socket, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Pulls the status, molecules and energies of the given procedures in a single projected query
+    (or as few queries as the query limit allows).
+
+    Parameters
+    ----------
+    storage_socket : StorageSocket
+        A StorageSocket to the currently active database
+    ids : List[str]
+        The procedure ids
+
+    Returns
+    -------
+    Dict[str, Dict[str, Any]]
+        The projected procedures in {id: procedure} format
+    """
+
+    ids = list(set(ids))
+    limit = storage_socket.get_limit(None)
+
+    ret = {}
+    for i in range(0, len(ids), limit):
+        data = storage_socket.get_procedures(
+            id=ids[i:i + limit], projection=_task_projection, limit=limit, count=False)["data"]
+        ret.update({x["id"]: x for x in data})
+
+    return ret
+
+
+def get_molecules_by_id(storage_socket, ids: List[str]) -> Dict[str, Any]:
+    """
+    Pulls molecules in as few queries as the query limit allows.
+
+    Returns
+    -------
+    Dict[str, Molecule]
+        The molecules in {id: molecule} format
+    """
+
+    ids = list(set(ids))
+    limit = storage_socket.get_limit(None)
+
+    ret = {}
+    for i in range(0, len(ids), limit):
+        data = storage_socket.get_molecules(id=ids[i:i + limit], limit=limit, count=False)["data"]
+        ret.update({x.id: x for x in data})
+
+    return ret
+
+
 class TaskManager(BaseModel):
 
     storage_socket: Any = None
     logger: Any = None
 
+    # Projected procedures, may be shared by all services iterated at once
+    task_data: Any = None
+
     required_tasks: Dict[str, str] = {}
     tag: Optional[str] = None
     priority: PriorityEnum = PriorityEnum.HIGH
+    owner: Optional[str] = None
 
     def dict(self, *args, **kwargs) -> Dict[str, Any]:
-        kwargs["exclude"] = (kwargs.pop("exclude", None) or set()) | {"storage_socket", "logger"}
+        kwargs["exclude"] = (kwargs.pop("exclude", None) or set()) | {"storage_socket", "logger", "task_data"}
         return BaseModel.dict(self, *args, **kwargs)
 
+    def _get_task_data(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the projected required tasks, only queries if they were not pulled before.
+        """
+
+        ids = list(self.required_tasks.values())
+        if (self.task_data is None) or any(x not in self.task_data for x in ids):
+            self.task_data = get_task_data(self.storage_socket, ids)
+
+        missing = [x for x in ids if x not in self.task_data]
+        if missing:
+            raise KeyError("Could not find the service tasks: {}.".format(missing))
+
+        return {k: self.task_data[v] for k, v in self.required_tasks.items()}
+
     def done(self) -> bool:
         """
         Check if requested tasks are complete.
@@ -37,24 +111,22 @@ class TaskManager(BaseModel):
         if len(self.required_tasks) == 0:
             return True
 
-        task_query = self.storage_socket.get_procedures(
-            id=list(self.required_tasks.values()), projection={"status": True,
-                                                               "error": True})
+        tasks = self._get_task_data()
 
-        status_values = set(x["status"] for x in task_query["data"])
+        status_values = set(x["status"] for x in tasks.values())
         if status_values == {"COMPLETE"}:
             return True
 
         elif "ERROR" in status_values:
-            for x in task_query["data"]:
-                if x["status"] != "ERROR":
-                    continue
+            # Only pull the queue entries of the failed tasks for their error messages
+            failed = [x["task_id"] for x in tasks.values() if (x["status"] == "ERROR") and x.get("task_id")]
+
             self.logger.error("Error in service compute as follows:")
-            tasks = self.storage_socket.get_queue()["data"]
-            for x in tasks:
-                if "error" not in x:
-                    continue
-                self.logger.error(x["error"]["error_message"])
+            if failed:
+                for task in self.storage_socket.get_queue(id=failed)["data"]:
+                    if task.error is None:
+                        continue
+                    self.logger.error(task.error.error_message)
 
             raise KeyError("All tasks did not execute successfully.")
         else:
@@ -65,11 +137,7 @@ class TaskManager(BaseModel):
         Pulls currently held tasks.
         """
 
-        ret = {}
-        for k, id in self.required_tasks.items():
-            ret[k] = self.storage_socket.get_procedures(id=id)["data"][0]
-
-        return ret
+        return self._get_task_data()
 
     def submit_tasks(self, procedure_type: str, tasks: Dict[str, Any]) -> bool:
         """
@@ -81,7 +149,7 @@ class TaskManager(BaseModel):
 
         # Add in all new tasks
         for key, packet in tasks.items():
-            packet["meta"].update({"tag": self.tag, "priority": self.priority})
+            packet["meta"].update({"tag": self.tag, "priority": self.priority, "owner": self.owner})
             packet = TaskQueuePOSTBody(**packet)
 
             # Turn packet into a full task, if there are duplicates, get the ID
@@ -93,6 +161,7 @@ class TaskManager(BaseModel):
             required_tasks[key] = r["data"]["ids"][0]
 
         self.required_tasks = required_tasks
+        self.task_data = None
 
         return True
 
@@ -104,7 +173,7 @@ class BaseService(BaseModel, abc.ABC):
     logger: Any
 
     # Base identification
-    id: Optional[ObjectId] = None
+    id: Optional[Union[ObjectId, int]] = None
     hash_index: str
     service: str
     program: str
@@ -112,12 +181,13 @@ class BaseService(BaseModel, abc.ABC):
     output: Any
 
     # Links
-    task_id: Optional[ObjectId] = None
-    procedure_id: Optional[ObjectId] = None
+    task_id: Optional[Union[ObjectId, int]] = None
+    procedure_id: Optional[Union[ObjectId, int]] = None
 
     # Task manager
     task_tag: Optional[str] = None
     task_priority: PriorityEnum
+    task_owner: Optional[str] = None
     task_manager: TaskManager = TaskManager()
 
     status: str = "WAITING"
@@ -129,6 +199,7 @@ class BaseService(BaseModel, abc.ABC):
         self.task_manager.storage_socket = self.storage_socket
         self.task_manager.tag = self.task_tag
         self.task_manager.priority = self.task_priority
+        self.task_manager.owner = self.task_owner
 
     @validator('task_priority', pre=True)
     def munge_priority(cls, v):
@@ -140,7 +211,7 @@ class BaseService(BaseModel, abc.ABC):
 
     @classmethod
     @abc.abstractmethod
-    def initialize_from_api(cls, storage_socket, meta, molecule, tag=None, priority=None):
+    def initialize_from_api(cls, storage_socket, meta, molecule, tag=None, priority=None, owner=None):
         """
         Initalizes a Service from the API.
         """
@@ -21,7 +21,7 @@ def _service_chooser(name):
         raise KeyError("Name {} not recognized.".format(name.title()))
 
 
-def initialize_service(storage_socket, logger, service_input, tag=None, priority=None):
+def initialize_service(storage_socket, logger, service_input, tag=None, priority=None, owner=None):
     """Initializes a service from a API call.
 
     Parameters
@@ -36,6 +36,8 @@ def initialize_service(storage_socket, logger, service_input, tag=None, priority
         Optional tag to user with the service. Defaults to None
     priority :
         The priority of the service.
+    owner : Optional
+        The user submitting the service, its tasks are scheduled as this user. Defaults to None
 		
     Returns
     -------
@@ -45,10 +47,10 @@ def initialize_service(storage_socket, logger, service_input, tag=None, priority
     """
     name = service_input.procedure
     return _service_chooser(name).initialize_from_api(
-        storage_socket, logger, service_input, tag=tag, priority=priority)
+        storage_socket, logger, service_input, tag=tag, priority=priority, owner=owner)
 
 
-def construct_service(storage_socket, logger, data):
+def construct_service(storage_socket, logger, data, task_data=None):
     """Initializes a service from a JSON blob.
 
     Parameters
@@ -59,6 +61,8 @@ def construct_service(storage_socket, logger, data):
         A logger for use by the service
     data : dict
         The associated JSON blob with the service
+    task_data : dict, optional
+        Prefetched tasks in {id: procedure} format (see get_task_data), shared by services iterated together
 
     Returns
     -------
@@ -67,4 +71,7 @@ def construct_service(storage_socket, logger, data):
 
     """
     name = data["service"]
-    return _service_chooser(name)(**data, storage_socket=storage_socket, logger=logger)
+    service = _service_chooser(name)(**data, storage_socket=storage_socket, logger=logger)
+    service.task_manager.task_data = task_data
+
+    return service
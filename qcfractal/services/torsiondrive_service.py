@@ -8,7 +8,7 @@ from typing import Any, Dict, List
 
 import numpy as np
 
-from .service_util import BaseService, TaskManager
+from .service_util import BaseService, TaskManager, get_molecules_by_id
 from ..interface.models import TorsionDriveRecord, json_encoders
 from ..extras import find_module
 
@@ -49,7 +49,7 @@ class TorsionDriveService(BaseService):
         json_encoders = json_encoders
 
     @classmethod
-    def initialize_from_api(cls, storage_socket, logger, service_input, tag=None, priority=None):
+    def initialize_from_api(cls, storage_socket, logger, service_input, tag=None, priority=None, owner=None):
         _check_td()
         import torsiondrive
         from torsiondrive import td_api
@@ -112,6 +112,7 @@ class TorsionDriveService(BaseService):
 
         meta["task_tag"] = tag
         meta["task_priority"] = priority
+        meta["task_owner"] = owner
         return cls(**meta, storage_socket=storage_socket, logger=logger)
 
     def iterate(self):
@@ -127,6 +128,10 @@ class TorsionDriveService(BaseService):
 
         complete_tasks = self.task_manager.get_tasks()
 
+        # Lookup the molecules of all tasks at once
+        mol_ids = [ret[x] for ret in complete_tasks.values() for x in ["initial_molecule", "final_molecule"]]
+        molecules = get_molecules_by_id(self.storage_socket, mol_ids)
+
         # Populate task results
         task_results = {}
         for key, task_ids in self.task_map.items():
@@ -140,11 +145,10 @@ class TorsionDriveService(BaseService):
                 # Cycle through all tasks for this entry
                 ret = complete_tasks[task_id]
 
-                # Lookup molecules
-                mol_keys = self.storage_socket.get_molecules(id=[ret["initial_molecule"],
-                                                                 ret["final_molecule"]])["data"]
+                initial_molecule = molecules[ret["initial_molecule"]]
+                final_molecule = molecules[ret["final_molecule"]]
 
-                task_results[key].append((mol_keys[0].geometry, mol_keys[1].geometry, ret["energies"][-1]))
+                task_results[key].append((initial_molecule.geometry, final_molecule.geometry, ret["energies"][-1]))
 
                 # Update history
                 self.optimization_history[key].append(ret["id"])
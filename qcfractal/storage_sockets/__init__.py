@@ -2,6 +2,7 @@
 Importer for the DB socket class.
 """
 
-__all__ = ["storage_socket_factory"]
+__all__ = ["storage_socket_factory", "AsyncStorageSocket"]
 
+from .async_socket import AsyncStorageSocket
 from .storage_socket import storage_socket_factory
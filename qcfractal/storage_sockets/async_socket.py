@@ -0,0 +1,74 @@
+"""
+An awaitable facade over the blocking storage sockets for use on the IOLoop.
+"""
+
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from tornado.ioloop import IOLoop
+
+
+class AsyncStorageSocket:
+    """
+    Wraps a storage socket so that every socket method returns an awaitable which runs the
+    call on a bounded thread pool. Concurrent requests then overlap their database I/O instead
+    of blocking the IOLoop one after another.
+
+    The underlying sockets must be thread-safe, which holds for the mongoengine socket (pymongo
+    pools its connections) and the SQLAlchemy socket (a session per call).
+
+    Examples
+    --------
+
+    >>> storage = AsyncStorageSocket(storage_socket_factory("mongodb://localhost"))
+    >>> ret = await storage.get_molecules(id=["5c7896fe39d7b8b5d6edbd5c"])
+    """
+
+    def __init__(self, socket: Any, max_workers: int=8):
+        """
+        Parameters
+        ----------
+        socket : StorageSocket
+            The blocking storage socket to wrap
+        max_workers : int, optional
+            The maximum number of storage calls running at the same time, further calls are queued.
+        """
+
+        self.socket = socket
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="storage")
+
+    def __repr__(self) -> str:
+        return "AsyncStorageSocket({}, max_workers={})".format(repr(self.socket), self.max_workers)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.socket, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def wrapper(*args, **kwargs):
+            return self.run(attr, *args, **kwargs)
+
+        return wrapper
+
+    def run(self, func: Callable, *args, **kwargs) -> 'Future':
+        """
+        Runs an arbitrary blocking function, such as a procedure parser working on the
+        blocking socket, on the storage thread pool.
+
+        Returns
+        -------
+        Future
+            An awaitable that resolves to the return value of the function
+        """
+
+        return IOLoop.current().run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self, wait: bool=True) -> None:
+        """
+        Shuts down the thread pool, storage calls that are already queued are still executed.
+        """
+
+        self._executor.shutdown(wait=wait)
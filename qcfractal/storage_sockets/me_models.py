@@ -281,6 +281,12 @@ class TaskQueueORM(CustomDynamicDocument):
     # others
     priority: db.IntField(default=1)
     tag = db.StringField(default=None)
+    owner = db.StringField(default=None)
+
+    # estimated resources
+    cores = db.IntField(default=None)
+    memory = db.FloatField(default=None)
+    walltime = db.FloatField(default=None)
 
     # can reference ResultORMs or any ProcedureORM
     base_result = db.GenericLazyReferenceField(dbref=True)  # use res.id and res.document_type (class)
@@ -305,6 +311,11 @@ class TaskQueueORM(CustomDynamicDocument):
             'tag',
             'priority',
 
+            # fair share candidates
+            {
+                'fields': ('status', 'owner', 'priority', 'created_on'),
+            },
+
             {
                 'fields': ('base_result', ),
                 'unique': True
@@ -331,6 +342,10 @@ class ServiceQueueORM(CustomDynamicDocument):
     hash_index = db.StringField(required=True)
     procedure_id = db.LazyReferenceField(ProcedureORM)
 
+    # Reverse index of the procedures the service waits on, a finished procedure marks the service ready
+    required_procedures = db.ListField(db.StringField())
+    ready = db.BooleanField(default=True)
+
     # created_on = db.DateTimeField(required=True)
     # modified_on = db.DateTimeField(required=True)
 
@@ -339,10 +354,15 @@ class ServiceQueueORM(CustomDynamicDocument):
         'service_queue',
         'indexes': [
             'status',
+            'required_procedures',
             {
                 'fields': ("status", "tag", "hash_index"),
                 'unique': False
             },
+            {
+                'fields': ("status", "ready"),
+                'unique': False
+            },
             # {'fields': ('procedure',), 'unique': True}
         ]
     }
@@ -377,6 +397,11 @@ class QueueManagerORM(CustomDynamicDocument):
     programs = db.DynamicField()
     procedures = db.DynamicField()
 
+    # task slot resources
+    cores = db.IntField()
+    memory = db.FloatField()
+    walltime = db.FloatField()
+
     # counts
     completed = db.IntField(default=0)
     submitted = db.IntField(default=0)
@@ -17,7 +17,7 @@ except ImportError:
 import logging
 import secrets
 from datetime import datetime as dt
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import bcrypt
 import bson.errors
@@ -28,7 +28,8 @@ from mongoengine.connection import disconnect, get_db
 
 from .me_models import (CollectionORM, KeywordsORM, KVStoreORM, MoleculeORM, ProcedureORM, QueueManagerORM, ResultORM,
                         ServiceQueueORM, TaskQueueORM, UserORM)
-from .storage_utils import add_metadata_template, get_metadata_template
+from .scheduling import SchedulingPolicy, candidate_fields, get_scheduling_policy
+from .storage_utils import CredentialCache, add_metadata_template, get_metadata_template
 from ..interface.models import KeywordSet, Molecule, ResultRecord, TaskRecord, prepare_basis
 
 
@@ -111,7 +112,9 @@ class MongoengineSocket:
                  authMechanism: str="SCRAM-SHA-1",
                  authSource: str=None,
                  logger: 'Logger'=None,
-                 max_limit: int=1000):
+                 max_limit: int=1000,
+                 auth_cache_ttl: float=60,
+                 scheduler: Union[str, SchedulingPolicy]="priority"):
         """
         Constructs a new socket where url and port point towards a Mongod instance.
 
@@ -126,6 +129,10 @@ class MongoengineSocket:
         # Security
         self._bypass_security = bypass_security
         self._allow_read = allow_read
+        self._credential_cache = CredentialCache(ttl=auth_cache_ttl)
+
+        # Picks the tasks handed to managers
+        self.scheduler = get_scheduling_policy(scheduler)
 
         self._lower_results_index = ["method", "basis", "program"]
 
@@ -201,6 +208,57 @@ class MongoengineSocket:
 
         return limit if limit and limit < self._max_limit else self._max_limit
 
+    def _paginate(self, data, meta: Dict[str, Any], limit: Optional[int], skip: int, cursor: Optional[str],
+                  count: bool) -> List[Any]:
+        """Runs a QuerySet with offset or keyset pagination and fills the n_found and next_cursor fields of meta.
+
+        If `cursor` is not None the documents are ordered by id and only those with an id greater than
+        `cursor` are returned, an empty cursor starts from the first document. If `count` is False the
+        total count query is skipped and n_found is the number of documents returned.
+        """
+
+        q_limit = self.get_limit(limit)
+        if cursor is None:
+            data = data.limit(q_limit).skip(skip)
+        else:
+            data = data.order_by("id")
+            if cursor:
+                data = data.filter(id__gt=ObjectId(cursor))
+            data = data.limit(q_limit)
+
+        docs = list(data)
+        if count:
+            meta["n_found"] = data.count()  # all data count, can be > len(data)
+        else:
+            meta["n_found"] = len(docs)
+
+        if (cursor is not None) and (len(docs) == q_limit):
+            meta["next_cursor"] = str(docs[-1].id)
+
+        return docs
+
+    def _bulk_replace(self, orm_class, docs: List[Any]) -> int:
+        """Replaces (or inserts) result and procedure documents by id in a single unordered bulk write.
+
+        This is the bulk equivalent of calling save() on each document, the timestamps are set the same way.
+        """
+
+        now = dt.utcnow()
+        bulk_commands = []
+        for doc in docs:
+            doc.modified_on = now
+            if not doc.created_on:
+                doc.created_on = now
+            doc.validate()
+
+            doc = doc.to_mongo()
+            bulk_commands.append(pymongo.ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+
+        if bulk_commands:
+            orm_class._get_collection().bulk_write(bulk_commands, ordered=False)
+
+        return len(bulk_commands)
+
 ### KV Functions
 
     def add_kvstore(self, blobs_list: List[Any]):
@@ -220,16 +278,15 @@ class MongoengineSocket:
         """
 
         meta = add_metadata_template()
-        blob_ids = []
-        for blob in blobs_list:
-            if blob is None:
-                blob_ids.append(None)
-                continue
 
-            doc = KVStoreORM(value=blob)
-            doc.save()
-            blob_ids.append(str(doc.id))
-            meta['n_inserted'] += 1
+        # Insert all blobs in a single round trip, pymongo assigns the _id's in place
+        docs = [KVStoreORM(value=blob).to_mongo() for blob in blobs_list if blob is not None]
+        if docs:
+            KVStoreORM._get_collection().insert_many(docs)
+        meta['n_inserted'] = len(docs)
+
+        docs = iter(docs)
+        blob_ids = [None if blob is None else str(next(docs)["_id"]) for blob in blobs_list]
 
         meta["success"] = True
 
@@ -341,7 +398,9 @@ class MongoengineSocket:
 
         meta = add_metadata_template()
 
-        results = []
+        # Hash every molecule once, molecules repeated in the list are only inserted once
+        mol_hashes = []
+        new_mols = {}
         for dmol in molecules:
 
             mol_dict = dmol.json_dict(exclude={"id"})
@@ -357,29 +416,50 @@ class MongoengineSocket:
             mol_dict["identifiers"]["molecule_hash"] = mol_dict["molecule_hash"]
             mol_dict["identifiers"]["molecular_formula"] = mol_dict["molecular_formula"]
 
-            # search by index keywords not by all keys, much faster
-            doc = MoleculeORM.objects(molecule_hash=mol_dict['molecule_hash'])
+            mol_hashes.append(mol_dict["molecule_hash"])
+            new_mols.setdefault(mol_dict["molecule_hash"], mol_dict)
+
+        # search by index keywords not by all keys, much faster
+        collection = MoleculeORM._get_collection()
+        mol_ids = {}
+        if new_mols:
+            query = {"molecule_hash": {"$in": list(new_mols)}}
+            for found in collection.find(query, {"molecule_hash": True}):
+                mol_ids.setdefault(found["molecule_hash"], str(found["_id"]))
+
+        # We should make sure there was not a hash collision?
+        # new_mol.compare(old_mol)
+        # raise KeyError("!!! WARNING !!!: Hash collision detected")
+        inserts = {k: MoleculeORM(**v).to_mongo() for k, v in new_mols.items() if k not in mol_ids}
+        if inserts:
+            collection.insert_many(list(inserts.values()))
+            for k, doc in inserts.items():
+                mol_ids[k] = str(doc["_id"])
 
-            if doc.count() == 0:
-                doc = MoleculeORM(**mol_dict).save()
-                results.append(str(doc.id))
+        results = []
+        for mol_hash in mol_hashes:
+            results.append(mol_ids[mol_hash])
+
+            # If new or duplicate, add the id to the return list
+            if mol_hash in inserts:
+                del inserts[mol_hash]
                 meta['n_inserted'] += 1
             else:
+                meta['duplicates'].append(mol_ids[mol_hash])  # TODO
 
-                id = str(doc.first().id)
-                meta['duplicates'].append(id)  # TODO
-                # If new or duplicate, add the id to the return list
-                results.append(id)
-
-                # We should make sure there was not a hash collision?
-                # new_mol.compare(old_mol)
-                # raise KeyError("!!! WARNING !!!: Hash collision detected")
         meta["success"] = True
 
         ret = {"data": results, "meta": meta}
         return ret
 
-    def get_molecules(self, id=None, molecule_hash=None, molecular_formula=None, limit: int=None, skip: int=0):
+    def get_molecules(self,
+                      id=None,
+                      molecule_hash=None,
+                      molecular_formula=None,
+                      limit: int=None,
+                      skip: int=0,
+                      cursor: str=None,
+                      count: bool=True):
 
         ret = {"meta": get_metadata_template(), "data": []}
 
@@ -387,12 +467,10 @@ class MongoengineSocket:
 
         # Don't include the hash or the molecular_formula in the returned result
         # Make the query
-        data = MoleculeORM.objects(**query).exclude("molecule_hash", "molecular_formula")\
-                                        .limit(self.get_limit(limit))\
-                                        .skip(skip)\
+        data = MoleculeORM.objects(**query).exclude("molecule_hash", "molecular_formula")
+        data = self._paginate(data, ret["meta"], limit, skip, cursor, count)
 
         ret["meta"]["success"] = True
-        ret["meta"]["n_found"] = data.count()  # all data count, can be > len(data)
         ret["meta"]["errors"].extend(errors)
 
         # Data validated going in
@@ -640,6 +718,58 @@ class MongoengineSocket:
         ret = {'data': col_id, 'meta': meta}
         return ret
 
+    def update_collection(self,
+                          collection: str,
+                          name: str,
+                          updates: Optional[Dict[str, Dict[str, Any]]]=None,
+                          additions: Optional[Dict[str, List[Any]]]=None):
+        """Partially updates an existing collection without rewriting the whole document.
+
+        Parameters
+        ----------
+        collection : str
+        name : str
+        updates : dict, optional
+            Entries to set in mapping fields in {field: {key: value}} format, such as new or changed records
+        additions : dict, optional
+            Items to add to set fields in {field: [items]} format, such as the history
+
+        Returns
+        -------
+        A dict with keys: 'data' and 'meta'
+            (see add_metadata_template())
+            The 'data' part is True if the collection was found
+        """
+
+        meta = add_metadata_template()
+        found = False
+        try:
+            update = {}
+            for field, entries in (updates or {}).items():
+                for key, value in entries.items():
+                    if ("." in key) or key.startswith("$"):
+                        raise KeyError("Key '{}' of '{}' cannot be updated in place.".format(key, field))
+                    update.setdefault("$set", {})["{}.{}".format(field, key)] = value
+
+            for field, items in (additions or {}).items():
+                update.setdefault("$addToSet", {})[field] = {"$each": items}
+
+            query = {"collection": collection.lower(), "lname": name.lower()}
+            if update:
+                found = CollectionORM._get_collection().update_one(query, update).matched_count > 0
+            else:
+                found = CollectionORM.objects(**query).count() > 0
+
+            if not found:
+                raise KeyError("Collection '{}: {}' not found.".format(collection, name))
+
+            meta['success'] = True
+            meta['n_inserted'] = sum(len(x) for x in (updates or {}).values())
+        except Exception as err:
+            meta['error_description'] = str(err)
+
+        return {'data': found, 'meta': meta}
+
     # def get_collections(self, keys, projection=None):
     def get_collections(self,
                         collection: str=None,
@@ -734,30 +864,63 @@ class MongoengineSocket:
 
         meta = add_metadata_template()
 
-        result_ids = []
-        # try:
-        for result in record_list:
-
-            doc = ResultORM.objects(
-                program=result.program,
-                driver=result.driver,
-                method=result.method,
-                basis=result.basis,
-                keywords=result.keywords,
-                molecule=result.molecule)
+        # Results are unique by their index, all existing results are found in a single query
+        index_keys = ("program", "driver", "method", "basis", "molecule", "keywords")
 
-            if doc.count() == 0:
-                doc = ResultORM(**result.json_dict(exclude={"id"})).save()
-                result_ids.append(str(doc.id))
+        now = dt.utcnow()
+        result_keys = []
+        new_results = {}
+        for result in record_list:
+            doc = ResultORM(**result.json_dict(exclude={"id"}))
+            doc.modified_on = now
+            if not doc.created_on:
+                doc.created_on = now
+            doc = doc.to_mongo()
+
+            key = tuple(doc.get(k) for k in index_keys)
+            result_keys.append(key)
+            new_results.setdefault(key, doc)
+
+        collection = ResultORM._get_collection()
+        result_ids = {}
+        if new_results:
+            query = {"$or": [dict(zip(index_keys, key)) for key in new_results]}
+            for found in collection.find(query, {k: True for k in index_keys}):
+                result_ids[tuple(found.get(k) for k in index_keys)] = str(found["_id"])
+
+        inserts = [k for k in new_results if k not in result_ids]
+        if inserts:
+            try:
+                collection.insert_many([new_results[k] for k in inserts], ordered=False)
+                failed = []
+            except pymongo.errors.BulkWriteError as err:
+                # Results added concurrently show up as duplicate key errors
+                if any(x["code"] != 11000 for x in err.details["writeErrors"]):
+                    raise
+                failed = [inserts[x["index"]] for x in err.details["writeErrors"]]
+
+            for k in failed:
+                found = collection.find_one(dict(zip(index_keys, k)), {"_id": True})
+                result_ids[k] = str(found["_id"])
+
+            inserts = set(inserts) - set(failed)
+            for k in inserts:
+                result_ids[k] = str(new_results[k]["_id"])
+
+        ret_ids = []
+        for key in result_keys:
+            ret_ids.append(result_ids[key])
+
+            # If new or duplicate, add the id to the return list
+            if key in inserts:
+                inserts.remove(key)
                 meta['n_inserted'] += 1
             else:
-                id = str(doc.first().id)
-                meta['duplicates'].append(id)  # TODO
-                # If new or duplicate, add the id to the return list
-                result_ids.append(id)
+                meta['duplicates'].append(result_ids[key])  # TODO
+
         meta["success"] = True
 
-        ret = {"data": result_ids, "meta": meta}
+        ret = {"data": ret_ids, "meta": meta}
         return ret
 
     def update_results(self, record_list: List[ResultRecord]):
@@ -778,18 +941,16 @@ class MongoengineSocket:
             number of records updated
         """
 
-        # try:
-        updated_count = 0
+        docs = []
         for result in record_list:
 
             if result.id is None:
-                logger.error("Attempted update without ID, skipping")
+                self.logger.error("Attempted update without ID, skipping")
                 continue
 
-            ResultORM(**result.json_dict()).save()
-            updated_count += 1
+            docs.append(ResultORM(**result.json_dict()))
 
-        return updated_count
+        return self._bulk_replace(ResultORM, docs)
 
     def get_results_count(self):
         """
@@ -814,6 +975,8 @@ class MongoengineSocket:
                     projection=None,
                     limit: int=None,
                     skip: int=0,
+                    cursor: str=None,
+                    count: bool=True,
                     return_json=True,
                     with_ids=True):
         """
@@ -842,6 +1005,11 @@ class MongoengineSocket:
             (This is to avoid overloading the server)
         skip : int, default is 0
             skip the first 'skip' results. Used to paginate
+        cursor : str, default is None
+            Keyset pagination, return the results with an id greater than `cursor` ordered by id.
+            An empty string starts from the first result. Used instead of skip for large queries
+        count : bool, default is True
+            Count the total number of matches, otherwise n_found is the number of results returned
         return_json : bool, default is True
             Return the results as a list of json instead of objects
         with_ids : bool, default is True
@@ -869,16 +1037,14 @@ class MongoengineSocket:
             keywords=keywords,
             status=status)
 
-        q_limit = self.get_limit(limit)
-
         data = []
         try:
             if projection:
-                data = ResultORM.objects(**query).only(*projection).limit(q_limit).skip(skip)
+                data = ResultORM.objects(**query).only(*projection)
             else:
-                data = ResultORM.objects(**query).limit(q_limit).skip(skip)
+                data = ResultORM.objects(**query)
 
-            meta["n_found"] = data.count()  # total number found, can be >len(data)
+            data = self._paginate(data, meta, limit, skip, cursor, count)
             meta["success"] = True
         except Exception as err:
             meta['error_description'] = str(err)
@@ -960,6 +1126,8 @@ class MongoengineSocket:
                        projection=None,
                        limit: int=None,
                        skip: int=0,
+                       cursor: str=None,
+                       count: bool=True,
                        return_json=True,
                        with_ids=True):
         """
@@ -982,6 +1150,11 @@ class MongoengineSocket:
             (This is to avoid overloading the server)
         skip : int, default is 0
             skip the first 'skip' results. Used to paginate
+        cursor : str, default is None
+            Keyset pagination, return the results with an id greater than `cursor` ordered by id.
+            An empty string starts from the first result. Used instead of skip for large queries
+        count : bool, default is True
+            Count the total number of matches, otherwise n_found is the number of results returned
         return_json : bool, default is True
             Return the results as a list of json instead of objects
         with_ids : bool, default is True
@@ -1001,16 +1174,14 @@ class MongoengineSocket:
         query, error = format_query(
             id=id, procedure=procedure, program=program, hash_index=hash_index, task_id=task_id, status=status)
 
-        q_limit = self.get_limit(limit)
-
         data = []
         try:
             if projection:
-                data = ProcedureORM.objects(**query).only(*projection).limit(q_limit).skip(skip)
+                data = ProcedureORM.objects(**query).only(*projection)
             else:
-                data = ProcedureORM.objects(**query).limit(q_limit).skip(skip)
+                data = ProcedureORM.objects(**query)
 
-            meta["n_found"] = data.count()  # all data count
+            data = self._paginate(data, meta, limit, skip, cursor, count)
             meta["success"] = True
         except Exception as err:
             meta['error_description'] = str(err)
@@ -1020,12 +1191,92 @@ class MongoengineSocket:
 
         return {"data": data, "meta": meta}
 
+    def get_procedure_counts(self, id: Union[str, List]):
+        """
+        Counts the optimizations and gradient evaluations of procedures without returning the procedures
+        themselves. An optimization counts as one optimization and the length of its trajectory, services
+        (torsiondrives and grid optimizations) count their distinct optimizations and the sum of their
+        trajectories.
+
+        Parameters
+        ----------
+        id : str or list
+            The procedure ids
+
+        Returns
+        -------
+        Dict with keys: data, meta
+            Data is a dictionary of {id: {"status": str, "optimizations": int, "gradients": int}}
+        """
+
+        meta = get_metadata_template()
+
+        ids, bad = _str_to_indices_with_errors(id)
+        if bad:
+            meta["errors"].append(("id", bad))
+
+        # Only the trajectory sizes and the optimization ids leave the database
+        def aggregate(oids):
+            return ProcedureORM._get_collection().aggregate([{
+                "$match": {
+                    "_id": {
+                        "$in": oids
+                    }
+                }
+            }, {
+                "$project": {
+                    "status": 1,
+                    "optimization_history": 1,
+                    "grid_optimizations": 1,
+                    "gradients": {
+                        "$size": {
+                            "$ifNull": ["$trajectory", []]
+                        }
+                    }
+                }
+            }])
+
+        try:
+            procedures = list(aggregate(ids))
+
+            opt_ids = {}
+            for proc in procedures:
+                if "optimization_history" in proc:
+                    opt_ids[proc["_id"]] = {str(x) for v in proc["optimization_history"].values() for x in v}
+                elif "grid_optimizations" in proc:
+                    opt_ids[proc["_id"]] = {str(x) for x in proc["grid_optimizations"].values()}
+
+            needed_ids, _ = _str_to_indices_with_errors(list({x for v in opt_ids.values() for x in v}))
+            gradients = {str(x["_id"]): x["gradients"] for x in aggregate(needed_ids)} if needed_ids else {}
+
+            data = {}
+            for proc in procedures:
+                if proc["_id"] in opt_ids:
+                    children = opt_ids[proc["_id"]]
+                    counts = {
+                        "optimizations": len(children),
+                        "gradients": sum(gradients.get(str(x), 0) for x in children)
+                    }
+                else:
+                    counts = {"optimizations": 1, "gradients": proc["gradients"]}
+
+                data[str(proc["_id"])] = {"status": proc.get("status"), **counts}
+
+            meta["n_found"] = len(data)
+            meta["missing"] = [str(x) for x in ids if str(x) not in data]
+            meta["success"] = True
+        except Exception as err:
+            data = {}
+            meta['error_description'] = str(err)
+
+        return {"data": data, "meta": meta}
+
     def update_procedures(self, records_list: List['BaseRecord']):
         """
         TODO: to be updated with needed
         """
 
-        updated_count = 0
+        docs = []
         for procedure in records_list:
 
             # Must have ID
@@ -1034,10 +1285,9 @@ class MongoengineSocket:
                     "No procedure id found on update (hash_index={}), skipping.".format(procedure.hash_index))
                 continue
 
-            ProcedureORM(**procedure.json_dict()).save()
-            updated_count += 1
+            docs.append(ProcedureORM(**procedure.json_dict()))
 
-        return updated_count
+        return self._bulk_replace(ProcedureORM, docs)
 
     def add_services(self, service_list: List['BaseService']):
         """
@@ -1157,21 +1407,116 @@ class MongoengineSocket:
             if operation is succesful
         """
 
-        updated_count = 0
+        bulk_commands = []
         for service in records_list:
             if service.id is None:
                 self.logger.error(
                     "No service id found on update (hash_index={}), skipping.".format(service.hash_index))
                 continue
 
-            ServiceQueueORM(**service.json_dict()).save()
-            updated_count += 1
+            data = service.json_dict()
+            doc = ServiceQueueORM(**data)
+            doc.required_procedures = [str(x) for x in service.task_manager.required_tasks.values()]
+            doc.validate()
+
+            # Unset fields are cleared, the ready flag is left to claim_services and wake_services
+            fields = {k: None for k, v in data.items() if (v is None) and (k != "id")}
+            fields.update(doc.to_mongo())
+            oid = fields.pop("_id")
+            fields.pop("ready", None)
 
-        return updated_count
+            bulk_commands.append(pymongo.UpdateOne({"_id": oid}, {"$set": fields}))
+
+        if bulk_commands:
+            ServiceQueueORM._get_collection().bulk_write(bulk_commands, ordered=False)
+
+        return len(bulk_commands)
+
+    def claim_services(self, status: str, limit: int=None) -> Dict[str, Any]:
+        """
+        Pulls the services of a given status that are ready to iterate and marks them as idle until one of
+        the procedures they wait on finishes (see wake_services). Services without the flag are ready.
+
+        Parameters
+        ----------
+        status : str
+            The status of the services, 'RUNNING' or 'WAITING'
+        limit : int, default is None
+            maximum number of services to return
+            if 'limit' is greater than the global setting self._max_limit,
+            the self._max_limit will be returned instead
+
+        Returns
+        -------
+        Dict with keys: data, meta
+            Data is the services found
+        """
+
+        meta = get_metadata_template()
+
+        services = ServiceQueueORM.objects(__raw__={
+            "status": status,
+            "ready": {
+                "$ne": False
+            }
+        }).limit(self.get_limit(limit))
+        data = [d.to_json_obj() for d in services]
+
+        if data:
+            ServiceQueueORM._get_collection().update_many({
+                "_id": {
+                    "$in": [ObjectId(d["id"]) for d in data]
+                }
+            }, {"$set": {
+                "ready": False
+            }})
+
+        meta["n_found"] = len(data)
+        meta["success"] = True
+
+        return {"data": data, "meta": meta}
+
+    def wake_services(self, id: List[str]=None, procedure_id: List[str]=None) -> int:
+        """
+        Marks services as ready to iterate, either directly or through the procedures they wait on.
+
+        Parameters
+        ----------
+        id : List[str], optional
+            The service ids
+        procedure_id : List[str], optional
+            Finished procedure ids, every service waiting on one of them is woken
+
+        Returns
+        -------
+        int
+            The number of services woken
+        """
+
+        query = []
+        if id:
+            query.append({"_id": {"$in": [ObjectId(x) for x in id]}})
+        if procedure_id:
+            query.append({"required_procedures": {"$in": [str(x) for x in procedure_id]}})
+
+        if not query:
+            return 0
+
+        ret = ServiceQueueORM._get_collection().update_many({"$or": query, "ready": False}, {"$set": {"ready": True}})
+        return ret.modified_count
+
+    def _wake_task_services(self, task_ids: List[str]) -> int:
+        """
+        Wakes the services waiting on the procedures of finished tasks.
+        """
+
+        procedure_ids = ProcedureORM._get_collection().distinct("_id", {"task_id": {"$in": list(task_ids)}})
+        return self.wake_services(procedure_id=procedure_ids)
 
     def services_completed(self, records_list: List["BaseService"]) -> int:
 
-        done = 0
+        procedures = []
+        service_ids = []
         for service in records_list:
             if service.id is None:
                 self.logger.error(
@@ -1180,13 +1525,14 @@ class MongoengineSocket:
 
             procedure = service.output
             procedure.id = service.procedure_id
-            self.update_procedures([procedure])
+            procedures.append(procedure)
+            service_ids.append(ObjectId(service.id))
 
-            ServiceQueueORM.objects(id=ObjectId(service.id)).delete()
+        self.update_procedures(procedures)
+        if service_ids:
+            ServiceQueueORM._get_collection().delete_many({"_id": {"$in": service_ids}})
 
-            done += 1
-
-        return done
+        return len(service_ids)
 
 ### Mongo queue handling functions
 
@@ -1222,7 +1568,10 @@ class MongoengineSocket:
 
         meta = add_metadata_template()
 
-        results = []
+        # Build the documents, tasks are unique by their base_result
+        task_refs = {}
+        new_tasks = {}
+        result_orms = {}
         for task_num, record in enumerate(data):
             try:
 
@@ -1236,25 +1585,73 @@ class MongoengineSocket:
                                     " {} is given.".format(record.base_result.ref))
                 task = TaskQueueORM(**record.json_dict(exclude={"id", "base_result"}))
                 task.base_result = result_obj
-                task.save()
+                task.modified_on = dt.utcnow()
+                task.validate()
 
-                result_obj.update(task_id=str(task.id))  # update bidirectional rel
-                results.append(str(task.id))
-                meta['n_inserted'] += 1
-            except mongoengine.errors.NotUniqueError as err:  # rare case
-                # If results is stored as DBRef, get it with:
-                # task = TaskQueueORM.objects(__raw__={'base_result': base_result}).first()  # avoid
-
-                # If base_result is stored as a ResultORM or ProcedureORM class, get it with:
-                task = TaskQueueORM.objects(base_result=result_obj).first()
-                self.logger.warning('queue_submit got a duplicate task: {}'.format(task.to_mongo()))
-                results.append(str(task.id))
-                meta['duplicates'].append(task_num)
+                task_refs[task_num] = str(record.base_result.id)
+                new_tasks.setdefault(task_refs[task_num], task)
+                result_orms[task_refs[task_num]] = type(result_obj)
             except Exception as err:
                 self.logger.warning('queue_submit submission error: {}'.format(str(err)))
                 meta["success"] = False
                 meta["errors"].append(str(err))
+
+        collection = TaskQueueORM._get_collection()
+        docs = {k: v.to_mongo() for k, v in new_tasks.items()}
+
+        # Find the existing tasks in a single query
+        task_ids = {}
+        if docs:
+            query = {"base_result": {"$in": [x["base_result"] for x in docs.values()]}}
+            for found in collection.find(query, {"base_result": True}):
+                task_ids[str(found["base_result"]["_ref"].id)] = found["_id"]
+
+        # Insert the new tasks in one unordered bulk write, pymongo assigns the _id's in place
+        inserts = [k for k in docs.keys() if k not in task_ids]
+        if inserts:
+            try:
+                collection.insert_many([docs[k] for k in inserts], ordered=False)
+                failed = []
+            except pymongo.errors.BulkWriteError as err:
+                # Tasks submitted concurrently show up as duplicate key errors
+                if any(x["code"] != 11000 for x in err.details["writeErrors"]):
+                    raise
+                failed = [inserts[x["index"]] for x in err.details["writeErrors"]]
+
+            for k in failed:
+                found = collection.find_one({"base_result": docs[k]["base_result"]}, {"_id": True})
+                task_ids[k] = found["_id"]
+
+            # Update the bidirectional relationship of the new tasks
+            for orm in [ResultORM, ProcedureORM]:
+                bulk_commands = []
+                for k in inserts:
+                    if (k not in failed) and (result_orms[k] is orm):
+                        bulk_commands.append(
+                            pymongo.UpdateOne({"_id": ObjectId(k)}, {"$set": {"task_id": str(docs[k]["_id"])}}))
+                if bulk_commands:
+                    orm._get_collection().bulk_write(bulk_commands, ordered=False)
+
+            inserts = set(inserts) - set(failed)
+            for k in inserts:
+                task_ids[k] = docs[k]["_id"]
+
+        results = []
+        for task_num in range(len(data)):
+            if task_num not in task_refs:
                 results.append(None)
+                continue
+
+            k = task_refs[task_num]
+            results.append(str(task_ids[k]))
+            if k in inserts:
+                inserts.remove(k)
+                meta['n_inserted'] += 1
+            else:
+                meta['duplicates'].append(task_num)
+
+        if meta['duplicates']:
+            self.logger.warning('queue_submit got {} duplicate tasks.'.format(len(meta['duplicates'])))
 
         meta["success"] = True
 
@@ -1262,8 +1659,17 @@ class MongoengineSocket:
         return ret
 
     def queue_get_next(self, manager, available_programs, available_procedures, limit=100, tag=None,
-                       as_json=True) -> List[TaskRecord]:
-        """TODO: needs to be done in a transaction."""
+                       resources: Optional[Dict[str, Any]]=None, as_json=True) -> List[TaskRecord]:
+        """Atomically claims up to `limit` waiting tasks for a manager.
+
+        Each task is claimed with a single ``find_one_and_update`` that only matches
+        waiting tasks, so concurrent managers are always handed disjoint sets of tasks.
+        The tasks are picked by the scheduling policy of the socket (see scheduling.py).
+
+        `resources` holds the cores, memory and walltime of the `limit` free task slots
+        of the manager. Every claimed task fills one slot, so only tasks whose estimates
+        fit into a slot are handed out. Tasks and slots without a value always fit.
+        """
 
         # Figure out query, tagless has no requirements
         query, error = format_query(
@@ -1273,26 +1679,106 @@ class MongoengineSocket:
             tag=tag)
         query["procedure__in"].append(None)
 
-        found = TaskQueueORM.objects(**query).limit(limit).order_by('-priority', 'created_on')
+        # Translate to a raw query so that the claim is a single DB operation
+        query = TaskQueueORM.objects(**query)._query
 
-        query = {"_id": {"$in": [x.id for x in found]}}
+        # $not also matches tasks without an estimate
+        for key, value in (resources or {}).items():
+            if value is not None:
+                query[key] = {"$not": {"$gt": value}}
 
-        # update_many using pymongo in one DB access
-        upd = TaskQueueORM._get_collection().update_many(
-            query, {"$set": {
-                "status": "RUNNING",
-                "modified_on": dt.utcnow(),
-                "manager": manager,
-            }})
+        update = {"$set": {
+            "status": "RUNNING",
+            "modified_on": dt.utcnow(),
+            "manager": manager,
+        }}
+
+        collection = TaskQueueORM._get_collection()
+        found = []
+        if not self.scheduler.partition:
+            while len(found) < limit:
+                doc = collection.find_one_and_update(
+                    query, update, sort=self.scheduler.claim_sort, return_document=pymongo.ReturnDocument.AFTER)
+                if doc is None:
+                    break
+
+                found.append(TaskQueueORM._from_son(doc))
+
+        else:
+            # Claim the tasks picked by the policy, tasks taken by concurrent managers are replaced in another round
+            for _ in range(3):
+                claimed, lost = self._queue_claim_scheduled(query, update, manager, limit - len(found))
+                found.extend(claimed)
+                if (lost == 0) or (len(found) >= limit):
+                    break
 
         if as_json:
             found = [TaskRecord(**task.to_json_obj()) for task in found]
 
-        if upd.modified_count != len(found):
-            self.logger.warning("QUEUE: Number of found projects does not match the number of updated projects.")
-
         return found
 
+    def _queue_claim_scheduled(self, query: Dict[str, Any], update: Dict[str, Any], manager: str,
+                               limit: int) -> Tuple[List[TaskQueueORM], int]:
+        """Claims up to `limit` tasks selected by the scheduling policy.
+
+        The policy picks from the oldest waiting tasks of every combination of its partition fields. Tasks
+        are claimed one by one with the same atomic update as unscheduled claims.
+
+        Returns
+        -------
+        Tuple[List[TaskQueueORM], int]
+            The claimed tasks and the number of selected tasks that were claimed by another manager
+        """
+
+        collection = TaskQueueORM._get_collection()
+        partition = self.scheduler.partition
+        projection = {k: True for k in candidate_fields}
+
+        candidates = []
+        groups = collection.aggregate([{"$match": query}, {"$group": {"_id": {k: "$" + k for k in partition}}}])
+        for group in groups:
+            group_query = {**query, **{k: group["_id"].get(k) for k in partition}}
+            candidates.extend(collection.find(group_query, projection, sort=[("created_on", 1)], limit=limit))
+
+        if not candidates:
+            return [], 0
+
+        for task in candidates:
+            task["id"] = task.pop("_id")
+            task.setdefault("owner", None)
+            task.setdefault("tag", None)
+
+        # Running tasks per share group and the programs the manager is already running
+        usage = {}
+        if self.scheduler.share_key:
+            counts = collection.aggregate([{
+                "$match": {
+                    "status": "RUNNING"
+                }
+            }, {
+                "$group": {
+                    "_id": "$" + self.scheduler.share_key,
+                    "count": {
+                        "$sum": 1
+                    }
+                }
+            }])
+            usage = {x["_id"]: x["count"] for x in counts}
+        affinity = set(collection.distinct("program", {"status": "RUNNING", "manager": manager}))
+
+        found = []
+        lost = 0
+        for task_id in self.scheduler.select(candidates, limit, usage, affinity, dt.utcnow()):
+            doc = collection.find_one_and_update({
+                **query, "_id": task_id
+            }, update, return_document=pymongo.ReturnDocument.AFTER)
+            if doc is None:
+                lost += 1
+            else:
+                found.append(TaskQueueORM._from_son(doc))
+
+        return found, lost
+
     def get_queue(self,
                   id=None,
                   hash_index=None,
@@ -1301,6 +1787,8 @@ class MongoengineSocket:
                   projection=None,
                   limit: int=None,
                   skip: int=0,
+                  cursor: str=None,
+                  count: bool=True,
                   return_json=True,
                   with_ids=True):
         """
@@ -1321,6 +1809,11 @@ class MongoengineSocket:
             (This is to avoid overloading the server)
         skip : int, default is None 0
             skip the first 'skip' results. Used to paginate
+        cursor : str, default is None
+            Keyset pagination, return the tasks with an id greater than `cursor` ordered by id.
+            An empty string starts from the first task. Used instead of skip for large queries
+        count : bool, default is True
+            Count the total number of matches, otherwise n_found is the number of tasks returned
         return_json : bool, default is True
             Return the results as a list of json instead of objects
         with_ids : bool, default is True
@@ -1335,16 +1828,14 @@ class MongoengineSocket:
         meta = get_metadata_template()
         query, error = format_query(program=program, id=id, hash_index=hash_index, status=status)
 
-        q_limit = self.get_limit(limit)
-
         data = []
         try:
             if projection:
-                data = TaskQueueORM.objects(**query).only(*projection).limit(q_limit).skip(skip)
+                data = TaskQueueORM.objects(**query).only(*projection)
             else:
-                data = TaskQueueORM.objects(**query).limit(q_limit).skip(skip)
+                data = TaskQueueORM.objects(**query)
 
-            meta["n_found"] = data.count()
+            data = self._paginate(data, meta, limit, skip, cursor, count)
             meta["success"] = True
         except Exception as err:
             meta['error_description'] = str(err)
@@ -1415,6 +1906,10 @@ class MongoengineSocket:
         if results + procedures < tasks:
             self.logger.error("Some tasks don't reference results or procedures correctly!"
                               "Tasks: {}, ResultORMs: {}, procedures: {}. ".format(tasks, results, procedures))
+
+        if procedures:
+            self._wake_task_services(task_ids)
+
         return tasks
 
     def queue_mark_error(self, data):
@@ -1423,11 +1918,12 @@ class MongoengineSocket:
 
         """
 
+        # All error messages are stored in a single round trip
+        error_ids = self.add_kvstore([msg for task_id, msg in data])["data"]
+
         bulk_commands = []
         bulk_commands_records = []
-        task_ids = []
-        for task_id, msg in data:
-            task_ids.append(task_id)
+        for (task_id, msg), error_id in zip(data, error_ids):
             update = {
                 "$set": {
                     "status": "ERROR",
@@ -1439,7 +1935,6 @@ class MongoengineSocket:
 
             # Update the objects as well, different from mark complete as these are not processed the same way
             # This design should be overhauled...
-            error_id = self.add_kvstore([msg])["data"][0]
             update = {
                 "$set": {
                     "status": "ERROR",
@@ -1461,6 +1956,9 @@ class MongoengineSocket:
                 "Queue Mark Error: Number of tasks updates {}, does not match the number of records updates {}.".
                 format(task_mod, rec_mod))
 
+        # Failed procedures wake their services as well, which then report the error
+        self._wake_task_services([task_id for task_id, msg in data])
+
         return task_mod
 
     def queue_reset_status(self, manager: str, reset_running: bool=True, reset_error: bool=False) -> int:
@@ -1617,6 +2115,8 @@ class MongoengineSocket:
             except mongoengine.errors.NotUniqueError:
                 success = False
 
+        self._credential_cache.invalidate(username)
+
         if return_password and success:
             return password
         else:
@@ -1658,6 +2158,14 @@ class MongoengineSocket:
         if self._bypass_security or (self._allow_read and (permission == "read")):
             return (True, "Success")
 
+        # Recently verified credentials skip the user lookup and bcrypt
+        permissions = self._credential_cache.get(username, password)
+        if permissions is not None:
+            if (permission.lower() not in permissions) and ("admin" not in permissions):
+                return (False, "User has insufficient permissions.")
+            return (True, "Success")
+
+        generation = self._credential_cache.generation(username)
         data = UserORM.objects(username=username).first()
         if data is None:
             return (False, "User not found.")
@@ -1666,6 +2174,8 @@ class MongoengineSocket:
         if pwcheck is False:
             return (False, "Incorrect password.")
 
+        self._credential_cache.add(username, password, data.permissions, generation)
+
         # Admin has access to everything
         if (permission.lower() not in data.permissions) and ("admin" not in data.permissions):
             return (False, "User has insufficient permissions.")
@@ -1685,4 +2195,7 @@ class MongoengineSocket:
         bool
             If the operation was successful or not.
         """
-        return UserORM.objects(username=username).delete() == 1
+        success = UserORM.objects(username=username).delete() == 1
+        self._credential_cache.invalidate(username)
+
+        return success
@@ -0,0 +1,169 @@
+"""
+Scheduling policies that decide which waiting tasks queue_get_next hands to a manager.
+"""
+
+import abc
+import datetime
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+# Fields of the candidate tasks passed to the policies
+candidate_fields = ("priority", "created_on", "tag", "owner", "program", "procedure")
+
+
+class SchedulingPolicy(abc.ABC):
+    """
+    Orders waiting tasks for a manager.
+
+    Candidates are dictionaries of the id and the `candidate_fields` of waiting tasks. The storage sockets
+    pull the oldest waiting tasks of every combination of the `partition` fields, so that a policy sees the
+    head of every share group and priority level, and then claim the selected tasks in order. A policy
+    without partition fields is claimed directly from the database in `claim_sort` order instead.
+    """
+
+    # Task fields the candidates are partitioned on
+    partition: Tuple[str, ...] = ()
+
+    # The task field the running tasks are counted on, passed to select as usage
+    share_key: Optional[str] = None
+
+    # Task order of policies without partition fields
+    claim_sort: List[Tuple[str, int]] = [("priority", -1), ("created_on", 1)]
+
+    @abc.abstractmethod
+    def select(self, candidates: List[Dict[str, Any]], limit: int, usage: Dict[Any, int], affinity: Set[str],
+               now: datetime.datetime) -> List[Any]:
+        """
+        Selects up to `limit` tasks from the candidates.
+
+        Parameters
+        ----------
+        candidates : List[Dict[str, Any]]
+            The waiting tasks a manager can run
+        limit : int
+            The maximum number of tasks to select
+        usage : Dict[Any, int]
+            The number of running tasks of every `share_key` value
+        affinity : Set[str]
+            The programs the manager is currently running
+        now : datetime.datetime
+            The current UTC time
+
+        Returns
+        -------
+        List[Any]
+            The ids of the selected tasks in claim order
+        """
+
+
+class PriorityPolicy(SchedulingPolicy):
+    """
+    Hands out the tasks with the highest priority first and the oldest tasks first within a priority.
+    """
+
+    def __repr__(self) -> str:
+        return "PriorityPolicy()"
+
+    def select(self, candidates, limit, usage, affinity, now):
+        candidates = sorted(candidates, key=lambda x: (-int(x["priority"]), x["created_on"]))
+        return [x["id"] for x in candidates[:limit]]
+
+
+class FairSharePolicy(SchedulingPolicy):
+    """
+    Shares the compute between the users (or tags, programs) of a priority level by weight.
+
+    A task is handed to the group with the fewest running tasks per weight among the groups whose next
+    task has the highest priority. Starved groups age, the next task of a group without running tasks
+    rises one priority level for every `aging` seconds it waited, so that low priority work is never
+    starved by a backlog of higher priority tasks. Groups whose next task is of a program the manager
+    already runs are preferred as if they ran `affinity` fewer tasks per weight.
+
+    Examples
+    --------
+
+    >>> policy = FairSharePolicy("owner", weights={"alice": 2}, aging=3600)
+    """
+
+    def __init__(self, key: str="owner", weights: Optional[Dict[Any, float]]=None, aging: float=3600,
+                 affinity: float=0):
+        """
+        Parameters
+        ----------
+        key : str, optional
+            The task field to share on, 'owner', 'tag', 'program' or 'procedure'
+        weights : Optional[Dict[Any, float]], optional
+            The weight of key values, unlisted values have a weight of 1
+        aging : float, optional
+            The number of seconds of waiting that raise the next task of a starved group by one priority level,
+            0 disables aging
+        affinity : float, optional
+            The share bonus of tasks of programs the manager already runs
+        """
+
+        if key not in candidate_fields:
+            raise KeyError("Fair share key must be one of {}, found {}.".format(candidate_fields, key))
+
+        self.key = key
+        self.weights = weights or {}
+        self.aging = aging
+        self.affinity = affinity
+
+        self.partition = (key, "priority")
+        self.share_key = key
+
+    def __repr__(self) -> str:
+        return "FairSharePolicy(key={}, aging={}, affinity={})".format(repr(self.key), self.aging, self.affinity)
+
+    def select(self, candidates, limit, usage, affinity, now):
+
+        # The tasks of every group, the next task is the last one
+        groups = defaultdict(list)
+        for task in candidates:
+            groups[task[self.key]].append(task)
+        for tasks in groups.values():
+            tasks.sort(key=lambda x: (-int(x["priority"]), x["created_on"]), reverse=True)
+
+        usage = defaultdict(int, usage)
+
+        def rank(group):
+            task = groups[group][-1]
+
+            level = int(task["priority"])
+            if self.aging and (usage[group] <= 0):
+                level += int((now - task["created_on"]).total_seconds() // self.aging)
+
+            share = usage[group] / self.weights.get(group, 1)
+            if task["program"] in affinity:
+                share -= self.affinity
+
+            return (-level, share, task["created_on"])
+
+        selected = []
+        while groups and (len(selected) < limit):
+            group = min(groups, key=rank)
+
+            selected.append(groups[group].pop()["id"])
+            usage[group] += 1
+            if not groups[group]:
+                del groups[group]
+
+        return selected
+
+
+_policies = {"priority": PriorityPolicy, "fair_share": FairSharePolicy}
+
+
+def get_scheduling_policy(policy: Union[str, SchedulingPolicy], **kwargs) -> SchedulingPolicy:
+    """
+    Returns a scheduling policy by name ('priority' or 'fair_share'), policy instances are passed through.
+    """
+
+    if isinstance(policy, SchedulingPolicy):
+        return policy
+
+    if policy not in _policies:
+        raise KeyError("Scheduling policy {} not understood, available policies: {}.".format(
+            policy, list(_policies)))
+
+    return _policies[policy](**kwargs)
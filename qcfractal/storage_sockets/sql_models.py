@@ -1,7 +1,7 @@
 import datetime
 # from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import (Column, Integer, String, Text, DateTime, Boolean,
-                        ForeignKey, JSON, Enum, Float, Binary, Table)
+                        ForeignKey, JSON, Enum, Float, Binary, Table, Index)
 from sqlalchemy.orm import relationship, object_session, column_property
 from qcfractal.interface.models.records import RecordStatusEnum, DriverEnum
 from qcfractal.interface.models.task_models import TaskStatusEnum, ManagerStatusEnum, PriorityEnum
@@ -138,19 +138,10 @@ class MoleculeORM(Base):
     # def __str__(self):
     #     return str(self.id)
 
-    # meta = {
-    #
-    #     'indexes': [
-    #         {
-    #             'fields': ('molecule_hash', ),
-    #             'unique': False
-    #         },  # should almost be unique
-    #         {
-    #             'fields': ('molecular_formula', ),
-    #             'unique': False
-    #         }
-    #     ]
-    # }
+    __table_args__ = (
+        Index('ix_molecule_hash', 'molecule_hash', unique=True),  # molecules are stored once per hash
+        Index('ix_molecule_formula', 'molecular_formula', unique=False),
+    )
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -171,7 +162,7 @@ class KeywordsORM(Base):
     exact_floats = Column(Boolean, default=False)
     comments = Column(String)
 
-    # meta = {'indexes': [{'fields': ('hash_index', ), 'unique': True}]}
+    __table_args__ = (Index('ix_keywords_hash_index', 'hash_index', unique=True), )
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -220,10 +211,10 @@ class BaseResultORM(Base):
     # Carry-ons
     provenance = Column(JSON)
 
-    # meta = {
-    #     # 'allow_inheritance': True,
-    #     'indexes': ['status']
-    # }
+    __table_args__ = (
+        Index('ix_base_result_status', 'status'),
+        Index('ix_base_result_program', 'program'),
+    )
 
     # def save(self, *args, **kwargs):
     #     """Override save to set defaults"""
@@ -272,15 +263,11 @@ class ResultORM(BaseResultORM):
     # schema_name = Column(String)  # default="qc_ret_data_output"??
     # schema_version = Column(Integer)
 
-    # meta = {
-    #     # 'collection': 'result',
-    #     'indexes': [
-    #         {
-    #             'fields': ('program', 'driver', 'method', 'basis', 'molecule', 'keywords'),
-    #             'unique': True
-    #         },
-    #     ]
-    # }
+    # The unique index of the MongoDB model also holds the program, which lives in base_result here.
+    # An index cannot span the two tables of the inheritance, uniqueness is enforced in add_results.
+    __table_args__ = (
+        Index('ix_result_combined', 'driver', 'method', 'basis', 'molecule', 'keywords', unique=False),
+    )
 
     __mapper_args__ = {
         'polymorphic_identity': 'result',
@@ -441,7 +428,11 @@ class TaskQueueORM(Base):
     procedure = Column(String)
     status = Column(Enum(TaskStatusEnum), default=TaskStatusEnum.waiting)
     priority = Column(Enum(PriorityEnum), default=PriorityEnum.NORMAL)
+    owner = Column(String, default=None)
     manager = Column(String, default=None)
+    cores = Column(Integer, default=None)
+    memory = Column(Float, default=None)
+    walltime = Column(Float, default=None)
     error = Column(String)  # TODO: is this an error object? should be in results?
 
     created_on = Column(DateTime, default=datetime.datetime.utcnow)
@@ -451,17 +442,13 @@ class TaskQueueORM(Base):
     base_result = Column(Integer, ForeignKey("base_result.id"), unique=True)
     base_result_obj = relationship(BaseResultORM, lazy='select')  # or lazy='joined'
 
-    # meta = {
-    #     'indexes': [
-    #         'created_on',
-    #         'status',
-    #         'manager',
-    #         {
-    #             'fields': ('base_result', ),
-    #             'unique': True
-    #         },  # new
-    #     ]
-    # }
+    __table_args__ = (
+        # Specification fields of queue_get_next, then the sort order
+        Index('ix_task_queue_spec', 'status', 'program', 'procedure', 'tag'),
+        Index('ix_task_queue_order', 'priority', 'created_on'),
+        Index('ix_task_queue_manager', 'manager'),
+        Index('ix_task_queue_owner', 'status', 'owner', 'priority', 'created_on'),
+    )
 
     # def save(self, *args, **kwargs):
     #     """Override save to update modified_on"""
@@ -475,6 +462,13 @@ class TaskQueueORM(Base):
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 
+# Reverse index of the procedures a service waits on, a finished procedure marks the service ready
+service_procedure_association = Table('service_procedure_association', Base.metadata,
+    Column('service_id', Integer, ForeignKey('service_queue.id', ondelete="CASCADE")),
+    Column('procedure_id', Integer, ForeignKey('base_result.id', ondelete="CASCADE"), index=True)
+)
+
+
 class ServiceQueueORM(Base):
 
     __tablename__ = "service_queue"
@@ -488,19 +482,27 @@ class ServiceQueueORM(Base):
     procedure_id = Column(Integer, ForeignKey("base_result.id"))
     procedure = relationship(BaseResultORM, lazy='joined')
 
+    # The full service, the columns above are the fields it is queried on
+    extra = Column(JSON)
+
+    # Idle services are not pulled until one of their required procedures finishes
+    ready = Column(Boolean, default=True)
+
     # created_on = Column(DateTime, nullable=False)
     # modified_on = Column(DateTime, nullable=False)
 
-    # meta = {
-    #     'indexes': [
-    #         'status',
-    #         {
-    #             'fields': ("status", "tag", "hash_index"),
-    #             'unique': False
-    #         },
-    #         # {'fields': ('procedure',), 'unique': True}
-    #     ]
-    # }
+    __table_args__ = (
+        Index('ix_service_queue_status', 'status', 'ready'),
+    )
+
+    def to_dict(self, with_id=True, exclude=None):
+        ret = {**(self.extra or {}), "status": self.status.value, "tag": self.tag, "hash_index": self.hash_index,
+               "procedure_id": self.procedure_id}
+        if with_id:
+            ret["id"] = self.id
+        for key in (exclude or []):
+            ret.pop(key, None)
+        return ret
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -533,6 +535,11 @@ class QueueManagerORM(Base):
     uuid = Column(String)
     tag = Column(String)
 
+    # task slot resources
+    cores = Column(Integer)
+    memory = Column(Float)
+    walltime = Column(Float)
+
     # counts
     completed = Column(Integer, default=0)
     submitted = Column(Integer, default=0)
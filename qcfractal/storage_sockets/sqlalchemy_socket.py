@@ -13,8 +13,9 @@ except ImportError:
 
 
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
 from .sql_models import Base
-from sqlalchemy.orm import sessionmaker, with_polymorphic
+from sqlalchemy.orm import lazyload, sessionmaker, with_polymorphic
 from sqlalchemy.exc import IntegrityError
 from contextlib import contextmanager
 
@@ -22,17 +23,19 @@ import bcrypt
 import logging
 import secrets
 from datetime import datetime as dt
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from sqlalchemy.sql.expression import func
-from qcfractal.storage_sockets.storage_utils import (add_metadata_template,
+from sqlalchemy.sql.expression import func, or_, select, true
+from qcfractal.storage_sockets.scheduling import SchedulingPolicy, candidate_fields, get_scheduling_policy
+from qcfractal.storage_sockets.storage_utils import (CredentialCache, add_metadata_template,
                                                      get_metadata_template)
 
 # SQL ORMs
 from qcfractal.storage_sockets.sql_models import (CollectionORM, KeywordsORM,
                          MoleculeORM, BaseResultORM, OptimizationProcedureORM,
                          QueueManagerORM, ResultORM, ErrorORM, ServiceQueueORM,
-                         TaskQueueORM, UserORM, TorsionDriveProcedureORM, LogsORM)
+                         TaskQueueORM, UserORM, TorsionDriveProcedureORM, LogsORM,
+                         opt_result_association, torj_opt_association, service_procedure_association)
 
 # pydantic classes
 from qcfractal.interface.models import (KeywordSet, Molecule, ResultRecord, TaskRecord,
@@ -94,6 +97,14 @@ def get_count_fast(query):
 
     return count
 
+def chunk_list(values, chunk_size):
+    """
+    Yields successive chunks of at most `chunk_size` elements from a list.
+    """
+
+    for i in range(0, len(values), chunk_size):
+        yield values[i:i + chunk_size]
+
 def get_procedure_class(record):
 
     if isinstance(record, OptimizationRecord):
@@ -118,7 +129,9 @@ class SQLAlchemySocket:
                  allow_read: bool=True,
                  logger: 'Logger'=None,
                  sql_echo: bool= False,
-                 max_limit: int=1000):
+                 max_limit: int=1000,
+                 auth_cache_ttl: float=60,
+                 scheduler: Union[str, SchedulingPolicy]="priority"):
         """
         Constructs a new SQLAlchemy socket
 
@@ -133,16 +146,25 @@ class SQLAlchemySocket:
         # Security
         self._bypass_security = bypass_security
         self._allow_read = allow_read
+        self._credential_cache = CredentialCache(ttl=auth_cache_ttl)
+
+        # Picks the tasks handed to managers
+        self.scheduler = get_scheduling_policy(scheduler)
 
         self._lower_results_index = ["method", "basis", "program"]
 
         # disconnect from any active default connection
         # disconnect()
 
+        # SQLite does not use a QueuePool, so a pool size cannot be given
+        engine_kwargs = {}
+        if not uri.startswith("sqlite"):
+            engine_kwargs["pool_size"] = 5  # 5 is the default, 0 means unlimited
+
         # Connect to DB and create session
         self.engine = create_engine(uri,
                                     echo=sql_echo,  # echo for logging into python logging
-                                    pool_size=5  # 5 is the default, 0 means unlimited
+                                    **engine_kwargs
                                     )
         self.logger.info('Connected SQLAlchemy to DB dialect {} with driver {}'.format(
             self.engine.dialect.name, self.engine.driver))
@@ -178,6 +200,13 @@ class SQLAlchemySocket:
         self._project_name = project
         self._max_limit = max_limit
 
+        # Bulk statements are split so that they stay under the bind parameter limit of the database
+        if self.engine.dialect.name == "sqlite":
+            self._max_bind_params = 999
+        else:
+            self._max_bind_params = 32767
+        self._bulk_chunk_size = 1000
+
 
     def __str__(self) -> str:
         return "<SQLAlchemy: address='{0:s}:{1:d}:{2:s}'>".format(str(self._url), self._port, str(self._project_name))
@@ -220,20 +249,152 @@ class SQLAlchemySocket:
 
         return limit if limit and limit < self._max_limit else self._max_limit
 
-    def get_query_projection(self, className, query, projection, limit, skip):
+    def check_indexes(self) -> Dict[str, List[str]]:
+        """
+        Compares the indexes declared in the ORM models with the ones present in the database.
+
+        `create_all` does not add new indexes to tables that already exist, databases created
+        by older versions will report them as missing. Unused indexes are only reported on
+        PostgreSQL (from pg_stat_user_indexes) and count scans since the statistics were last reset.
+
+        Returns
+        -------
+        Dict with keys: missing, unused
+            Names of the declared indexes that do not exist in the database, and names of
+            the indexes in the database that have never been scanned
+        """
+
+        inspector = sqlalchemy.inspect(self.engine)
+
+        tables = set(inspector.get_table_names())
+
+        missing = []
+        for table in Base.metadata.sorted_tables:
+            if table.name not in tables:
+                missing.extend(sorted(idx.name for idx in table.indexes))
+                continue
+
+            found = {idx["name"] for idx in inspector.get_indexes(table.name)}
+            missing.extend(sorted(idx.name for idx in table.indexes if idx.name not in found))
+
+        unused = []
+        if self.engine.dialect.name == "postgresql":
+            # Primary keys and unique indexes enforce constraints, they are never reported
+            stmt = sqlalchemy.text("SELECT s.indexrelname FROM pg_stat_user_indexes s "
+                                   "JOIN pg_index i ON i.indexrelid = s.indexrelid "
+                                   "WHERE s.idx_scan = 0 AND NOT i.indisunique "
+                                   "ORDER BY s.indexrelname")
+            with self.engine.connect() as conn:
+                unused = [row[0] for row in conn.execute(stmt)]
+
+        return {"missing": missing, "unused": unused}
+
+    def _bulk_insert(self, session, className, rows: List[Dict[str, Any]]) -> int:
+        """
+        Inserts rows into the table of `className` using multi-row INSERT statements.
+
+        On PostgreSQL rows that violate a unique constraint are skipped (ON CONFLICT DO NOTHING), this
+        only deduplicates concurrent inserts of tables with a unique key such as ``molecule_hash`` or
+        the ``base_result`` of tasks. The ids of the new rows are not returned, callers should look them
+        up through that unique field.
+
+        Returns
+        -------
+        int
+            The number of INSERT statements issued
+        """
+
+        if not rows:
+            return 0
+
+        table = className.__table__
+
+        # A multi-row VALUES clause requires every row to have the same keys
+        fill = {}
+        for key in set().union(*rows):
+            default = table.c[key].default
+            if default is None:
+                fill[key] = None
+            elif default.is_callable:
+                fill[key] = default.arg(None)
+            else:
+                fill[key] = default.arg
+        rows = [{**fill, **row} for row in rows]
+
+        if self.engine.dialect.name == "postgresql":
+            stmt = postgresql.insert(table).on_conflict_do_nothing()
+        else:
+            stmt = table.insert()
+
+        chunk_size = max(1, min(self._bulk_chunk_size, self._max_bind_params // len(fill)))
+        nstatements = 0
+        for chunk in chunk_list(rows, chunk_size):
+            session.execute(stmt.values(chunk))
+            nstatements += 1
+
+        return nstatements
+
+    def _get_ids_by_field(self, session, className, field: str, values: List[Any]) -> Dict[Any, int]:
+        """
+        Maps the values of an (indexed) field to the ids of the rows holding them using IN queries.
+        """
+
+        column = getattr(className, field)
+
+        ret = {}
+        for chunk in chunk_list(list(values), self._max_bind_params):
+            ret.update(session.query(column, className.id).filter(column.in_(chunk)))
+
+        return ret
+
+    def _paginate(self, className, data, meta: Dict[str, Any], limit: Optional[int], skip: int,
+                  cursor: Optional[str], count: bool) -> List[Any]:
+        """Runs a query with offset or keyset pagination and fills the n_found and next_cursor fields of meta.
+
+        If `cursor` is not None the rows are ordered by id and only those with an id greater than
+        `cursor` are returned, an empty cursor starts from the first row. n_found is the total number
+        of matching rows in both modes, it is counted before the cursor, limit and skip are applied.
+        If `count` is False the total count query is skipped and n_found is the number of rows returned.
+        """
+
+        if count:
+            meta["n_found"] = get_count_fast(data)
+
+        q_limit = self.get_limit(limit)
+        if cursor is None:
+            data = data.limit(q_limit).offset(skip)
+        else:
+            data = data.order_by(className.id)
+            if cursor:
+                data = data.filter(className.id > int(cursor))
+            data = data.limit(q_limit)
+
+        rows = data.all()
+        if not count:
+            meta["n_found"] = len(rows)
+
+        if (cursor is not None) and (len(rows) == q_limit):
+            meta["next_cursor"] = str(rows[-1].id)
+
+        return rows
+
+    def get_query_projection(self, className, query, projection, limit, skip, meta, cursor=None, count=True):
 
         with self.session_scope() as session:
             if projection:
                 proj = [getattr(className, i) for i in projection]
-                data = session.query(*proj).filter(*query).limit(self.get_limit(limit)).offset(skip)
-                n_found = get_count_fast(data)
-                rdata = [dict(zip(projection, row)) for row in data]
+                if (cursor is not None) and ("id" not in projection):
+                    # The keyset needs the id of the last row
+                    proj.append(className.id)
+                data = session.query(*proj).filter(*query)
+                rows = self._paginate(className, data, meta, limit, skip, cursor, count)
+                rdata = [dict(zip(projection, row)) for row in rows]
             else:
-                data = session.query(className).filter(*query).limit(self.get_limit(limit)).offset(skip)
-                n_found = get_count_fast(data)
-                rdata = [d.to_dict() for d in data.all()]
+                data = session.query(className).filter(*query)
+                rows = self._paginate(className, data, meta, limit, skip, cursor, count)
+                rdata = [d.to_dict() for d in rows]
 
-        return rdata, n_found
+        return rdata
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~ Logs (KV store) ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
     def add_logs(self, blobs_list: List[Any]):
@@ -374,51 +535,67 @@ class SQLAlchemySocket:
 
         meta = add_metadata_template()
 
-        results = []
-        with self.session_scope() as session:
-            for dmol in molecules:
+        # Hash every molecule once, molecules repeated in the list are only inserted once
+        mol_hashes = []
+        new_mols = {}
+        for dmol in molecules:
 
-                mol_dict = dmol.json_dict(exclude={"id"})
+            mol_dict = dmol.json_dict(exclude={"id"})
 
-                # TODO: can set them as defaults in the sql_models, not here
-                mol_dict["fix_com"] = True
-                mol_dict["fix_orientation"] = True
+            # TODO: can set them as defaults in the sql_models, not here
+            mol_dict["fix_com"] = True
+            mol_dict["fix_orientation"] = True
 
-                # Build fresh indices
-                mol_dict["molecule_hash"] = dmol.get_hash()
-                mol_dict["molecular_formula"] = dmol.get_molecular_formula()
+            # Build fresh indices
+            mol_dict["molecule_hash"] = dmol.get_hash()
+            mol_dict["molecular_formula"] = dmol.get_molecular_formula()
 
-                mol_dict["identifiers"] = {}
-                mol_dict["identifiers"]["molecule_hash"] = mol_dict["molecule_hash"]
-                mol_dict["identifiers"]["molecular_formula"] = mol_dict["molecular_formula"]
+            mol_dict["identifiers"] = {}
+            mol_dict["identifiers"]["molecule_hash"] = mol_dict["molecule_hash"]
+            mol_dict["identifiers"]["molecular_formula"] = mol_dict["molecular_formula"]
 
-                # search by index keywords not by all keys, much faster
+            mol_hashes.append(mol_dict["molecule_hash"])
+            new_mols.setdefault(mol_dict["molecule_hash"], mol_dict)
 
-                doc = session.query(MoleculeORM).filter_by(molecule_hash=mol_dict['molecule_hash'])
+        with self.session_scope() as session:
 
-                if doc.count() == 0:
-                    doc = MoleculeORM(**mol_dict)
-                    session.add(doc)
-                    # Todo: commit at the end, but list itself might have duplicates
-                    session.commit()
-                    results.append(str(doc.id))
-                    meta['n_inserted'] += 1
-                else:
+            # search by index keywords not by all keys, much faster
+            mol_ids = self._get_ids_by_field(session, MoleculeORM, "molecule_hash", new_mols.keys())
 
-                    id = str(doc.first().id)
-                    meta['duplicates'].append(id)  # TODO
-                    # If new or duplicate, add the id to the return list
-                    results.append(id)
+            # Insert the new molecules in bulk and look up their ids
+            inserted = [v for k, v in new_mols.items() if k not in mol_ids]
+            self._bulk_insert(session, MoleculeORM, inserted)
+            inserted = {x["molecule_hash"] for x in inserted}
+            mol_ids.update(self._get_ids_by_field(session, MoleculeORM, "molecule_hash", inserted))
+
+        # Rebuild the ids in input order
+        results = []
+        for mol_hash in mol_hashes:
+            id = str(mol_ids[mol_hash])
+            results.append(id)
+
+            if mol_hash in inserted:
+                inserted.remove(mol_hash)
+                meta['n_inserted'] += 1
+            else:
+                # We should make sure there was not a hash collision?
+                # new_mol.compare(old_mol)
+                # raise KeyError("!!! WARNING !!!: Hash collision detected")
+                meta['duplicates'].append(id)
 
-                    # We should make sure there was not a hash collision?
-                    # new_mol.compare(old_mol)
-                    # raise KeyError("!!! WARNING !!!: Hash collision detected")
         meta["success"] = True
 
         ret = {"data": results, "meta": meta}
         return ret
 
-    def get_molecules(self, id=None, molecule_hash=None, molecular_formula=None, limit: int=None, skip: int=0):
+    def get_molecules(self,
+                      id=None,
+                      molecule_hash=None,
+                      molecular_formula=None,
+                      limit: int=None,
+                      skip: int=0,
+                      cursor: str=None,
+                      count: bool=True):
 
         ret = {"meta": get_metadata_template(), "data": []}
 
@@ -430,14 +607,11 @@ class SQLAlchemySocket:
 
         # Make the query
         with self.session_scope() as session:
-            data = session.query(MoleculeORM).filter(*query)\
-                                        .limit(self.get_limit(limit))\
-                                        .offset(skip)  # TODO: don't use offset, slow for large data
+            data = session.query(MoleculeORM).filter(*query)
+            data = self._paginate(MoleculeORM, data, ret["meta"], limit, skip, cursor, count)
 
             ret["meta"]["success"] = True
-            ret["meta"]["n_found"] = get_count_fast(data)
             # ret["meta"]["errors"].extend(errors)
-            data = data.all()
 
             # Don't include the hash or the molecular_formula in the returned result
             # Todo: tobe removed after bug is fixed in elemental
@@ -711,6 +885,43 @@ class SQLAlchemySocket:
         ret = {'data': col_id, 'meta': meta}
         return ret
 
+    def update_collection(self,
+                          collection: str,
+                          name: str,
+                          updates: Optional[Dict[str, Dict[str, Any]]]=None,
+                          additions: Optional[Dict[str, List[Any]]]=None):
+        """Partially updates an existing collection, see the MongoEngine socket.
+
+        The extra data of a collection is a single JSON column, so it is rewritten in the database
+        but only the changes are sent by the client.
+        """
+
+        meta = add_metadata_template()
+        found = False
+        try:
+            with self.session_scope() as session:
+                col = session.query(CollectionORM).filter_by(collection=collection.lower(), name=name.lower()).first()
+                if col is None:
+                    raise KeyError("Collection '{}: {}' not found.".format(collection, name))
+
+                data = dict(col.data or {})
+                for field, entries in (updates or {}).items():
+                    data[field] = {**data.get(field, {}), **entries}
+
+                for field, items in (additions or {}).items():
+                    current = list(data.get(field, []))
+                    data[field] = current + [x for x in items if x not in current]
+
+                col.data = data
+                found = True
+
+            meta['success'] = True
+            meta['n_inserted'] = sum(len(x) for x in (updates or {}).values())
+        except Exception as err:
+            meta['error_description'] = str(err)
+
+        return {'data': found, 'meta': meta}
+
     # def get_collections(self, keys, projection=None):
     def get_collections(self,
                         collection: str=None,
@@ -745,7 +956,7 @@ class SQLAlchemySocket:
         query = format_query(CollectionORM, name=name, collection=collection)
 
         # try:
-        rdata, meta['n_found'] = self.get_query_projection(CollectionORM, query, projection, limit, skip)
+        rdata = self.get_query_projection(CollectionORM, query, projection, limit, skip, meta)
 
         for data in rdata:
             data.update({k: v for k, v in data['data'].items()})
@@ -886,6 +1097,8 @@ class SQLAlchemySocket:
                     projection=None,
                     limit: int=None,
                     skip: int=0,
+                    cursor: str=None,
+                    count: bool=True,
                     return_json=True,
                     with_ids=True):
         """
@@ -912,6 +1125,11 @@ class SQLAlchemySocket:
             (This is to avoid overloading the server)
         skip : int, default is 0
             skip the first 'skip' results. Used to paginate
+        cursor : str, default is None
+            Keyset pagination, return the results with an id greater than `cursor` ordered by id.
+            An empty string starts from the first one. Used instead of skip for large queries
+        count : bool, default is True
+            Count the total number of matches, otherwise n_found is the number of results returned
         return_json : bool, default is True
             Return the results as a list of json inseated of objects
         with_ids : bool, default is True
@@ -946,7 +1164,7 @@ class SQLAlchemySocket:
         data = []
 
         # try:
-        data, meta['n_found'] = self.get_query_projection(ResultORM, query, projection, limit, skip)
+        data = self.get_query_projection(ResultORM, query, projection, limit, skip, meta, cursor=cursor, count=count)
         meta["success"] = True
         # except Exception as err:
         #     meta['error_description'] = str(err)
@@ -1075,6 +1293,8 @@ class SQLAlchemySocket:
                        projection=None,
                        limit: int=None,
                        skip: int=0,
+                       cursor: str=None,
+                       count: bool=True,
                        return_json=True,
                        with_ids=True):
         """
@@ -1097,6 +1317,11 @@ class SQLAlchemySocket:
             (This is to avoid overloading the server)
         skip : int, default is 0
             skip the first 'skip' resaults. Used to paginate
+        cursor : str, default is None
+            Keyset pagination, return the results with an id greater than `cursor` ordered by id.
+            An empty string starts from the first one. Used instead of skip for large queries
+        count : bool, default is True
+            Count the total number of matches, otherwise n_found is the number of results returned
         return_json : bool, deafult is True
             Return the results as a list of json inseated of objects
         with_ids : bool, default is True
@@ -1128,7 +1353,8 @@ class SQLAlchemySocket:
         try:
             # TODO: decide a way to find the right type
 
-            data, meta['n_found'] = self.get_query_projection(className, query, projection, limit, skip)
+            data = self.get_query_projection(className, query, projection, limit, skip, meta,
+                                             cursor=cursor, count=count)
             meta["success"] = True
         except Exception as err:
             meta['error_description'] = str(err)
@@ -1136,6 +1362,78 @@ class SQLAlchemySocket:
 
         return {"data": data, "meta": meta}
 
+    def get_procedure_counts(self, id: Union[str, List]):
+        """
+        Counts the optimizations and gradient evaluations of procedures without returning the procedures
+        themselves, see the MongoEngine socket. Gradients are counted with a GROUP BY over the
+        optimization and torsiondrive association tables, repeated history entries count once.
+
+        Parameters
+        ----------
+        id : str or list
+            The procedure ids
+
+        Returns
+        -------
+        Dict with keys: data, meta
+            Data is a dictionary of {id: {"status": str, "optimizations": int, "gradients": int}}
+        """
+
+        meta = get_metadata_template()
+
+        if isinstance(id, (str, int)):
+            id = [id]
+
+        ids = []
+        bad = []
+        for x in id:
+            try:
+                ids.append(int(x))
+            except (TypeError, ValueError):
+                bad.append(x)
+        if bad:
+            meta["errors"].append(("id", bad))
+
+        opt_traj = opt_result_association.c
+        torj_opt = torj_opt_association.c
+
+        data = {}
+        try:
+            with self.session_scope() as session:
+                procedures = session.query(BaseResultORM.id, BaseResultORM.procedure, BaseResultORM.status)\
+                                    .filter(BaseResultORM.id.in_(ids)).all()
+
+                opt_counts = session.query(opt_traj.opt_id, func.count(opt_traj.result_id))\
+                                    .filter(opt_traj.opt_id.in_(ids))\
+                                    .group_by(opt_traj.opt_id).all()
+                opt_counts = {x: (1, n) for x, n in opt_counts}
+
+                td_opts = session.query(torj_opt.torj_id, torj_opt.opt_id)\
+                                 .filter(torj_opt.torj_id.in_(ids)).distinct().subquery()
+                td_counts = session.query(td_opts.c.torj_id, func.count(func.distinct(td_opts.c.opt_id)),
+                                          func.count(opt_traj.result_id))\
+                                   .select_from(td_opts)\
+                                   .outerjoin(opt_result_association, opt_traj.opt_id == td_opts.c.opt_id)\
+                                   .group_by(td_opts.c.torj_id).all()
+                opt_counts.update({x: (nopt, ngrad) for x, nopt, ngrad in td_counts})
+
+                for x, procedure, status in procedures:
+                    nopt, ngrad = opt_counts.get(x, (int(procedure == "optimization"), 0))
+                    data[str(x)] = {
+                        "status": getattr(status, "value", status),
+                        "optimizations": nopt,
+                        "gradients": ngrad
+                    }
+
+            meta["n_found"] = len(data)
+            meta["missing"] = [str(x) for x in ids if str(x) not in data]
+            meta["success"] = True
+        except Exception as err:
+            data = {}
+            meta['error_description'] = str(err)
+
+        return {"data": data, "meta": meta}
+
     def update_procedures(self, records_list: List['BaseRecord']):
         """
         TODO: needs to be of specific type
@@ -1221,7 +1519,7 @@ class SQLAlchemySocket:
                 service.procedure_id = proc_id
 
                 if doc.count() == 0:
-                    doc = ServiceQueueORM(**service.json_dict(exclude={"id"}))
+                    doc = ServiceQueueORM(**self._service_row(service))
                     session.add(doc)
                     session.commit()  # TODO
                     procedure_ids.append(proc_id)
@@ -1269,11 +1567,13 @@ class SQLAlchemySocket:
         """
 
         meta = get_metadata_template()
-        query, error = format_query(id=id, hash_index=hash_index, procedure_id=procedure_id, status=status)
+        if status is not None:
+            status = TaskStatusEnum(status)
+        query = format_query(ServiceQueueORM, id=id, hash_index=hash_index, procedure_id=procedure_id, status=status)
 
         data = []
         # try:
-        data, meta['n_found'] = self.get_query_projection(ServiceQueueORM, query, projection, limit, skip)
+        data = self.get_query_projection(ServiceQueueORM, query, projection, limit, skip, meta)
         meta["success"] = True
 
         meta["success"] = True
@@ -1300,21 +1600,126 @@ class SQLAlchemySocket:
         """
 
         updated_count = 0
-        for service in records_list:
-            if service.id is None:
-                self.logger.error(
-                    "No service id found on update (hash_index={}), skipping.".format(service.hash_index))
-                continue
+        with self.session_scope() as session:
+            for service in records_list:
+                if service.id is None:
+                    self.logger.error(
+                        "No service id found on update (hash_index={}), skipping.".format(service.hash_index))
+                    continue
 
-            with self.session_scope() as session:
-                service = ServiceQueueORM(**service.json_dict())
-                session.merge(service)
-                session.commit()
+                # The ready flag is left to claim_services and wake_services
+                service_id = int(service.id)
+                session.query(ServiceQueueORM).filter(ServiceQueueORM.id == service_id)\
+                       .update(self._service_row(service), synchronize_session=False)
 
-            updated_count += 1
+                session.execute(service_procedure_association.delete()\
+                                .where(service_procedure_association.c.service_id == service_id))
+                required = {int(x) for x in service.task_manager.required_tasks.values()}
+                if required:
+                    session.execute(service_procedure_association.insert(),
+                                    [{"service_id": service_id, "procedure_id": x} for x in required])
+
+                updated_count += 1
 
         return updated_count
 
+    def _service_row(self, service: "BaseService") -> Dict[str, Any]:
+        """The columns of a service, the full service is kept in `extra`."""
+
+        data = service.json_dict(exclude={"id"})
+        return {
+            "status": TaskStatusEnum(data["status"]),
+            "tag": data.get("tag"),
+            "hash_index": data["hash_index"],
+            "procedure_id": int(data["procedure_id"]) if data["procedure_id"] is not None else None,
+            "extra": data
+        }
+
+    def claim_services(self, status: str, limit: int=None) -> Dict[str, Any]:
+        """
+        Pulls the services of a given status that are ready to iterate and marks them as idle until one of
+        the procedures they wait on finishes (see wake_services). Services without the flag are ready.
+
+        Parameters
+        ----------
+        status : str
+            The status of the services, 'RUNNING' or 'WAITING'
+        limit : int, default is None
+            maximum number of services to return
+            if 'limit' is greater than the global setting self._max_limit,
+            the self._max_limit will be returned instead
+
+        Returns
+        -------
+        Dict with keys: data, meta
+            Data is the services found
+        """
+
+        meta = get_metadata_template()
+
+        with self.session_scope() as session:
+            services = session.query(ServiceQueueORM)\
+                              .options(lazyload(ServiceQueueORM.procedure))\
+                              .filter(ServiceQueueORM.status == TaskStatusEnum(status),
+                                      ServiceQueueORM.ready.isnot(False))\
+                              .limit(self.get_limit(limit)).with_for_update(skip_locked=True).all()
+            data = [x.to_dict() for x in services]
+
+            if data:
+                session.query(ServiceQueueORM)\
+                       .filter(ServiceQueueORM.id.in_([x["id"] for x in data]))\
+                       .update({"ready": False}, synchronize_session=False)
+
+        meta["n_found"] = len(data)
+        meta["success"] = True
+
+        return {"data": data, "meta": meta}
+
+    def wake_services(self, id: List[str]=None, procedure_id: List[str]=None) -> int:
+        """
+        Marks services as ready to iterate, either directly or through the procedures they wait on.
+
+        Parameters
+        ----------
+        id : List[str], optional
+            The service ids
+        procedure_id : List[str], optional
+            Finished procedure ids, every service waiting on one of them is woken
+
+        Returns
+        -------
+        int
+            The number of services woken
+        """
+
+        query = []
+        if id:
+            query.append(ServiceQueueORM.id.in_([int(x) for x in id]))
+        if procedure_id:
+            waiting = select([service_procedure_association.c.service_id])\
+                      .where(service_procedure_association.c.procedure_id.in_([int(x) for x in procedure_id]))
+            query.append(ServiceQueueORM.id.in_(waiting))
+
+        if not query:
+            return 0
+
+        with self.session_scope() as session:
+            woken = session.query(ServiceQueueORM)\
+                           .filter(or_(*query), ServiceQueueORM.ready.is_(False))\
+                           .update({"ready": True}, synchronize_session=False)
+
+        return woken
+
+    def _wake_task_services(self, task_ids: List[str]) -> int:
+        """
+        Wakes the services waiting on the procedures of finished tasks.
+        """
+
+        with self.session_scope() as session:
+            procedure_ids = session.query(TaskQueueORM.base_result).filter(TaskQueueORM.id.in_(task_ids)).all()
+
+        return self.wake_services(procedure_id=[x for x, in procedure_ids])
+
     def services_completed(self, records_list: List["BaseService"]) -> int:
 
         done = 0
@@ -1328,7 +1733,9 @@ class SQLAlchemySocket:
             procedure.id = service.procedure_id
             self.update_procedures([procedure])
 
-            ServiceQueueORM.objects(id=ObjectId(service.id)).delete()
+            with self.session_scope() as session:
+                session.query(ServiceQueueORM).filter(ServiceQueueORM.id == int(service.id))\
+                       .delete(synchronize_session=False)
 
             done += 1
 
@@ -1368,29 +1775,34 @@ class SQLAlchemySocket:
 
         meta = add_metadata_template()
 
-        results = []
+        rows = [record.json_dict(exclude={"id"}) for record in data]
+
         with self.session_scope() as session:
-            for task_num, record in enumerate(data):
-                try:
 
-                    task = TaskQueueORM(**record.json_dict(exclude={"id"}))
-                    session.add(task)
-                    session.commit()
-                    results.append(str(task.id))
-                    meta['n_inserted'] += 1
-                except IntegrityError as err:  # rare case
-                    # print(str(err))
-                    session.rollback()
-                    # TODO: merge hooks
-                    task = session.query(TaskQueueORM).filter_by(base_result=record.base_result).first()
-                    self.logger.warning('queue_submit got a duplicate task: {}'.format(task.to_dict()))
-                    results.append(str(task.id))
-                    meta['duplicates'].append(task_num)
-                # except Exception as err:
-                #     self.logger.warning('queue_submit submission error: {}'.format(str(err)))
-                #     meta["success"] = False
-                #     meta["errors"].append(str(err))
-                #     results.append(None)
+            # Tasks are unique by their base_result, find the existing ones in a single query
+            task_ids = self._get_ids_by_field(session, TaskQueueORM, "base_result", {x["base_result"] for x in rows})
+
+            # Insert the new tasks in bulk, the first task of a repeated base_result wins
+            new_tasks = {}
+            for row in rows:
+                if row["base_result"] not in task_ids:
+                    new_tasks.setdefault(row["base_result"], row)
+
+            self._bulk_insert(session, TaskQueueORM, list(new_tasks.values()))
+            task_ids.update(self._get_ids_by_field(session, TaskQueueORM, "base_result", new_tasks.keys()))
+
+        results = []
+        for task_num, row in enumerate(rows):
+            results.append(str(task_ids[row["base_result"]]))
+
+            if new_tasks.pop(row["base_result"], None) is not None:
+                meta['n_inserted'] += 1
+            else:
+                # TODO: merge hooks
+                meta['duplicates'].append(task_num)
+
+        if meta['duplicates']:
+            self.logger.warning('queue_submit got {} duplicate tasks.'.format(len(meta['duplicates'])))
 
         meta["success"] = True
 
@@ -1398,8 +1810,18 @@ class SQLAlchemySocket:
         return ret
 
     def queue_get_next(self, manager, available_programs, available_procedures, limit=100, tag=None,
-                       as_json=True) -> List[TaskRecord]:
-        """TODO: needs to be done in a transcation"""
+                       resources: Optional[Dict[str, Any]]=None, as_json=True) -> List[TaskRecord]:
+        """Atomically claims up to `limit` waiting tasks for a manager.
+
+        The candidate rows are selected with ``FOR UPDATE SKIP LOCKED`` and marked
+        as running in the same transaction, so concurrent managers are always handed
+        disjoint sets of tasks. Rows locked by another claimer are skipped rather than
+        waited on. The tasks are picked by the scheduling policy of the socket (see scheduling.py).
+
+        `resources` holds the cores, memory and walltime of the `limit` free task slots
+        of the manager. Every claimed task fills one slot, so only tasks whose estimates
+        fit into a slot are handed out. Tasks and slots without a value always fit.
+        """
 
         # Figure out query, tagless has no requirements
         query = format_query(
@@ -1410,31 +1832,132 @@ class SQLAlchemySocket:
             tag=tag)
         # query["procedure__in"].append(None)  # TODO
 
+        for key, value in (resources or {}).items():
+            if value is not None:
+                column = getattr(TaskQueueORM, key)
+                query.append(or_(column.is_(None), column <= value))
+
+        update_fields = {
+                'status': TaskStatusEnum.running,
+                'modified_on': dt.utcnow(),
+                'manager': manager
+        }
+
         with self.session_scope() as session:
-            found = session.query(TaskQueueORM).filter(*query)\
-                   .order_by(TaskQueueORM.priority.desc(), TaskQueueORM.created_on)\
-                   .limit(limit).all()
-
-            ids =  [x.id for x in found]
-            update_fields = {
-                    'status': TaskStatusEnum.running,
-                    'modified_on': dt.utcnow(),
-                    'manager': manager
-            }
-            # Bulk update operation in SQL
-            update_count = session.query(TaskQueueORM).filter(TaskQueueORM.id.in_(ids)).update(
-                            update_fields, synchronize_session=False)
+            # Tasks taken by concurrent managers are replaced in another round
+            found = []
+            for _ in range(3):
+                claimed, lost = self._queue_claim(session, query, update_fields, limit - len(found))
+                found.extend(claimed)
+                if (lost == 0) or (len(found) >= limit):
+                    break
 
             if as_json:
                 # avoid another trip to the DB to get the updated values, set them here
                 found = [TaskRecord(**task.to_dict(exclude=update_fields.keys()),
                                     **update_fields) for task in found]
 
-        if update_count != len(found):
-            self.logger.warning("QUEUE: Number of found projects does not match the number of updated projects.")
-
         return found
 
+    def _queue_claim(self, session, query, update_fields: Dict[str, Any],
+                     limit: int) -> Tuple[List[TaskQueueORM], int]:
+        """Claims up to `limit` waiting tasks in the order of the scheduling policy.
+
+        SQLite ignores ``FOR UPDATE`` and only takes the write lock at the update, so two
+        claimers can select the same rows. The update only matches waiting rows and only
+        the rows it changed are returned.
+
+        Returns
+        -------
+        Tuple[List[TaskQueueORM], int]
+            The claimed tasks and the number of selected tasks that were claimed by another manager
+        """
+
+        manager = update_fields["manager"]
+
+        if not self.scheduler.partition:
+            order = [
+                getattr(TaskQueueORM, k).desc() if direction < 0 else getattr(TaskQueueORM, k)
+                for k, direction in self.scheduler.claim_sort
+            ]
+            found = session.query(TaskQueueORM).filter(*query)\
+                   .order_by(*order)\
+                   .limit(limit).with_for_update(skip_locked=True).all()
+            nselected = len(found)
+        else:
+            # Selected rows locked by another claimer are skipped as well
+            selected = self._queue_select_scheduled(session, query, manager, limit)
+            found = session.query(TaskQueueORM).filter(TaskQueueORM.id.in_(selected), *query)\
+                   .with_for_update(skip_locked=True).all()
+
+            order = {task_id: num for num, task_id in enumerate(selected)}
+            found.sort(key=lambda x: order[x.id])
+            nselected = len(selected)
+
+        if not found:
+            return [], nselected
+
+        ids = [x.id for x in found]
+        session.query(TaskQueueORM)\
+               .filter(TaskQueueORM.id.in_(ids), TaskQueueORM.status == TaskStatusEnum.waiting)\
+               .update(update_fields, synchronize_session=False)
+
+        claimed = session.query(TaskQueueORM.id)\
+                         .filter(TaskQueueORM.id.in_(ids), TaskQueueORM.manager == manager,
+                                 TaskQueueORM.status == TaskStatusEnum.running).all()
+        claimed = {x for x, in claimed}
+
+        if len(claimed) != len(found):
+            self.logger.info("QUEUE: {} selected tasks were claimed by another manager.".format(
+                len(found) - len(claimed)))
+
+        return [x for x in found if x.id in claimed], nselected - len(claimed)
+
+    def _queue_select_scheduled(self, session, query, manager: str, limit: int) -> List[int]:
+        """Selects up to `limit` waiting tasks with the scheduling policy.
+
+        The policy picks from the oldest waiting tasks of every combination of its partition fields.
+        Postgres reads the heads of all groups in one query, a LATERAL join runs an ordered and limited
+        scan of ``ix_task_queue_owner`` per group so only `limit` tasks of every group are read. Other
+        databases query the groups one at a time.
+        """
+
+        partition = [getattr(TaskQueueORM, k) for k in self.scheduler.partition]
+        columns = [TaskQueueORM.id] + [getattr(TaskQueueORM, k) for k in candidate_fields]
+
+        if self.engine.dialect.name == "postgresql":
+            groups = session.query(*partition).filter(*query).distinct().subquery("groups")
+            group_query = [column == groups.c[column.key] for column in partition]
+            heads = session.query(*columns).filter(*query, *group_query)\
+                           .order_by(TaskQueueORM.created_on).limit(limit).statement.lateral("heads")
+            rows = session.query(heads).select_from(groups).join(heads, true()).all()
+        else:
+            rows = []
+            for group in session.query(*partition).filter(*query).distinct().all():
+                group_query = [column == value for column, value in zip(partition, group)]
+                rows.extend(session.query(*columns).filter(*query, *group_query)\
+                                   .order_by(TaskQueueORM.created_on).limit(limit).all())
+
+        candidates = [dict(zip(("id", ) + candidate_fields, row)) for row in rows]
+
+        if not candidates:
+            return []
+
+        # Running tasks per share group and the programs the manager is already running
+        usage = {}
+        if self.scheduler.share_key:
+            share = getattr(TaskQueueORM, self.scheduler.share_key)
+            usage = dict(session.query(share, func.count(TaskQueueORM.id))\
+                                .filter(TaskQueueORM.status == TaskStatusEnum.running)\
+                                .group_by(share).all())
+
+        affinity = session.query(TaskQueueORM.program)\
+                          .filter(TaskQueueORM.status == TaskStatusEnum.running, TaskQueueORM.manager == manager)\
+                          .distinct().all()
+        affinity = {x for x, in affinity}
+
+        return self.scheduler.select(candidates, limit, usage, affinity, dt.utcnow())
+
     def get_queue(self,
                   id=None,
                   hash_index=None,
@@ -1443,6 +1966,8 @@ class SQLAlchemySocket:
                   projection=None,
                   limit: int=None,
                   skip: int=0,
+                  cursor: str=None,
+                  count: bool=True,
                   return_json=True,
                   with_ids=True):
         """
@@ -1463,6 +1988,11 @@ class SQLAlchemySocket:
             (This is to avoid overloading the server)
         skip : int, default is None 0
             skip the first 'skip' resaults. Used to paginate
+        cursor : str, default is None
+            Keyset pagination, return the tasks with an id greater than `cursor` ordered by id.
+            An empty string starts from the first one. Used instead of skip for large queries
+        count : bool, default is True
+            Count the total number of matches, otherwise n_found is the number of tasks returned
         return_json : bool, deafult is True
             Return the results as a list of json inseated of objects
         with_ids : bool, default is True
@@ -1479,7 +2009,8 @@ class SQLAlchemySocket:
 
         data = []
         try:
-            data, meta['n_found'] = self.get_query_projection(TaskQueueORM, query, projection, limit, skip)
+            data = self.get_query_projection(TaskQueueORM, query, projection, limit, skip, meta,
+                                             cursor=cursor, count=count)
             meta["success"] = True
         except Exception as err:
             meta['error_description'] = str(err)
@@ -1543,6 +2074,10 @@ class SQLAlchemySocket:
         if base_results_c != tasks_c:
             self.logger.error("Some tasks don't reference results or procedures correctly!"
                               "Tasks: {}, ResultORMs: {}, procedures: {}. ".format(tasks, results, procedures))
+
+        if tasks_c:
+            self._wake_task_services(task_ids)
+
         return tasks_c
 
     def queue_mark_error(self, data):
@@ -1576,6 +2111,9 @@ class SQLAlchemySocket:
                 "Queue Mark Error: Number of tasks updates {}, does not match the number of records updates {}.".
                 format(len(task_ids), base_results_c))
 
+        # Failed procedures wake their services as well, which then report the error
+        self._wake_task_services(task_ids)
+
         return len(task_ids)
 
     def queue_reset_status(self, manager: str, reset_running: bool=True, reset_error: bool=False) -> int:
@@ -1734,7 +2272,7 @@ class SQLAlchemySocket:
         success = False
         with self.session_scope() as session:
             if overwrite:
-                count = session.query(UserORM).filter_by(username=username).update(**blob)
+                count = session.query(UserORM).filter_by(username=username).update(blob)
                 # doc.upsert_one(**blob)
                 success = True
 
@@ -1749,6 +2287,8 @@ class SQLAlchemySocket:
                     success = False
                     session.rollback()
 
+        self._credential_cache.invalidate(username)
+
         if return_password and success:
             return password
         else:
@@ -1790,6 +2330,14 @@ class SQLAlchemySocket:
         if self._bypass_security or (self._allow_read and (permission == "read")):
             return (True, "Success")
 
+        # Recently verified credentials skip the user lookup and bcrypt
+        permissions = self._credential_cache.get(username, password)
+        if permissions is not None:
+            if (permission.lower() not in permissions) and ("admin" not in permissions):
+                return (False, "User has insufficient permissions.")
+            return (True, "Success")
+
+        generation = self._credential_cache.generation(username)
         with self.session_scope() as session:
             data = session.query(UserORM).filter_by(username=username).first()
 
@@ -1800,6 +2348,8 @@ class SQLAlchemySocket:
             if pwcheck is False:
                 return (False, "Incorrect password.")
 
+            self._credential_cache.add(username, password, data.permissions, generation)
+
             # Admin has access to everything
             if (permission.lower() not in data.permissions) and ("admin" not in data.permissions):
                 return (False, "User has insufficient permissions.")
@@ -1824,4 +2374,6 @@ class SQLAlchemySocket:
             count = session.query(UserORM).filter_by(username=username)\
                                           .delete(synchronize_session=False)
 
+        self._credential_cache.invalidate(username)
+
         return count == 1
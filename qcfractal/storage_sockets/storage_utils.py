@@ -2,10 +2,23 @@
 Contains a number of utility functions for storage sockets.
 """
 
+import hashlib
+import hmac
 import json
+import secrets
+import threading
+import time
+from typing import List, Optional
 
 # Constants
-_get_metadata = json.dumps({"errors": [], "n_found": 0, "success": False, "missing": [], "error_description": False})
+_get_metadata = json.dumps({
+    "errors": [],
+    "n_found": 0,
+    "success": False,
+    "missing": [],
+    "error_description": False,
+    "next_cursor": None
+})
 
 _add_metadata = json.dumps({
     "errors": [],
@@ -29,3 +42,86 @@ def add_metadata_template():
     Returns a copy of the metadata for database save/updates.
     """
     return json.loads(_add_metadata)
+
+
+class CredentialCache:
+    """
+    A short-lived, in-process cache of verified credentials so that bcrypt is not run on every request.
+
+    Entries are keyed by a keyed hash of the username and password, the plain password is never stored.
+    Only successful verifications are cached. Every user has a generation that is bumped when it is
+    invalidated, a verification started before a change to the user is not cached. Changes to a user
+    made by another process (for example another server worker) are picked up once the entry expires.
+    """
+
+    def __init__(self, ttl: float=60):
+        """
+        Parameters
+        ----------
+        ttl : float, optional
+            The number of seconds a verified credential is trusted, 0 disables the cache.
+        """
+
+        self.ttl = ttl
+        self._key = secrets.token_bytes(32)
+        self._entries = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def _hash(self, username: str, password: str) -> str:
+        msg = "{}\0{}".format(username, password).encode("UTF-8")
+        return hmac.new(self._key, msg, hashlib.sha256).hexdigest()
+
+    def get(self, username: str, password: str) -> Optional[List[str]]:
+        """
+        Returns the permissions of cached credentials, or None if they are unknown or expired.
+        """
+
+        if (not self.ttl) or (username is None) or (password is None):
+            return None
+
+        key = self._hash(username, password)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires, _, permissions = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+
+        return permissions
+
+    def generation(self, username: str) -> int:
+        """
+        Returns the current generation of a user, taken before the user is looked up for verification.
+        """
+
+        with self._lock:
+            return self._generations.get(username, 0)
+
+    def add(self, username: str, password: str, permissions: List[str], generation: int) -> None:
+        """
+        Caches verified credentials along with the permissions of the user, unless the user was
+        invalidated since `generation` was taken.
+        """
+
+        if not self.ttl:
+            return
+
+        key = self._hash(username, password)
+        with self._lock:
+            if self._generations.get(username, 0) != generation:
+                return
+
+            self._entries[key] = (time.monotonic() + self.ttl, username, list(permissions))
+
+    def invalidate(self, username: str) -> None:
+        """
+        Removes all cached credentials of a user, called after the user is changed in the database.
+        """
+
+        with self._lock:
+            self._generations[username] = self._generations.get(username, 0) + 1
+            self._entries = {k: v for k, v in self._entries.items() if v[1] != username}
@@ -5,7 +5,7 @@ Tests the interface portal adapter to the REST API
 import pytest
 
 import qcfractal.interface as ptl
-from qcfractal.testing import test_server
+from qcfractal.testing import sqlalchemy_test_server, test_server, using_msgpack, using_zstandard
 
 # All tests should import test_server, but not use it
 # Make PyTest aware that this module needs the server
@@ -29,6 +29,124 @@ def test_client_molecule(test_server):
     assert water.compare(get_mol[0])
 
 
+@pytest.mark.parametrize("encoding", [
+    "json",
+    pytest.param("msgpack", marks=using_msgpack),
+    pytest.param("msgpack-zstd", marks=[using_msgpack, using_zstandard]),
+])
+def test_client_encoding(test_server, encoding):
+
+    client = ptl.FractalClient(test_server, encoding=encoding)
+    assert client.encoding == encoding
+
+    water = ptl.data.get_molecule("water_dimer_stretch.psimol")
+    mol_id = client.add_molecules([water])[0]
+    assert water.compare(client.query_molecules(id=mol_id)[0])
+
+    records = [
+        ptl.models.ResultRecord(
+            molecule=mol_id,
+            method="encoding",
+            basis=encoding,
+            program="p1",
+            driver="gradient",
+            status="COMPLETE",
+            return_result=[0.1 * x for x in range(18)])
+    ]
+    ret = test_server.storage.add_results(records)
+
+    found = client.query_results(id=ret["data"])
+    assert found[0].return_result == records[0].return_result
+
+    # Both encodings share the server
+    json_client = ptl.FractalClient(test_server)
+    assert json_client.query_results(id=ret["data"])[0].return_result == records[0].return_result
+
+    with pytest.raises(KeyError):
+        ptl.FractalClient(test_server, encoding="pickle")
+
+
+@pytest.mark.parametrize("server_fixture", ["test_server", "sqlalchemy_test_server"])
+@pytest.mark.parametrize("encoding", ["json", pytest.param("msgpack", marks=using_msgpack)])
+def test_client_result_columns(request, server_fixture, encoding):
+
+    server = request.getfixturevalue(server_fixture)
+    client = ptl.FractalClient(server, encoding=encoding)
+
+    water = ptl.data.get_molecule("water_dimer_minima.psimol")
+    mol_id = client.add_molecules([water])[0]
+
+    records = [
+        ptl.models.ResultRecord(
+            molecule=mol_id,
+            method="columns" + str(x),
+            basis=encoding,
+            program="p1",
+            driver="gradient",
+            status="COMPLETE",
+            return_result=[x + 0.1 * y for y in range(6)]) for x in range(5)
+    ]
+    server.storage.add_results(records)
+
+    # Pages of two Results are stacked into one array
+    methods = ["columns" + str(x) for x in range(5)]
+    cols = client.query_result_columns(["molecule", "method", "return_result"], method=methods, basis=encoding,
+                                       page_size=2)
+    assert set(cols) == {"id", "molecule", "method", "return_result"}
+    assert cols["molecule"] == [str(mol_id)] * 5
+    assert all(isinstance(x, str) for x in cols["id"])
+    assert cols["return_result"].shape == (5, 6)
+
+    order = [methods.index(x) for x in cols["method"]]
+    assert cols["return_result"][:, 0].tolist() == pytest.approx(order)
+
+
+def test_client_molecule_iterate(test_server):
+
+    client = ptl.FractalClient(test_server)
+
+    water = ptl.data.get_molecule("water_dimer_minima.psimol")
+    water2 = ptl.data.get_molecule("water_dimer_stretch.psimol")
+    water3 = ptl.data.get_molecule("water_dimer_stretch2.psimol")
+    ret = client.add_molecules([water, water2, water3])
+
+    # Page through the molecules one at a time
+    found = list(client.query_molecules(id=ret, limit=1, iterate=True))
+    assert [mol.id for mol in found] == sorted(ret)
+
+    # Only a page is returned without iterating
+    assert len(client.query_molecules(id=ret, limit=2)) == 2
+
+
+def test_client_iter_results(test_server):
+
+    client = ptl.FractalClient(test_server)
+
+    water = ptl.data.get_molecule("water_dimer_minima.psimol")
+    mol_id = client.add_molecules([water])[0]
+
+    records = [
+        ptl.models.ResultRecord(
+            molecule=mol_id, method="iter" + str(x), basis="b1", program="p1", driver="energy", status="COMPLETE")
+        for x in range(5)
+    ]
+    ret = test_server.storage.add_results(records)
+    methods = ["iter" + str(x) for x in range(5)]
+
+    # Pages of two records, the next page is prefetched
+    found = list(client.iter_results(method=methods, page_size=2))
+    assert sorted(x.id for x in found) == sorted(ret["data"])
+    assert all(x.client is client for x in found)
+
+    # Stopping early is fine
+    found = client.iter_results(method=methods, page_size=2)
+    assert next(found).method in methods
+    found.close()
+
+    # query_results is truncated to a single page
+    assert len(client.query_results(method=methods, limit=2)) == 2
+
+
 def test_client_keywords(test_server):
 
     client = ptl.FractalClient(test_server)
@@ -46,6 +164,36 @@ def test_client_keywords(test_server):
     assert opt == get_kw[0]
 
 
+def test_client_record_cache(test_server, tmp_path):
+
+    path = str(tmp_path / "cache.sqlite")
+    client = ptl.FractalClient(test_server, cache=path)
+
+    water = ptl.data.get_molecule("water_dimer_minima.psimol")
+    water2 = ptl.data.get_molecule("water_dimer_stretch.psimol")
+    mol_ids = client.add_molecules([water, water2])
+    kw_id = client.add_keywords([ptl.models.KeywordSet(values={"cache": "me"})])[0]
+
+    # The first queries fill the cache, results follow the order of the requested ids
+    found = client.query_molecules(id=mol_ids[::-1])
+    assert [mol.id for mol in found] == mol_ids[::-1]
+    assert client.query_keywords(id=kw_id)[0].values == {"cache": "me"}
+
+    # Queries by id no longer reach the server
+    client._mock_network_error = True
+    assert water.compare(client.query_molecules(id=mol_ids[0])[0])
+    assert client.query_keywords(id=[kw_id])[0].values == {"cache": "me"}
+
+    # A new client reads the on-disk layer
+    client = ptl.FractalClient(test_server, cache=ptl.RecordCache(path))
+    client._mock_network_error = True
+    assert water2.compare(client.query_molecules(id=[mol_ids[1]])[0])
+
+    # Other queries are never served from the cache
+    with pytest.raises(IOError):
+        client.query_molecules(molecular_formula="H4O2")
+
+
 def test_client_duplicate_keywords(test_server):
 
     client = ptl.FractalClient(test_server)
@@ -7,7 +7,7 @@ import numpy as np
 
 import qcfractal.interface as ptl
 from qcfractal import testing
-from qcfractal.testing import fractal_compute_server
+from qcfractal.testing import fractal_compute_server, sqlalchemy_test_server, test_server
 
 
 def test_collection_query(fractal_compute_server):
@@ -499,3 +499,61 @@ def test_optimization_dataset(fractal_compute_server):
 
     for idx, row in ds.df["test"].items():
         assert pytest.approx(row.get_final_energy(), abs=1.e-5) == 0.00011456853977485626
+
+
+@pytest.mark.parametrize("server_fixture", ["test_server", "sqlalchemy_test_server"])
+def test_optimization_dataset_partial_save(request, server_fixture):
+
+    client = ptl.FractalClient(request.getfixturevalue(server_fixture))
+
+    ds = ptl.collections.OptimizationDataset("partial_save", client=client)
+    ds.add_specification("test", {"program": "geometric"}, {"driver": "gradient", "method": "UFF", "program": "rdkit"})
+
+    # Saves within a batch are deferred to its end, then only the new entries are sent
+    hooh = ptl.data.get_molecule("hooh.json")
+    with ds.batch():
+        for x in range(3):
+            ds.add_entry("hooh" + str(x), hooh)
+        assert ds._save_deferred
+        assert ds._updates == {"records": {"hooh0", "hooh1", "hooh2"}}
+
+    assert not ds._save_deferred
+    assert not ds._updates
+
+    ds = ptl.collections.OptimizationDataset.from_server(client, "partial_save")
+    assert set(ds.data.records) == {"hooh0", "hooh1", "hooh2"}
+    assert ds.get_specification("test").name == "test"
+
+    # Errors inside a batch skip the save
+    with pytest.raises(ValueError):
+        with ds.batch():
+            ds.add_entry("hooh3", hooh)
+            raise ValueError("stop")
+
+    ds = ptl.collections.OptimizationDataset.from_server(client, "partial_save")
+    assert "hooh3" not in ds.data.records
+
+    # Changes that were not marked fall back to a full save
+    ds.data.tagline = "changed"
+    ds.data.tags = ["partial"]
+    with ds.batch():
+        ds.add_entry("hooh4", hooh)
+        assert not ds._only_marked_changes(ds.data.dict())
+
+    ds = ptl.collections.OptimizationDataset.from_server(client, "partial_save")
+    assert ds.data.tagline == "changed"
+    assert ds.data.tags == ["partial"]
+    assert "hooh4" in ds.data.records
+
+    # Only marked changes are sent on their own
+    with ds.batch():
+        ds.add_entry("hooh5", hooh)
+        assert ds._only_marked_changes(ds.data.dict())
+
+    # Names that are not valid MongoDB field paths are saved in full
+    with ds.batch():
+        ds.add_entry("hooh_1.5", hooh)
+        assert not ds._only_marked_changes(ds.data.dict())
+
+    ds = ptl.collections.OptimizationDataset.from_server(client, "partial_save")
+    assert {"hooh5", "hooh_1.5"} <= set(ds.data.records)
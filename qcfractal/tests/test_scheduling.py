@@ -0,0 +1,92 @@
+"""
+Tests the scheduling policies of queue_get_next
+"""
+
+import datetime
+
+import pytest
+
+from qcfractal.storage_sockets.scheduling import FairSharePolicy, PriorityPolicy, get_scheduling_policy
+
+now = datetime.datetime(2019, 1, 1, 12)
+
+
+def build_tasks(owner, n, priority=1, program="p1", age=0, start=0):
+    return [{
+        "id": "{}-{}".format(owner, x),
+        "priority": priority,
+        "created_on": now - datetime.timedelta(seconds=age - x),
+        "tag": None,
+        "owner": owner,
+        "program": program,
+        "procedure": None,
+    } for x in range(start, start + n)]
+
+
+def test_priority_policy():
+
+    candidates = build_tasks("bulk", 5, age=100) + build_tasks("alice", 2, priority=2)
+    selected = PriorityPolicy().select(candidates, 4, {}, set(), now)
+
+    assert selected == ["alice-0", "alice-1", "bulk-0", "bulk-1"]
+
+
+def test_fair_share_policy():
+
+    candidates = build_tasks("bulk", 10, age=100) + build_tasks("alice", 3)
+
+    # Groups alternate, the group with fewer running tasks goes first
+    selected = FairSharePolicy("owner", aging=0).select(candidates, 4, {"bulk": 1}, set(), now)
+    assert selected == ["alice-0", "bulk-0", "alice-1", "bulk-1"]
+
+    # Weights scale the share of a group
+    policy = FairSharePolicy("owner", weights={"bulk": 3}, aging=0)
+    selected = policy.select(candidates, 4, {}, set(), now)
+    assert sum(x.startswith("bulk") for x in selected) == 3
+
+    # Higher priorities always go first
+    candidates += build_tasks("carol", 2, priority=2)
+    selected = FairSharePolicy("owner", aging=0).select(candidates, 2, {}, set(), now)
+    assert selected == ["carol-0", "carol-1"]
+
+
+def test_fair_share_aging():
+
+    candidates = build_tasks("bulk", 5) + build_tasks("dave", 2, priority=0, age=7200)
+
+    # Low priority tasks starve without aging
+    assert "dave-0" not in FairSharePolicy("owner", aging=0).select(candidates, 3, {}, set(), now)
+
+    # A starved group rises one level every `aging` seconds
+    selected = FairSharePolicy("owner", aging=3600).select(candidates, 3, {}, set(), now)
+    assert selected[0] == "dave-0"
+
+    # Groups with running tasks do not age
+    selected = FairSharePolicy("owner", aging=3600).select(candidates, 3, {"dave": 1}, set(), now)
+    assert "dave-0" not in selected
+
+
+def test_fair_share_affinity():
+
+    candidates = build_tasks("alice", 2, program="p1") + build_tasks("bob", 2, program="p2", age=10)
+
+    selected = FairSharePolicy("owner", aging=0).select(candidates, 1, {}, set(), now)
+    assert selected == ["bob-0"]
+
+    selected = FairSharePolicy("owner", aging=0, affinity=1).select(candidates, 1, {}, {"p1"}, now)
+    assert selected == ["alice-0"]
+
+
+def test_get_scheduling_policy():
+
+    assert isinstance(get_scheduling_policy("priority"), PriorityPolicy)
+
+    policy = get_scheduling_policy("fair_share", key="tag")
+    assert policy.partition == ("tag", "priority")
+    assert get_scheduling_policy(policy) is policy
+
+    with pytest.raises(KeyError):
+        get_scheduling_policy("random")
+
+    with pytest.raises(KeyError):
+        FairSharePolicy("username")
@@ -77,6 +77,81 @@ def test_molecule_socket(test_server):
     assert water.compare(gdata["data"][0])
 
 
+def test_streamed_body(test_server):
+
+    mol_api_addr = test_server.get_address("molecule")
+    water = ptl.data.get_molecule("water_dimer_minima.psimol")
+
+    # Chunked bodies are streamed in by the handlers
+    body = ptl.serialization.serialize({"meta": {}, "data": [water.json_dict()]}, "json")
+    chunks = (body[i:i + 64] for i in range(0, len(body), 64))
+    r = requests.post(mol_api_addr, data=chunks, headers={"Content-Type": "application/json"})
+    assert r.status_code == 200
+    assert r.json()["meta"]["success"]
+
+    timings = {x.split(";")[0].strip() for x in r.headers["Server-Timing"].split(",")}
+    assert {"decode", "validate", "encode"} <= timings
+
+    r = requests.post(mol_api_addr, data=b"{not json", headers={"Content-Type": "application/json"})
+    assert r.status_code == 400
+
+
+def test_response_cache(test_server):
+
+    mol_api_addr = test_server.get_address("molecule")
+    water = ptl.data.get_molecule("water_dimer_stretch.psimol")
+
+    r = requests.post(mol_api_addr, json={"meta": {}, "data": [water.json_dict()]})
+    mol_id = r.json()["data"][0]
+
+    stats = ptl.FractalClient(test_server).server_information()["response_cache"]
+
+    # Queries by id are immutable, the second one is served from the cache
+    body = {"meta": {}, "data": {"id": [mol_id]}}
+    r1 = requests.get(mol_api_addr, json=body)
+    r2 = requests.get(mol_api_addr, json=body)
+    assert r1.content == r2.content
+    assert r1.headers["Etag"] == r2.headers["Etag"]
+
+    new_stats = ptl.FractalClient(test_server).server_information()["response_cache"]
+    assert new_stats["hits"] == stats["hits"] + 1
+    assert new_stats["entries"] >= 1
+
+    # Revalidation does not resend the response
+    r = requests.get(mol_api_addr, json=body, headers={"If-None-Match": r1.headers["Etag"]})
+    assert r.status_code == 304
+    assert r.content == b""
+
+    # Queries that can change are never cached
+    body = {"meta": {}, "data": {"molecular_formula": water.get_molecular_formula()}}
+    requests.get(mol_api_addr, json=body)
+    requests.get(mol_api_addr, json=body)
+    assert ptl.FractalClient(test_server).server_information()["response_cache"]["hits"] == new_stats["hits"]
+
+
+def test_response_cache_lru():
+
+    from qcfractal.web_handlers import ResponseCache
+
+    cache = ResponseCache(max_bytes=10)
+    cache.put(("molecule", "a"), b"12345")
+    cache.put(("keyword", "b"), b"12345")
+    assert cache.get(("molecule", "a"))[0] == b"12345"
+
+    # The least recently used entry is evicted first
+    cache.put(("molecule", "c"), b"123")
+    assert cache.get(("keyword", "b")) is None
+    assert cache.nbytes == 8
+
+    # Responses larger than the cache are skipped
+    cache.put(("molecule", "d"), b"12345678901")
+    assert cache.get(("molecule", "d")) is None
+
+    cache.invalidate("molecule")
+    assert cache.nbytes == 0
+    assert cache.stats()["hits"] == 1
+
+
 def test_keywords_socket(test_server):
 
     opt_api_addr = test_server.get_address("keyword")
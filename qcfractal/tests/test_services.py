@@ -87,6 +87,77 @@ def test_service_torsiondrive_single(torsiondrive_fixture):
 
     assert hasattr(result.get_final_molecules()[(-90, )], "symbols")
 
+    # Batched fetches fill the records so that no further requests are made
+    records = client.query_procedures(id=ret.ids)
+    ptl.models.TorsionDriveRecord.prefetch_final_molecules(records)
+    ptl.models.TorsionDriveRecord.prefetch_history(records)
+    client._mock_network_error = True
+    assert records[0].get_final_molecules()[(-90, )].compare(result.get_final_molecules()[(-90, )])
+    assert records[0].get_history(-90, minimum=True).final_molecule == records[0].get_final_molecules(-90).id
+    client._mock_network_error = False
+
+    # Counts are aggregated on the server
+    counts = client.query_procedure_counts(ret.ids)[ret.ids[0]]
+    assert counts["status"] == "COMPLETE"
+    # Optimizations repeated in the history count once
+    opts = {opt.id: opt for v in result.get_history().values() for opt in v}
+    assert counts["optimizations"] == len(opts)
+    assert counts["gradients"] == sum(len(opt.trajectory) for opt in opts.values())
+
+
+def test_service_task_data(torsiondrive_fixture, fractal_compute_server):
+    """Service tasks are pulled as projected procedures in a single query"""
+
+    from qcfractal.services import get_task_data
+
+    spin_up_test, client = torsiondrive_fixture
+
+    ret = spin_up_test()
+    result = client.query_procedures(id=ret.ids)[0]
+
+    opt_ids = [x for v in result.optimization_history.values() for x in v]
+    task_data = get_task_data(fractal_compute_server.storage, opt_ids + opt_ids[:1])
+    assert task_data.keys() == set(opt_ids)
+
+    for task in task_data.values():
+        assert task["status"] == "COMPLETE"
+        assert {"initial_molecule", "final_molecule", "energies"} <= task.keys()
+        assert "trajectory" not in task
+
+
+def test_service_wakeup(torsiondrive_fixture, fractal_compute_server):
+    """Running services are only pulled again once the tasks they wait on have finished"""
+
+    spin_up_test, client = torsiondrive_fixture
+    storage = fractal_compute_server.storage
+
+    hooh = ptl.data.get_molecule("hooh.json")
+    hooh.geometry[0] += 0.0008
+
+    inp = TorsionDriveInput(
+        initial_molecule=hooh,
+        keywords={"dihedrals": [[0, 1, 2, 3]], "grid_spacing": [90]},
+        optimization_spec={"program": "geometric", "keywords": {"coordsys": "tric"}},
+        qc_spec={"driver": "gradient", "method": "UFF", "basis": "", "keywords": None, "program": "rdkit"})
+    ret = client.add_service([inp])
+
+    def claim():
+        services = storage.claim_services("RUNNING")["data"]
+        return [x["id"] for x in services if x["procedure_id"] == ret.ids[0]]
+
+    # Builds the service which then waits on its first optimizations
+    fractal_compute_server.update_services()
+    assert claim() == []
+
+    # Finished optimizations wake the service
+    fractal_compute_server.await_results()
+    woken = claim()
+    assert len(woken) == 1
+
+    storage.wake_services(id=woken)
+    fractal_compute_server.await_services()
+    assert client.query_procedures(id=ret.ids)[0].status == "COMPLETE"
+
 
 def test_service_torsiondrive_multi_single(torsiondrive_fixture):
     spin_up_test, client = torsiondrive_fixture
@@ -316,6 +387,10 @@ def test_service_gridoptimization_single_opt(fractal_compute_server):
 
     assert result.starting_molecule != result.initial_molecule
 
+    final_molecules = result.get_final_molecules()
+    assert final_molecules.keys() == result.get_final_energies().keys()
+    assert all(hasattr(m, "symbols") for m in final_molecules.values())
+
     # Check initial vs startin molecule
     assert result.initial_molecule == mol_ret[0]
     starting_mol = client.query_molecules(id=result.starting_molecule)[0]
@@ -390,3 +390,23 @@ def test_results_pagination(storage_socket, session, molecules_H4O2, kw_fixtures
     # cleanup
     session_delete_all(session, ResultORM)
 
+
+
+def test_check_indexes(storage_socket):
+    """
+        Indexes declared in the ORMs are created with the tables
+    """
+
+    ret = storage_socket.check_indexes()
+    assert ret["missing"] == []
+
+    # Simulate a database created before the index was declared
+    index = [x for x in TaskQueueORM.__table__.indexes if x.name == "ix_task_queue_spec"][0]
+    index.drop(storage_socket.engine)
+    try:
+        ret = storage_socket.check_indexes()
+        assert ret["missing"] == ["ix_task_queue_spec"]
+    finally:
+        index.create(storage_socket.engine)
+
+    assert storage_socket.check_indexes()["missing"] == []
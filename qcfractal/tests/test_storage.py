@@ -4,6 +4,8 @@ Tests the database wrappers
 All tests should be atomic, that is create and cleanup their data
 """
 
+import threading
+
 import pytest
 
 import qcfractal.interface as ptl
@@ -85,6 +87,35 @@ def test_molecules_add_many(storage_socket):
     assert ret == 2
 
 
+def test_molecules_add_batch_duplicates(storage_socket):
+
+    water = ptl.data.get_molecule("water_dimer_minima.psimol")
+    water2 = ptl.data.get_molecule("water_dimer_stretch.psimol")
+
+    # Repeats within a single batch are only inserted once
+    ret = storage_socket.add_molecules([water, water2, water])
+    assert ret["meta"]["n_inserted"] == 2
+    assert ret["data"][0] == ret["data"][2]
+    assert ret["meta"]["duplicates"] == [ret["data"][0]]
+
+    ret2 = storage_socket.add_molecules([water2, water])
+    assert ret2["meta"]["n_inserted"] == 0
+    assert ret2["data"] == [ret["data"][1], ret["data"][0]]
+
+    assert storage_socket.del_molecules(id=ret["data"][:2]) == 2
+
+
+def test_kvstore_add(storage_socket):
+
+    ret = storage_socket.add_kvstore(["stdout", None, {"error_type": "a"}])
+    assert ret["meta"]["n_inserted"] == 2
+    assert ret["data"][1] is None
+
+    found = storage_socket.get_kvstore([ret["data"][0], ret["data"][2]])["data"]
+    assert found[ret["data"][0]] == "stdout"
+    assert found[ret["data"][2]] == {"error_type": "a"}
+
+
 def test_molecules_get(storage_socket):
 
     water = ptl.data.get_molecule("water_dimer_minima.psimol")
@@ -422,6 +453,31 @@ def test_empty_get(storage_results):
     assert 0 == len(storage_results.get_results(program='null')['data'])
 
 
+def test_results_pagination_cursor(storage_results):
+
+    def get_ids(data):
+        return [str(x["id"]) for x in data]
+
+    ret = storage_results.get_results(status=None)
+    all_ids = sorted(get_ids(ret["data"]), key=str)
+    assert ret["meta"]["next_cursor"] is None
+
+    # Walk the results by id, a full page sets the cursor of the next one
+    ret = storage_results.get_results(status=None, limit=4, cursor="")
+    assert get_ids(ret["data"]) == all_ids[:4]
+    assert ret["meta"]["n_found"] == 6
+    assert ret["meta"]["next_cursor"] == all_ids[3]
+
+    ret = storage_results.get_results(status=None, limit=4, cursor=ret["meta"]["next_cursor"], count=False)
+    assert get_ids(ret["data"]) == all_ids[4:]
+    assert ret["meta"]["n_found"] == 2
+    assert ret["meta"]["next_cursor"] is None
+
+    # Projections keep the cursor
+    ret = storage_results.get_results(status=None, limit=3, cursor="", projection={"method": True})
+    assert ret["meta"]["next_cursor"] == all_ids[2]
+
+
 def test_results_get_total(storage_results):
 
     assert 6 == len(storage_results.get_results()["data"])
@@ -604,6 +660,129 @@ def test_queue_submit_many_order(storage_results):
     # Todo: test more scenarios
 
 
+def test_queue_submit_duplicates_order(storage_results):
+
+    results = storage_results.get_results()['data']
+
+    task_template = {
+        "spec": {
+            "function": "qcengine.compute_procedure",
+            "args": [{
+                "json_blob": "data"
+            }],
+            "kwargs": {},
+        },
+        "tag": None,
+        "program": "P1",
+        "parser": "",
+    }
+
+    task = ptl.models.TaskRecord(**task_template, base_result={"ref": 'result', "id": results[2]['id']})
+
+    # Repeats within a single call collapse onto one task
+    ret1 = storage_results.queue_submit([task, task])
+    assert ret1['meta']['n_inserted'] == 1
+    assert ret1['meta']['duplicates'] == [1]
+    assert ret1["data"][0] == ret1["data"][1]
+
+    # Resubmission returns the existing task in input order
+    ret2 = storage_results.queue_submit([task, task])
+    assert ret2['meta']['n_inserted'] == 0
+    assert ret2['meta']['duplicates'] == [0, 1]
+    assert ret2["data"] == ret1["data"]
+
+    found = storage_results.queue_get_by_id(ret1["data"][:1])
+    assert len(found) == 1
+
+
+def test_queue_get_next_concurrent(storage_results):
+
+    results = storage_results.get_results()['data']
+
+    task_template = {
+        "spec": {
+            "function": "qcengine.compute_procedure",
+            "args": [{
+                "json_blob": "data"
+            }],
+            "kwargs": {},
+        },
+        "tag": None,
+        "program": "P1",
+        "procedure": "P1",
+        "parser": "",
+    }
+
+    tasks = [ptl.models.TaskRecord(**task_template, base_result={"ref": 'result', "id": x['id']}) for x in results]
+    ret = storage_results.queue_submit(tasks)
+    assert ret['meta']['n_inserted'] == len(tasks)
+
+    n_claimers = 8
+    barrier = threading.Barrier(n_claimers)
+    claimed = [[] for _ in range(n_claimers)]
+
+    def claim(num):
+        barrier.wait()
+        while True:
+            found = storage_results.queue_get_next("manager_{}".format(num), ["p1"], ["p1"], limit=1)
+            if len(found) == 0:
+                break
+            claimed[num].extend(str(x.id) for x in found)
+
+    threads = [threading.Thread(target=claim, args=(num, )) for num in range(n_claimers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Every task is handed out exactly once
+    all_claimed = [x for c in claimed for x in c]
+    assert len(all_claimed) == len(tasks)
+    assert set(all_claimed) == set(ret["data"])
+
+
+def test_queue_get_next_resources(storage_results):
+
+    results = storage_results.get_results()['data']
+
+    task_template = {
+        "spec": {
+            "function": "qcengine.compute_procedure",
+            "args": [{
+                "json_blob": "data"
+            }],
+            "kwargs": {},
+        },
+        "tag": None,
+        "program": "P1",
+        "procedure": "P1",
+        "parser": "",
+    }
+
+    # A small, a large and an unestimated task
+    resources = [{"cores": 2, "memory": 4}, {"cores": 16, "memory": 64, "walltime": 86400}, {}]
+    tasks = [
+        ptl.models.TaskRecord(**task_template, **res, base_result={"ref": 'result', "id": results[num]['id']})
+        for num, res in enumerate(resources)
+    ]
+    ret = storage_results.queue_submit(tasks)
+    assert ret['meta']['n_inserted'] == 3
+
+    # Small task slots are only handed the tasks that fit
+    small = {"cores": 4, "memory": 8, "walltime": 3600}
+    found = storage_results.queue_get_next("small_manager", ["p1"], ["p1"], limit=3, resources=small)
+    assert {str(x.id) for x in found} == {ret["data"][0], ret["data"][2]}
+
+    found = storage_results.queue_get_next("small_manager", ["p1"], ["p1"], limit=3, resources=small)
+    assert len(found) == 0
+
+    # Unlimited resources fit any task
+    large = {"cores": 16, "memory": None, "walltime": None}
+    found = storage_results.queue_get_next("large_manager", ["p1"], ["p1"], limit=3, resources=large)
+    assert [str(x.id) for x in found] == [ret["data"][1]]
+    assert found[0].cores == 16
+
+
 # User testing
 
 
@@ -649,6 +828,53 @@ def test_user_permissions_admin(storage_socket):
     assert storage_socket.remove_user("george") is True
 
 
+def test_user_credential_cache(storage_socket, monkeypatch):
+    import bcrypt
+
+    checks = []
+    checkpw = bcrypt.checkpw
+
+    def counting_checkpw(password, hashed):
+        checks.append(password)
+        return checkpw(password, hashed)
+
+    monkeypatch.setattr(bcrypt, "checkpw", counting_checkpw)
+
+    r = storage_socket.add_user("george", "shortpw", permissions=["read", "compute"])
+    assert r is True
+
+    # The second verification is served from the cache
+    assert storage_socket.verify_user("george", "shortpw", "compute")[0] is True
+    assert len(checks) == 1
+    assert storage_socket.verify_user("george", "shortpw", "compute")[0] is True
+    assert storage_socket.verify_user("george", "shortpw", "admin")[0] is False
+    assert len(checks) == 1
+    assert storage_socket.verify_user("george", "wrongpw", "compute")[0] is False
+    assert len(checks) == 2
+
+    # Overwriting the user drops its cached credentials
+    storage_socket.add_user("george", "newpw", permissions=["read"], overwrite=True)
+    assert storage_socket.verify_user("george", "shortpw", "compute")[0] is False
+    assert storage_socket.verify_user("george", "newpw", "compute")[0] is False
+
+    # A verification that races an overwrite does not cache the old password
+    def racing_checkpw(password, hashed):
+        storage_socket.add_user("george", "otherpw", permissions=["read", "compute"], overwrite=True)
+        return checkpw(password, hashed)
+
+    monkeypatch.setattr(bcrypt, "checkpw", racing_checkpw)
+    assert storage_socket.verify_user("george", "newpw", "compute") == (False, "User has insufficient permissions.")
+
+    monkeypatch.setattr(bcrypt, "checkpw", counting_checkpw)
+    nchecks = len(checks)
+    assert storage_socket.verify_user("george", "newpw", "compute") == (False, "Incorrect password.")
+    assert len(checks) == nchecks + 1
+
+    assert storage_socket.remove_user("george") is True
+    assert storage_socket.verify_user("george", "otherpw", "read")[0] is True  # allow_read
+    assert storage_socket.verify_user("george", "otherpw", "compute")[0] is False
+
+
 def test_project_name(storage_socket):
     assert 'test' in storage_socket.get_project_name()
 
@@ -761,6 +987,69 @@ def test_procedure_pagination(storage_socket):
     assert len(ret['data']) == storage_socket._max_limit - 400
 
 
+def test_procedure_counts(storage_results):
+    from qcfractal.storage_sockets.me_models import ProcedureORM
+
+    results = storage_results.get_results()['data']
+    mol_id = results[0]["molecule"]
+
+    opt = ptl.models.OptimizationRecord(**{
+        "initial_molecule": mol_id,
+        "program": "geometric",
+        "qc_spec": {
+            "driver": "gradient",
+            "method": "HF",
+            "basis": "sto-3g",
+            "keywords": None,
+            "program": "psi4"
+        },
+        "hash_index": "procedure_counts_opt",
+        "trajectory": [x["id"] for x in results[:3]],
+        "status": "COMPLETE",
+    })
+    opt_id = storage_results.add_procedures([opt])["data"][0]
+
+    # The optimization is listed twice in the history
+    td = ptl.models.TorsionDriveRecord(**{
+        "keywords": {
+            "dihedrals": [[0, 1, 2, 3]],
+            "grid_spacing": [90]
+        },
+        "hash_index": "procedure_counts_td",
+        "optimization_spec": {
+            "program": "geometric",
+            "keywords": {
+                "coordsys": "tric",
+            }
+        },
+        "qc_spec": {
+            "driver": "gradient",
+            "method": "HF",
+            "basis": "sto-3g",
+            "program": "psi4"
+        },
+        "initial_molecule": [mol_id],
+        "final_energy_dict": {},
+        "optimization_history": {
+            "[0]": [opt_id, opt_id],
+            "[90]": [opt_id]
+        },
+        "minimum_positions": {},
+        "status": "COMPLETE",
+        "provenance": {
+            "creator": ""
+        }
+    })
+    td_id = storage_results.add_procedures([td])["data"][0]
+
+    ret = storage_results.get_procedure_counts([opt_id, td_id, "bad_id"])
+    assert ret["meta"]["errors"] == [("id", ["bad_id"])]
+    assert ret["data"][opt_id] == {"status": "COMPLETE", "optimizations": 1, "gradients": 3}
+    assert ret["data"][td_id] == {"status": "COMPLETE", "optimizations": 1, "gradients": 3}
+
+    ProcedureORM.objects(id__in=[opt_id, td_id]).delete()
+
+
 def test_mol_pagination(storage_socket):
     """
         Test Molecule pagination
@@ -792,3 +1081,23 @@ def test_mol_pagination(storage_socket):
 
     # cleanup
     storage_socket.del_molecules(inserted['data'])
+
+
+def test_async_storage_socket(storage_socket):
+
+    from tornado.ioloop import IOLoop
+    from qcfractal.storage_sockets import AsyncStorageSocket
+
+    async_socket = AsyncStorageSocket(storage_socket, max_workers=2)
+    water = ptl.data.get_molecule("water_dimer_minima.psimol")
+
+    async def roundtrip():
+        ret = await async_socket.add_molecules([water])
+        found = await async_socket.run(storage_socket.get_molecules, id=ret["data"])
+        return ret, found
+
+    ret, found = IOLoop.current().run_sync(roundtrip)
+    assert water.compare(found["data"][0])
+
+    assert storage_socket.del_molecules(id=ret["data"]) == 1
+    async_socket.shutdown()
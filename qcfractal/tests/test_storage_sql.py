@@ -4,6 +4,8 @@ Tests the database wrappers
 All tests should be atomic, that is create and cleanup their data
 """
 
+import threading
+
 import pytest
 
 import qcfractal.interface as ptl
@@ -87,6 +89,32 @@ def test_molecules_add_many(storage_socket):
     assert ret == 2
 
 
+def test_molecules_add_bulk_order(storage_socket):
+    water = ptl.data.get_molecule("water_dimer_minima.psimol")
+    water2 = ptl.data.get_molecule("water_dimer_stretch.psimol")
+    water3 = ptl.data.get_molecule("water_dimer_stretch2.psimol")
+
+    ret1 = storage_socket.add_molecules([water2])
+    assert ret1["meta"]["n_inserted"] == 1
+
+    # Mix new, existing, and repeated molecules in a single call
+    ret2 = storage_socket.add_molecules([water, water2, water3, water, water2])
+    assert ret2["meta"]["n_inserted"] == 2
+    assert len(ret2["meta"]["duplicates"]) == 3
+    assert ret2["data"][1] == ret1["data"][0]
+    assert ret2["data"][4] == ret1["data"][0]
+    assert ret2["data"][0] == ret2["data"][3]
+    assert len(set(ret2["data"])) == 3
+
+    # Ids come back in input order
+    for mol, mol_id in zip([water, water2, water3], ret2["data"]):
+        assert storage_socket.get_molecules(id=mol_id)["data"][0].get_hash() == mol.get_hash()
+
+    # Cleanup adds
+    ret = storage_socket.del_molecules(id=list(set(ret2["data"])))
+    assert ret == 3
+
+
 def test_molecules_get(storage_socket):
 
     water = ptl.data.get_molecule("water_dimer_minima.psimol")
@@ -431,6 +459,39 @@ def test_empty_get(storage_results):
     assert 0 == len(storage_results.get_results(program='null')['data'])
 
 
+def test_results_pagination_cursor(storage_results):
+
+    def get_ids(data):
+        return [str(x["id"]) for x in data]
+
+    ret = storage_results.get_results(status=None)
+    all_ids = sorted(get_ids(ret["data"]), key=int)
+    assert ret["meta"]["next_cursor"] is None
+
+    # Walk the results by id, a full page sets the cursor of the next one
+    ret = storage_results.get_results(status=None, limit=4, cursor="")
+    assert get_ids(ret["data"]) == all_ids[:4]
+    assert ret["meta"]["n_found"] == 6
+    assert ret["meta"]["next_cursor"] == all_ids[3]
+
+    ret = storage_results.get_results(status=None, limit=4, cursor=ret["meta"]["next_cursor"], count=False)
+    assert get_ids(ret["data"]) == all_ids[4:]
+    assert ret["meta"]["n_found"] == 2
+    assert ret["meta"]["next_cursor"] is None
+
+    # n_found is the total number of matches, like with offset pagination
+    ret = storage_results.get_results(status=None, limit=2, cursor=all_ids[1])
+    assert get_ids(ret["data"]) == all_ids[2:4]
+    assert ret["meta"]["n_found"] == 6
+
+    ret = storage_results.get_results(status=None, limit=2, skip=2)
+    assert ret["meta"]["n_found"] == 6
+
+    # Projections keep the cursor
+    ret = storage_results.get_results(status=None, limit=3, cursor="", projection={"method": True})
+    assert ret["meta"]["next_cursor"] == all_ids[2]
+
+
 def test_results_get_total(storage_results):
 
     assert 6 == len(storage_results.get_results()["data"])
@@ -613,6 +674,247 @@ def test_queue_submit_many_order(storage_results):
     # Todo: test more scenarios
 
 
+def test_queue_submit_duplicates_order(storage_results):
+
+    results = storage_results.get_results()['data']
+
+    task_template = {
+        "spec": {
+            "function": "qcengine.compute_procedure",
+            "args": [{
+                "json_blob": "data"
+            }],
+            "kwargs": {},
+        },
+        "tag": None,
+        "program": "P1",
+        "parser": "",
+    }
+
+    task = ptl.models.TaskRecord(**task_template, base_result=results[2]['id'])
+
+    # Repeats within a single call collapse onto one task
+    ret1 = storage_results.queue_submit([task, task])
+    assert ret1['meta']['n_inserted'] == 1
+    assert ret1['meta']['duplicates'] == [1]
+    assert ret1["data"][0] == ret1["data"][1]
+
+    # Resubmission returns the existing task in input order
+    ret2 = storage_results.queue_submit([task, task])
+    assert ret2['meta']['n_inserted'] == 0
+    assert ret2['meta']['duplicates'] == [0, 1]
+    assert ret2["data"] == ret1["data"]
+
+    found = storage_results.queue_get_by_id(ret1["data"][:1])
+    assert len(found) == 1
+
+
+def test_queue_get_next_concurrent(storage_results):
+
+    results = storage_results.get_results()['data']
+
+    task_template = {
+        "spec": {
+            "function": "qcengine.compute_procedure",
+            "args": [{
+                "json_blob": "data"
+            }],
+            "kwargs": {},
+        },
+        "tag": None,
+        "program": "P1",
+        "procedure": "P1",
+        "parser": "",
+    }
+
+    tasks = [ptl.models.TaskRecord(**task_template, base_result=x['id']) for x in results]
+    ret = storage_results.queue_submit(tasks)
+    assert ret['meta']['n_inserted'] == len(tasks)
+
+    n_claimers = 8
+    barrier = threading.Barrier(n_claimers)
+    claimed = [[] for _ in range(n_claimers)]
+
+    def claim(num):
+        barrier.wait()
+        while True:
+            found = storage_results.queue_get_next("manager_{}".format(num), ["p1"], ["p1"], limit=1)
+            if len(found) == 0:
+                break
+            claimed[num].extend(str(x.id) for x in found)
+
+    threads = [threading.Thread(target=claim, args=(num, )) for num in range(n_claimers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Every task is handed out exactly once
+    all_claimed = [x for c in claimed for x in c]
+    assert len(all_claimed) == len(tasks)
+    assert set(all_claimed) == set(ret["data"])
+
+
+def test_queue_get_next_two_sessions(storage_results):
+    from sqlalchemy import event
+
+    results = storage_results.get_results()['data']
+
+    task_template = {
+        "spec": {
+            "function": "qcengine.compute_procedure",
+            "args": [{
+                "json_blob": "data"
+            }],
+            "kwargs": {},
+        },
+        "tag": None,
+        "program": "P1",
+        "procedure": "P1",
+        "parser": "",
+    }
+
+    tasks = [ptl.models.TaskRecord(**task_template, base_result=x['id']) for x in results]
+    ret = storage_results.queue_submit(tasks)
+    assert ret['meta']['n_inserted'] == len(tasks)
+
+    # A second session claims the tasks after the first one selected them, but before it updates them
+    limit = len(tasks) // 2
+    claimed = {}
+
+    def claim_between(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE TASK_QUEUE") and ("manager_a" not in claimed):
+            claimed["manager_a"] = []
+            claimed["manager_a"] = storage_results.queue_get_next("manager_a", ["p1"], ["p1"], limit=limit)
+
+    event.listen(storage_results.engine, "before_cursor_execute", claim_between)
+    try:
+        claimed["manager_b"] = storage_results.queue_get_next("manager_b", ["p1"], ["p1"], limit=limit)
+    finally:
+        event.remove(storage_results.engine, "before_cursor_execute", claim_between)
+
+    claimed_a = {str(x.id) for x in claimed["manager_a"]}
+    claimed_b = {str(x.id) for x in claimed["manager_b"]}
+    assert claimed_a.isdisjoint(claimed_b)
+
+    # Tasks lost to the other session are replaced
+    assert len(claimed_a) == len(claimed_b) == limit
+
+    for manager, found in claimed.items():
+        assert all(x.manager == manager for x in found)
+
+
+def test_queue_get_next_resources(storage_results):
+
+    results = storage_results.get_results()['data']
+
+    task_template = {
+        "spec": {
+            "function": "qcengine.compute_procedure",
+            "args": [{
+                "json_blob": "data"
+            }],
+            "kwargs": {},
+        },
+        "tag": None,
+        "program": "P1",
+        "procedure": "P1",
+        "parser": "",
+    }
+
+    # A small, a large and an unestimated task
+    resources = [{"cores": 2, "memory": 4}, {"cores": 16, "memory": 64, "walltime": 86400}, {}]
+    tasks = [
+        ptl.models.TaskRecord(**task_template, **res, base_result=results[num]['id'])
+        for num, res in enumerate(resources)
+    ]
+    ret = storage_results.queue_submit(tasks)
+    assert ret['meta']['n_inserted'] == 3
+
+    # Small task slots are only handed the tasks that fit
+    small = {"cores": 4, "memory": 8, "walltime": 3600}
+    found = storage_results.queue_get_next("small_manager", ["p1"], ["p1"], limit=3, resources=small)
+    assert {str(x.id) for x in found} == {ret["data"][0], ret["data"][2]}
+
+    found = storage_results.queue_get_next("small_manager", ["p1"], ["p1"], limit=3, resources=small)
+    assert len(found) == 0
+
+    # Unlimited resources fit any task
+    large = {"cores": 16, "memory": None, "walltime": None}
+    found = storage_results.queue_get_next("large_manager", ["p1"], ["p1"], limit=3, resources=large)
+    assert [str(x.id) for x in found] == [ret["data"][1]]
+    assert found[0].cores == 16
+
+
+def test_service_claim_wake(storage_results):
+    from qcfractal.interface.models.task_models import TaskStatusEnum
+    from qcfractal.storage_sockets.sql_models import ServiceQueueORM, service_procedure_association
+
+    results = storage_results.get_results()['data']
+    result_ids = [int(x['id']) for x in results]
+
+    # Services cannot be added through the socket yet, the rows are written directly
+    with storage_results.session_scope() as session:
+        services = [
+            ServiceQueueORM(
+                status=TaskStatusEnum.running, hash_index="claim_wake_" + str(x), procedure_id=result_ids[x], extra={})
+            for x in range(2)
+        ]
+        session.add_all(services)
+        session.flush()
+        service_ids = [x.id for x in services]
+
+        # Each service waits on one of the results
+        session.execute(service_procedure_association.insert(), [{
+            "service_id": service_ids[x],
+            "procedure_id": result_ids[x + 2]
+        } for x in range(2)])
+
+    def claim():
+        return sorted(x["id"] for x in storage_results.claim_services("RUNNING")["data"])
+
+    # Claimed services stay idle until woken
+    assert claim() == service_ids
+    assert claim() == []
+
+    assert storage_results.wake_services(procedure_id=[result_ids[2]]) == 1
+    assert storage_results.wake_services(procedure_id=[result_ids[2]]) == 0
+    assert claim() == service_ids[:1]
+
+    assert storage_results.wake_services(id=[service_ids[1]]) == 1
+    assert claim() == service_ids[1:]
+
+    # Finished tasks wake the services waiting on their results
+    task_template = {
+        "spec": {
+            "function": "qcengine.compute_procedure",
+            "args": [{
+                "json_blob": "data"
+            }],
+            "kwargs": {},
+        },
+        "tag": None,
+        "program": "P1",
+        "procedure": "P1",
+        "parser": "",
+    }
+    tasks = [ptl.models.TaskRecord(**task_template, base_result=results[x]['id']) for x in [2, 3]]
+    storage_results.queue_submit(tasks)
+    found = storage_results.queue_get_next("service_manager", ["p1"], ["p1"], limit=2)
+    assert len(found) == 2
+
+    task_ids = {x.base_result: x.id for x in found}
+    assert storage_results.queue_mark_complete([task_ids[results[2]['id']]]) == 1
+    assert claim() == service_ids[:1]
+
+    assert storage_results._wake_task_services([task_ids[results[3]['id']]]) == 1
+    assert claim() == service_ids[1:]
+
+    with storage_results.session_scope() as session:
+        session.query(ServiceQueueORM).filter(ServiceQueueORM.id.in_(service_ids))\
+               .delete(synchronize_session=False)
+
+
 # User testing
 
 
@@ -657,6 +959,54 @@ def test_user_permissions_admin(storage_socket):
 
     assert storage_socket.remove_user("george") is True
 
+
+def test_user_credential_cache(storage_socket, monkeypatch):
+    import bcrypt
+
+    checks = []
+    checkpw = bcrypt.checkpw
+
+    def counting_checkpw(password, hashed):
+        checks.append(password)
+        return checkpw(password, hashed)
+
+    monkeypatch.setattr(bcrypt, "checkpw", counting_checkpw)
+
+    r = storage_socket.add_user("george", "shortpw", permissions=["read", "compute"])
+    assert r is True
+
+    # The second verification is served from the cache
+    assert storage_socket.verify_user("george", "shortpw", "compute")[0] is True
+    assert len(checks) == 1
+    assert storage_socket.verify_user("george", "shortpw", "compute")[0] is True
+    assert storage_socket.verify_user("george", "shortpw", "admin")[0] is False
+    assert len(checks) == 1
+    assert storage_socket.verify_user("george", "wrongpw", "compute")[0] is False
+    assert len(checks) == 2
+
+    # Overwriting the user drops its cached credentials
+    storage_socket.add_user("george", "newpw", permissions=["read"], overwrite=True)
+    assert storage_socket.verify_user("george", "shortpw", "compute")[0] is False
+    assert storage_socket.verify_user("george", "newpw", "compute")[0] is False
+
+    # A verification that races an overwrite does not cache the old password
+    def racing_checkpw(password, hashed):
+        storage_socket.add_user("george", "otherpw", permissions=["read", "compute"], overwrite=True)
+        return checkpw(password, hashed)
+
+    monkeypatch.setattr(bcrypt, "checkpw", racing_checkpw)
+    assert storage_socket.verify_user("george", "newpw", "compute") == (False, "User has insufficient permissions.")
+
+    monkeypatch.setattr(bcrypt, "checkpw", counting_checkpw)
+    nchecks = len(checks)
+    assert storage_socket.verify_user("george", "newpw", "compute") == (False, "Incorrect password.")
+    assert len(checks) == nchecks + 1
+
+    assert storage_socket.remove_user("george") is True
+    assert storage_socket.verify_user("george", "otherpw", "read")[0] is True  # allow_read
+    assert storage_socket.verify_user("george", "otherpw", "compute")[0] is False
+
+
 def test_manager(storage_socket):
 
     assert storage_socket.manager_update(name='first_manager')
@@ -860,6 +1210,36 @@ def test_procedure_pagination(storage_socket):
     assert len(ret['data']) == storage_socket._max_limit - 400
 
 
+def test_procedure_counts(storage_results):
+    from qcfractal.interface.models.records import RecordStatusEnum
+    from qcfractal.storage_sockets.sql_models import (OptimizationProcedureORM, TorsionDriveProcedureORM,
+                                                      opt_result_association, torj_opt_association)
+
+    result_ids = [int(x["id"]) for x in storage_results.get_results()['data'][:3]]
+
+    # Torsiondrives cannot be added through the socket yet, the rows are written directly
+    with storage_results.session_scope() as session:
+        opt = OptimizationProcedureORM(procedure="optimization", program="geometric",
+                                       status=RecordStatusEnum.complete)
+        td = TorsionDriveProcedureORM(procedure="torsiondrive", program="torsiondrive",
+                                      status=RecordStatusEnum.complete)
+        session.add_all([opt, td])
+        session.flush()
+        opt_id, td_id = opt.id, td.id
+
+        session.execute(opt_result_association.insert(), [{"opt_id": opt_id, "result_id": x} for x in result_ids])
+
+        # The optimization is listed twice in the history
+        session.execute(torj_opt_association.insert(), [{"torj_id": td_id, "opt_id": opt_id}] * 2)
+
+    ret = storage_results.get_procedure_counts([opt_id, td_id, "bad_id"])
+    assert ret["meta"]["errors"] == [("id", ["bad_id"])]
+    assert ret["data"][str(opt_id)] == {"status": "COMPLETE", "optimizations": 1, "gradients": 3}
+    assert ret["data"][str(td_id)] == {"status": "COMPLETE", "optimizations": 1, "gradients": 3}
+
+    storage_results.del_procedures([td_id, opt_id])
+
+
 @pytest.mark.skip
 def test_mol_pagination(storage_socket):
     """
@@ -1,18 +1,157 @@
 """
 Web handlers for the FractalServer.
 """
+import hashlib
 import json
+from collections import OrderedDict
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import tornado.web
 
 from pydantic import ValidationError
 
 from .interface.models.rest_models import rest_model
+from .interface.serialization import content_types, deserialize, get_encoding, serialize_model
 
 
+# Fields holding the ids of other records, these stay lists of string ids whatever the socket stores
+_reference_fields = {
+    "id", "molecule", "keywords", "task_id", "procedure_id", "stdout", "stderr", "error", "initial_molecule",
+    "final_molecule", "trajectory"
+}
+
+
+def _str_ids(value: Any) -> Any:
+    if value is None:
+        return None
+    elif isinstance(value, list):
+        return [str(x) for x in value]
+    else:
+        return str(value)
+
+
+def _to_columns(records: List[Dict[str, Any]], fields: List[str]) -> Tuple[Dict[str, Any], Dict[str, List[int]]]:
+    """
+    Transposes projected records into columns. Numeric value fields, including fields holding equal length
+    vectors, become float arrays with NaN for missing values. Id fields become lists of strings, all other
+    fields stay lists.
+    """
+
+    columns = {}
+    shapes = {}
+    for field in fields:
+        values = [x.get(field) for x in records]
+
+        if field in _reference_fields:
+            columns[field] = [_str_ids(v) for v in values]
+            continue
+
+        arr = None
+        if all((v is None) or (isinstance(v, (int, float, list)) and not isinstance(v, bool)) for v in values):
+            try:
+                arr = np.array(values, dtype=float)
+            except (TypeError, ValueError):
+                pass
+
+        if arr is None:
+            columns[field] = values
+        else:
+            columns[field] = arr
+            shapes[field] = list(arr.shape)
+
+    return columns, shapes
+
+
+class ResponseCache:
+    """
+    A least recently used cache of serialized GET responses, bounded by the total size of the responses.
+
+    Only responses that can never change are stored, such as molecules selected by id, see
+    APIHandler.immutable_query. Entries are dropped per table on writes. The cache lives on the
+    IOLoop thread and is not shared between server worker processes.
+    """
+
+    def __init__(self, max_bytes: int=100 * 1024**2):
+        """
+        Parameters
+        ----------
+        max_bytes : int, optional
+            The maximum total size of the cached responses, 0 disables the cache.
+        """
+
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key: Tuple[str, ...]) -> Optional[Tuple[bytes, str]]:
+        """
+        Returns the (response, etag) of a key, or None if the key is not cached.
+        """
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Tuple[str, ...], blob: bytes) -> str:
+        """
+        Caches a response and returns its etag. Responses larger than the cache are not stored.
+        """
+
+        etag = '"{}"'.format(hashlib.sha1(blob).hexdigest())
+        if len(blob) > self.max_bytes:
+            return etag
+
+        if key in self._entries:
+            self.nbytes -= len(self._entries.pop(key)[0])
+
+        self._entries[key] = (blob, etag)
+        self.nbytes += len(blob)
+        while self.nbytes > self.max_bytes:
+            _, (old, _) = self._entries.popitem(last=False)
+            self.nbytes -= len(old)
+
+        return etag
+
+    def invalidate(self, table: str) -> None:
+        """
+        Drops all cached responses of a table.
+        """
+
+        for key in [k for k in self._entries if k[0] == table]:
+            self.nbytes -= len(self._entries.pop(key)[0])
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the size and hit rate of the cache.
+        """
+
+        nrequests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / nrequests if nrequests else 0.0,
+            "entries": len(self._entries),
+            "nbytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+@tornado.web.stream_request_body
 class APIHandler(tornado.web.RequestHandler):
     """
     A requests handler for API calls.
+
+    Request bodies are streamed in as chunks and decoded at most once, on the first
+    access of ``data``.
     """
 
     # Admin authentication required by default
@@ -25,17 +164,56 @@ class APIHandler(tornado.web.RequestHandler):
 
         self.set_header("Content-Type", "application/json")
         self.objects = objects
-        self.storage = self.objects["storage_socket"]
+        self.storage = self.objects["async_storage_socket"]
         self.logger = objects["logger"]
+        self.response_cache = objects["response_cache"]
         self.username = None
 
-    def prepare(self):
+        self._chunks = []
+        self._body_size = 0
+        self._data = None
+        self._data_parsed = False
+        self.timings = {}
+
+    async def prepare(self):
         if self._required_auth:
-            self.authenticate(self._required_auth)
+            await self.authenticate(self._required_auth)
+
+        # The body is decoded according to its Content-Type, responses follow the Accept header
+        self.encoding = get_encoding(self.request.headers.get("Accept"))
 
-        self.json = json.loads(self.request.body.decode("UTF-8"))
+    def data_received(self, chunk):
+        self._chunks.append(chunk)
+        self._body_size += len(chunk)
 
-    def authenticate(self, permission):
+    @property
+    def data(self):
+        """
+        The decoded request body, parsed on first access and cached
+        """
+
+        if self._data_parsed:
+            return self._data
+
+        tstart = perf_counter()
+        body = b"".join(self._chunks)
+        self._chunks = []
+        try:
+            self._data = deserialize(body, get_encoding(self.request.headers.get("Content-Type")))
+        except Exception:
+            raise tornado.web.HTTPError(status_code=400, reason="Could not decode the request body")
+
+        self._data_parsed = True
+        self.timings["decode"] = perf_counter() - tstart
+        return self._data
+
+    def on_finish(self):
+        timings = ", ".join("{} {:.2f} ms".format(k, v * 1000) for k, v in self.timings.items())
+        self.logger.debug("{} {}: body {} bytes, {}total {:.2f} ms".format(
+            self.request.method, self.request.path, self._body_size, timings + ", " if timings else "",
+            self.request.request_time() * 1000))
+
+    async def authenticate(self, permission):
         """Authenticates request with a given permission setting.
 
         Parameters
@@ -55,16 +233,103 @@ class APIHandler(tornado.web.RequestHandler):
 
         self.username = username
 
-        verified, msg = self.objects["storage_socket"].verify_user(username, password, permission)
+        verified, msg = await self.storage.verify_user(username, password, permission)
         if verified is False:
             raise tornado.web.HTTPError(status_code=401, reason=msg)
 
     def parse_bodymodel(self, model):
 
+        data = self.data
+
+        tstart = perf_counter()
         try:
-            return model.parse_raw(self.request.body)
+            return model.parse_obj(data)
         except ValidationError as exc:
             raise tornado.web.HTTPError(status_code=401, reason="Invalid REST")
+        finally:
+            self.timings["validate"] = perf_counter() - tstart
+
+    def immutable_query(self, data, identifiers, mutable=()) -> Optional[int]:
+        """Checks whether a GET query selects records only by identifiers that never change.
+
+        Parameters
+        ----------
+        data : BaseModel
+            The data of a GET body
+        identifiers : tuple of str
+            The fields that identify immutable records, such as "id"
+        mutable : tuple of str, optional
+            Fields that can select records written later, queries using them are not immutable
+
+        Returns
+        -------
+        Optional[int]
+            The number of records the query asks for, None if the query is not immutable
+        """
+
+        data = data.dict()
+        if any(data.get(k) is not None for k in mutable):
+            return None
+
+        nrecords = [len(set(v if isinstance(v, list) else [v])) for k, v in data.items() if k in identifiers and v]
+        if not nrecords:
+            return None
+
+        return min(nrecords)
+
+    def cache_key(self, table, body) -> Tuple[str, ...]:
+        """The response cache key of a GET body, responses differ per encoding.
+        """
+
+        return (table, self.encoding, body.json())
+
+    def write_cached(self, key) -> bool:
+        """Writes a cached response, returns False if the key is not cached.
+        """
+
+        if (key is None) or (not self.response_cache.max_bytes):
+            return False
+
+        entry = self.response_cache.get(key)
+        if entry is None:
+            return False
+
+        self.set_header("Content-Type", content_types[self.encoding])
+        self._write_etag(*entry)
+        return True
+
+    def _write_etag(self, blob, etag):
+        # Clients holding the same response revalidate for free
+        self.set_header("Etag", etag)
+        if self.check_etag_header():
+            self.set_status(304)
+        else:
+            self.write(blob)
+
+    def write_model(self, model, cache_key=None):
+        """Writes a REST response model in the encoding requested by the client.
+
+        Parameters
+        ----------
+        model : BaseModel
+            The response model to write
+        cache_key : tuple, optional
+            Stores the serialized response in the response cache under this key
+        """
+
+        tstart = perf_counter()
+        blob = serialize_model(model, self.encoding)
+        self.timings["encode"] = perf_counter() - tstart
+
+        # Exposes the server-side cost of the request to clients, see the Server-Timing header
+        self.set_header("Content-Type", content_types[self.encoding])
+        self.set_header("Server-Timing",
+                        ", ".join("{};dur={:.3f}".format(k, v * 1000) for k, v in self.timings.items()))
+
+        if (cache_key is not None) and self.response_cache.max_bytes:
+            self._write_etag(blob, self.response_cache.put(cache_key, blob))
+        else:
+            self.write(blob)
 
 
 class InformationHandler(APIHandler):
@@ -81,7 +346,7 @@ class InformationHandler(APIHandler):
 
         self.logger.info("GET: Information")
 
-        self.write(self.objects["public_information"])
+        self.write({**self.objects["public_information"], "response_cache": self.response_cache.stats()})
 
 
 class KVStoreHandler(APIHandler):
@@ -91,7 +356,7 @@ class KVStoreHandler(APIHandler):
 
     _required_auth = "read"
 
-    def get(self):
+    async def get(self):
         """
 
         Experimental documentation, need to find a decent format.
@@ -113,11 +378,11 @@ class KVStoreHandler(APIHandler):
         body_model, response_model = rest_model("kvstore", "get")
         body = self.parse_bodymodel(body_model)
 
-        ret = self.storage.get_kvstore(body.data)
+        ret = await self.storage.get_kvstore(body.data)
         ret = response_model(**ret)
 
         self.logger.info("GET: KVStore - {} pulls.".format(len(ret.data)))
-        self.write(ret.json())
+        self.write_model(ret)
 
 
 class MoleculeHandler(APIHandler):
@@ -127,7 +392,7 @@ class MoleculeHandler(APIHandler):
 
     _required_auth = "read"
 
-    def get(self):
+    async def get(self):
         """
 
         Experimental documentation, need to find a decent format.
@@ -151,13 +416,27 @@ class MoleculeHandler(APIHandler):
         body_model, response_model = rest_model("molecule", "get")
         body = self.parse_bodymodel(body_model)
 
-        molecules = self.storage.get_molecules(**body.data.dict())
+        # Molecules never change, queries by id or hash are answered from the cache
+        nrecords = self.immutable_query(body.data, ("id", "molecule_hash"), mutable=("molecular_formula", ))
+        cache_key = None if nrecords is None else self.cache_key("molecule", body)
+        if self.write_cached(cache_key):
+            self.logger.info("GET: Molecule - cached.")
+            return
+
+        molecules = await self.storage.get_molecules(
+            **body.data.dict(),
+            limit=body.meta.limit,
+            skip=body.meta.skip,
+            cursor=body.meta.cursor,
+            count=body.meta.count)
         ret = response_model(**molecules)
 
         self.logger.info("GET: Molecule - {} pulls.".format(len(ret.data)))
-        self.write(ret.json())
+        if (nrecords is None) or (len(ret.data) < nrecords):
+            cache_key = None
+        self.write_model(ret, cache_key=cache_key)
 
-    def post(self):
+    async def post(self):
         """
             Experimental documentation, need to find a decent format.
 
@@ -176,16 +455,17 @@ class MoleculeHandler(APIHandler):
             "data" - A dictionary of {key : id} results
         """
 
-        self.authenticate("write")
+        await self.authenticate("write")
 
         body_model, response_model = rest_model("molecule", "post")
         body = self.parse_bodymodel(body_model)
 
-        ret = self.storage.add_molecules(body.data)
+        ret = await self.storage.add_molecules(body.data)
         response = response_model(**ret)
+        self.response_cache.invalidate("molecule")
 
         self.logger.info("POST: Molecule - {} inserted.".format(response.meta.n_inserted))
-        self.write(response.json())
+        self.write_model(response)
 
 
 class KeywordHandler(APIHandler):
@@ -195,30 +475,37 @@ class KeywordHandler(APIHandler):
 
     _required_auth = "read"
 
-    def get(self):
-
-        storage = self.objects["storage_socket"]
+    async def get(self):
 
         body_model, response_model = rest_model("keyword", "get")
         body = self.parse_bodymodel(body_model)
 
-        ret = storage.get_keywords(**body.data.dict(), with_ids=False)
+        nrecords = self.immutable_query(body.data, ("id", "hash_index"))
+        cache_key = None if nrecords is None else self.cache_key("keyword", body)
+        if self.write_cached(cache_key):
+            self.logger.info("GET: Keywords - cached.")
+            return
+
+        ret = await self.storage.get_keywords(**body.data.dict(), with_ids=False)
         response = response_model(**ret)
 
         self.logger.info("GET: Keywords - {} pulls.".format(len(response.data)))
-        self.write(response.json())
+        if (nrecords is None) or (len(response.data) < nrecords):
+            cache_key = None
+        self.write_model(response, cache_key=cache_key)
 
-    def post(self):
-        self.authenticate("write")
+    async def post(self):
+        await self.authenticate("write")
 
         body_model, response_model = rest_model("keyword", "post")
         body = self.parse_bodymodel(body_model)
 
-        ret = self.storage.add_keywords(body.data)
+        ret = await self.storage.add_keywords(body.data)
         response = response_model(**ret)
+        self.response_cache.invalidate("keyword")
 
         self.logger.info("POST: Keywords - {} inserted.".format(response.meta.n_inserted))
-        self.write(response.json())
+        self.write_model(response)
 
 
 class CollectionHandler(APIHandler):
@@ -228,29 +515,41 @@ class CollectionHandler(APIHandler):
 
     _required_auth = "read"
 
-    def get(self):
+    async def get(self):
 
 
         body_model, response_model = rest_model("collection", "get")
         body = self.parse_bodymodel(body_model)
 
-        cols = self.storage.get_collections(**body.data.dict(), projection=body.meta.projection)
+        cols = await self.storage.get_collections(**body.data.dict(), projection=body.meta.projection)
         response = response_model(**cols)
 
         self.logger.info("GET: Collections - {} pulls.".format(len(response.data)))
-        self.write(response.json())
+        self.write_model(response)
 
-    def post(self):
-        self.authenticate("write")
+    async def post(self):
+        await self.authenticate("write")
 
         body_model, response_model = rest_model("collection", "post")
         body = self.parse_bodymodel(body_model)
 
-        ret = self.storage.add_collection(body.data.dict(), overwrite=body.meta.overwrite)
+        ret = await self.storage.add_collection(body.data.dict(), overwrite=body.meta.overwrite)
         response = response_model(**ret)
 
         self.logger.info("POST: Collections - {} inserted.".format(response.meta.n_inserted))
-        self.write(response.json())
+        self.write_model(response)
+
+    async def put(self):
+        await self.authenticate("write")
+
+        body_model, response_model = rest_model("collection", "put")
+        body = self.parse_bodymodel(body_model)
+
+        ret = await self.storage.update_collection(**body.data.dict())
+        response = response_model(**ret)
+
+        self.logger.info("PUT: Collections - {} entries updated.".format(response.meta.n_inserted))
+        self.write_model(response)
 
 
 class ResultHandler(APIHandler):
@@ -260,16 +559,65 @@ class ResultHandler(APIHandler):
 
     _required_auth = "read"
 
-    def get(self):
+    async def get(self):
 
         body_model, response_model = rest_model("result", "get")
         body = self.parse_bodymodel(body_model)
 
-        ret = self.storage.get_results(**body.data.dict(), projection=body.meta.projection)
+        # Only results selected by id that are all COMPLETE are cached, see below
+        nrecords = self.immutable_query(body.data, ("id", ), mutable=("task_id", ))
+        cache_key = None if nrecords is None else self.cache_key("result", body)
+        if self.write_cached(cache_key):
+            self.logger.info("GET: Results - cached.")
+            return
+
+        ret = await self.storage.get_results(
+            **body.data.dict(),
+            projection=body.meta.projection,
+            limit=body.meta.limit,
+            skip=body.meta.skip,
+            cursor=body.meta.cursor,
+            count=body.meta.count)
         result = response_model(**ret)
 
         self.logger.info("GET: Results - {} pulls.".format(len(result.data)))
-        self.write(result.json())
+        if (nrecords is None) or (len(result.data) < nrecords) or any(x.get("status") != "COMPLETE"
+                                                                       for x in ret["data"]):
+            cache_key = None
+        self.write_model(result, cache_key=cache_key)
+
+
+class ResultColumnsHandler(APIHandler):
+    """
+    A handler to get projected Result fields as columns rather than one dictionary per Result.
+    """
+
+    _required_auth = "read"
+
+    async def get(self):
+
+        body_model, response_model = rest_model("result_columns", "get")
+        body = self.parse_bodymodel(body_model)
+
+        projection = body.meta.projection or {"molecule": True, "return_result": True}
+        fields = [k for k, v in projection.items() if v]
+
+        ret = await self.storage.get_results(
+            **body.data.dict(),
+            projection={k: True for k in fields},
+            limit=body.meta.limit,
+            skip=body.meta.skip,
+            cursor=body.meta.cursor,
+            count=body.meta.count)
+
+        tstart = perf_counter()
+        columns, shapes = _to_columns(ret["data"], ["id"] + [x for x in fields if x != "id"])
+        self.timings["columns"] = perf_counter() - tstart
+
+        response = response_model(meta=ret["meta"], data=columns, shapes=shapes)
+
+        self.logger.info("GET: ResultColumns - {} pulls.".format(len(ret["data"])))
+        self.write_model(response)
 
 
 class ProcedureHandler(APIHandler):
@@ -279,13 +627,43 @@ class ProcedureHandler(APIHandler):
 
     _required_auth = "read"
 
-    def get(self):
+    async def get(self):
 
         body_model, response_model = rest_model("procedure", "get")
         body = self.parse_bodymodel(body_model)
 
-        ret = self.storage.get_procedures(**body.data.dict())
+        ret = await self.storage.get_procedures(
+            **body.data.dict(),
+            limit=body.meta.limit,
+            skip=body.meta.skip,
+            cursor=body.meta.cursor,
+            count=body.meta.count)
         response = response_model(**ret)
 
         self.logger.info("GET: Procedures - {} pulls.".format(len(response.data)))
-        self.write(response.json())
+        self.write_model(response)
+
+
+class ProcedureCountsHandler(APIHandler):
+    """
+    A handler to count the optimizations and gradients of procedures.
+    """
+
+    _required_auth = "read"
+
+    async def get(self):
+
+        body_model, response_model = rest_model("procedure_counts", "get")
+        body = self.parse_bodymodel(body_model)
+
+        ids = body.data.id if isinstance(body.data.id, list) else [body.data.id]
+        limit = self.storage.socket.get_limit(len(ids))
+        if len(ids) > limit:
+            raise tornado.web.HTTPError(
+                status_code=400, reason="Counts of at most {} procedures can be queried at once.".format(limit))
+
+        ret = await self.storage.get_procedure_counts(ids)
+        response = response_model(**ret)
+
+        self.logger.info("GET: ProcedureCounts - {} pulls.".format(len(response.data)))
+        self.write_model(response)
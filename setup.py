@@ -61,6 +61,10 @@ if __name__ == "__main__":
                 'pytest',
                 'pytest-cov',
             ],
+            'msgpack': [
+                'msgpack',
+                'zstandard',
+            ],
         },
         tests_require=[
             'pytest',